@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+
+"""
+EMAD Auto-Sync Benchmarks
+
+Measures the performance of the EMADAutoSync engine on synthetic trees built
+in a temporary directory. No GitHub token or network access is required.
+
+Usage:
+python benchmark-emad-sync.py hash [--files N] [--size-kb KB] [--workers 1 2 4 8]
+python benchmark-emad-sync.py walk [--files N] [--node-modules-files N]
+python benchmark-emad-sync.py match [--paths N]
+python benchmark-emad-sync.py upload [--files N] [--size-kb KB] [--latency-ms MS] [--concurrency 1 4 16]
+python benchmark-emad-sync.py e2e [--sizes 100 10000 100000] [--update-baseline]
+python benchmark-emad-sync.py memory [--entries 100000 1000000]
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+DEFAULT_BASELINE = Path(__file__).parent / 'benchmark-emad-sync-baseline.json'
+
+from emad_auto_sync import EMADAutoSync
+from emad_fake_github import EMADFakeGitHub
+from emad_snapshot import EMADSnapshot
+
+
+def build_synthetic_tree(root: Path, file_count: int, size_bytes: int, fanout: int = 50) -> int:
+    """Create file_count files of random content spread over nested directories"""
+    total_bytes = 0
+    for i in range(file_count):
+        file_path = root / f'd{i % fanout:03d}' / f'sub{(i // fanout) % 10}' / f'file{i:06d}.bin'
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(os.urandom(size_bytes))
+        total_bytes += size_bytes
+    return total_bytes
+
+
+def quiet_logging():
+    """Keep per-file INFO logging out of the benchmark output"""
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def benchmark_hash(args) -> int:
+    """Cold-scan hashing throughput across worker counts"""
+    print("⏱️ EMAD Hashing Benchmark")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory(prefix='emad-bench-') as tmp:
+        root = Path(tmp)
+        total_bytes = build_synthetic_tree(root, args.files, args.size_kb * 1024)
+        print(f"Synthetic tree: {args.files} files, {total_bytes / 1024 / 1024:.1f} MB")
+
+        # Warm the page cache so every run measures hashing rather than first-read I/O
+        EMADAutoSync(root, hash_workers=max(args.workers)).scan_directory()
+        quiet_logging()
+
+        print(f"\n{'workers':>8} {'seconds':>9} {'files/s':>10} {'MB/s':>8} {'speedup':>8}")
+        baseline = None
+        for workers in args.workers:
+            best = None
+            for _ in range(args.repeat):
+                auto_sync = EMADAutoSync(root, hash_workers=workers)
+                started = time.perf_counter()
+                hashes = auto_sync.scan_directory()
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+                assert len(hashes) == args.files, f"expected {args.files} hashes, got {len(hashes)}"
+
+            baseline = baseline or best
+            print(f"{workers:>8} {best:>9.3f} {args.files / best:>10.0f} "
+                  f"{total_bytes / 1024 / 1024 / best:>8.1f} {baseline / best:>7.2f}x")
+
+    return 0
+
+
+def legacy_walk(auto_sync: EMADAutoSync) -> int:
+    """The original rglob-then-filter walk, kept for comparison"""
+    count = 0
+    for file_path in auto_sync.bmad_path.rglob('*'):
+        if file_path.is_file() and not auto_sync.should_exclude_file(file_path):
+            file_path.relative_to(auto_sync.bmad_path)
+            file_path.stat()
+            count += 1
+    return count
+
+
+def benchmark_walk(args) -> int:
+    """Directory walk time with and without pruning of excluded trees"""
+    print("⏱️ EMAD Directory Walk Benchmark")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory(prefix='emad-bench-') as tmp:
+        root = Path(tmp)
+        build_synthetic_tree(root, args.files, 64)
+        build_synthetic_tree(root / 'node_modules', args.node_modules_files, 64, fanout=200)
+        total = args.files + args.node_modules_files
+        print(f"Synthetic tree: {args.files} project files, {args.node_modules_files} files in node_modules "
+              f"({args.node_modules_files / total:.0%} of entries)")
+
+        auto_sync = EMADAutoSync(root)
+        quiet_logging()
+
+        results = {}
+        for name, walk in (('rglob + filter', lambda: legacy_walk(auto_sync)),
+                           ('pruning scandir', lambda: sum(1 for _ in auto_sync.walk_files(root)))):
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                count = walk()
+                timings.append(time.perf_counter() - started)
+            results[name] = min(timings)
+            print(f"{name:>16}: {results[name]:.3f}s ({count} files kept)")
+
+        print(f"\n🚀 Speedup: {results['rglob + filter'] / results['pruning scandir']:.1f}x")
+
+    return 0
+
+
+def legacy_should_exclude(auto_sync: EMADAutoSync, file_path: Path) -> bool:
+    """The original substring/suffix exclusion loop, kept for comparison"""
+    file_str = str(file_path)
+    for pattern in auto_sync.excluded_patterns:
+        if pattern.startswith('*'):
+            if file_str.endswith(pattern[1:]):
+                return True
+        elif pattern in file_str:
+            return True
+    return False
+
+
+def benchmark_match(args) -> int:
+    """Per-path exclusion check cost: substring loop vs compiled matcher"""
+    print("⏱️ EMAD Path Matching Benchmark")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory(prefix='emad-bench-') as tmp:
+        root = Path(tmp)
+        (root / 'config').mkdir()
+        (root / 'config' / 'emad-intelligent-config.json').write_text(json.dumps({'monitoring': {
+            'include_patterns': ['**/*.py', '**/*.md', '**/*.json', '**/*.js'],
+            'exclude_patterns': ['node_modules/**', 'dist/**', 'build/**', '**/*.pyc', 'coverage/**'],
+        }}))
+        (root / '.gitignore').write_text('*.egg-info/\n.venv/\n*.bak\n/tmp/\n')
+        auto_sync = EMADAutoSync(root)
+        quiet_logging()
+
+        extensions = ('py', 'md', 'json', 'js', 'log', 'bak')
+        relative_paths = [f'pkg{i % 40}/mod{(i // 40) % 25}/file{i}.{extensions[i % len(extensions)]}'
+                          for i in range(args.paths)]
+        absolute_paths = [root / relative_path for relative_path in relative_paths]
+        print(f"{args.paths} paths, {len(auto_sync.excluded_patterns)} built-in patterns plus config and .gitignore")
+
+        results = {}
+        for name, check in (('substring loop', lambda: [legacy_should_exclude(auto_sync, path)
+                                                        for path in absolute_paths]),
+                            ('matcher (walker)', lambda: [auto_sync.is_excluded(path)
+                                                          for path in relative_paths]),
+                            ('matcher (full path)', lambda: [auto_sync.should_exclude_file(path)
+                                                             for path in absolute_paths])):
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                check()
+                timings.append(time.perf_counter() - started)
+            results[name] = min(timings)
+            print(f"{name:>20}: {results[name] / args.paths * 1e6:.2f} µs/path")
+
+    return 0
+
+
+def benchmark_upload(args) -> int:
+    """Blob upload throughput and latency against a local fake GitHub, by concurrency"""
+    print("⏱️ EMAD Blob Upload Benchmark")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory(prefix='emad-bench-') as tmp:
+        root = Path(tmp)
+        total_bytes = build_synthetic_tree(root, args.files, args.size_kb * 1024)
+        print(f"Synthetic tree: {args.files} files, {total_bytes / 1024 / 1024:.1f} MB, "
+              f"{args.latency_ms} ms simulated API latency")
+
+        print(f"\n{'concurrency':>11} {'seconds':>9} {'files/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'speedup':>8}")
+        baseline = None
+        for concurrency in args.concurrency:
+            with EMADFakeGitHub(latency=args.latency_ms / 1000) as github:
+                auto_sync = EMADAutoSync(root, api_base=github.url, upload_concurrency=concurrency)
+                auto_sync.authenticate()
+                quiet_logging()
+                file_paths = [relative_path for relative_path, _, _ in auto_sync.walk_files(root)]
+
+                latencies = []
+                create_blob = auto_sync.create_blob
+
+                def timed_create_blob(file_path):
+                    started = time.perf_counter()
+                    try:
+                        return create_blob(file_path)
+                    finally:
+                        latencies.append(time.perf_counter() - started)
+
+                auto_sync.create_blob = timed_create_blob
+                started = time.perf_counter()
+                blob_shas = auto_sync.upload_blobs(file_paths)
+                elapsed = time.perf_counter() - started
+                assert blob_shas is not None and len(blob_shas) == args.files, "upload failed"
+
+            percentiles = statistics.quantiles(latencies, n=100)
+            baseline = baseline or elapsed
+            print(f"{auto_sync.upload_concurrency:>11} {elapsed:>9.3f} {args.files / elapsed:>9.0f} "
+                  f"{percentiles[49] * 1000:>8.1f} {percentiles[94] * 1000:>8.1f} {baseline / elapsed:>7.2f}x")
+
+    return 0
+
+
+def run_sync_phase(auto_sync: EMADAutoSync, github: EMADFakeGitHub) -> dict:
+    """One full monitor_cycle, measured from the fake server's side"""
+    github.reset_counters()
+    started = time.perf_counter()
+    auto_sync.monitor_cycle(flush=True)
+    return {
+        'seconds': round(time.perf_counter() - started, 3),
+        'api_calls': github.api_calls(),
+        'bytes_sent': github.bytes_received,
+    }
+
+
+def benchmark_e2e_size(file_count: int, args) -> dict:
+    """Initial, incremental and no-op sync cycles of a synthetic tree"""
+    with tempfile.TemporaryDirectory(prefix='emad-bench-') as tmp, \
+            EMADFakeGitHub(latency=args.latency_ms / 1000) as github:
+        root = Path(tmp)
+        build_synthetic_tree(root, file_count, args.size_bytes, fanout=max(1, file_count // 200))
+        auto_sync = EMADAutoSync(root, api_base=github.url)
+        auto_sync.authenticate()
+        quiet_logging()
+
+        # Nothing synced yet: every file is uploaded
+        phases = {'initial': run_sync_phase(auto_sync, github)}
+        assert len(github.listing('main')) == file_count, 'initial sync did not reach main'
+
+        # Touch 1% of the tree: modify half of those files and add the other half
+        touched = max(2, file_count // 100)
+        files = sorted(auto_sync.file_hashes)
+        for relative_path in files[:touched // 2]:
+            (root / relative_path).write_bytes(os.urandom(args.size_bytes))
+        for i in range(touched - touched // 2):
+            (root / 'added' / f'new{i:06d}.bin').parent.mkdir(exist_ok=True)
+            (root / 'added' / f'new{i:06d}.bin').write_bytes(os.urandom(args.size_bytes))
+        phases['incremental'] = run_sync_phase(auto_sync, github)
+        assert github.listing('main').keys() == auto_sync.file_hashes.keys(), 'incremental sync incomplete'
+
+        phases['noop'] = run_sync_phase(auto_sync, github)
+
+    return phases
+
+
+def compare_to_baseline(name: str, current: dict, baseline: dict, args) -> list:
+    """Regressions of one phase: API calls and bytes must not grow, time within tolerance"""
+    regressions = []
+    if current['api_calls'] > baseline['api_calls']:
+        regressions.append(f"{name}: {current['api_calls']} API calls (baseline {baseline['api_calls']})")
+    if current['bytes_sent'] > baseline['bytes_sent'] * 1.01:
+        regressions.append(f"{name}: {current['bytes_sent']} bytes sent (baseline {baseline['bytes_sent']})")
+    time_budget = max(baseline['seconds'] * (1 + args.time_tolerance), baseline['seconds'] + 0.5)
+    if current['seconds'] > time_budget:
+        regressions.append(f"{name}: {current['seconds']:.2f}s (baseline {baseline['seconds']:.2f}s)")
+    return regressions
+
+
+def benchmark_e2e(args) -> int:
+    """End-to-end monitor_cycle syncs against a local fake GitHub, checked against a baseline"""
+    print("⏱️ EMAD End-to-End Sync Benchmark")
+    print("=" * 50)
+
+    params = {'size_bytes': args.size_bytes, 'latency_ms': args.latency_ms}
+    baseline = {}
+    if args.baseline.exists():
+        stored = json.loads(args.baseline.read_text())
+        if stored.get('params') == params:
+            baseline = stored.get('results', {})
+        else:
+            print(f"Baseline {args.baseline.name} was recorded with {stored.get('params')}, not comparing")
+
+    results = {}
+    regressions = []
+    print(f"\n{'files':>7} {'phase':>12} {'seconds':>9} {'API calls':>10} {'KB sent':>10}")
+    for file_count in args.sizes:
+        phases = benchmark_e2e_size(file_count, args)
+        results[str(file_count)] = phases
+        for phase, measured in phases.items():
+            print(f"{file_count:>7} {phase:>12} {measured['seconds']:>9.2f} {measured['api_calls']:>10} "
+                  f"{measured['bytes_sent'] / 1024:>10.1f}")
+            if phase in baseline.get(str(file_count), {}):
+                regressions += compare_to_baseline(f'{file_count} files/{phase}', measured,
+                                                   baseline[str(file_count)][phase], args)
+
+    if args.update_baseline:
+        stored = {'params': params, 'results': results}
+        if args.baseline.exists() and json.loads(args.baseline.read_text()).get('params') == params:
+            stored['results'] = dict(json.loads(args.baseline.read_text())['results'], **results)
+        args.baseline.write_text(json.dumps(stored, indent=2) + '\n')
+        print(f"\n💾 Baseline written to {args.baseline}")
+        return 0
+
+    if regressions:
+        print("\n❌ Regressions against baseline:")
+        for regression in regressions:
+            print(f"   - {regression}")
+        return 1
+
+    print("\n✅ No regressions against baseline" if baseline else "\nℹ️ No baseline to compare against")
+    return 0
+
+
+def synthetic_hashes(entry_count: int, changed_every: int = 0):
+    """(path, SHA-256) pairs shaped like a scanned tree; every changed_every-th digest differs"""
+    fanout = max(1, entry_count // 200)
+    for i in range(entry_count):
+        seed = f'{i}-changed' if changed_every and i % changed_every == 0 else str(i)
+        yield (f'd{i % fanout:04d}/sub{(i // fanout) % 10}/file{i:07d}.bin',
+               hashlib.sha256(seed.encode()).hexdigest())
+
+
+def traced(build):
+    """Run build under tracemalloc: (result, bytes it retains, peak bytes while it ran)"""
+    tracemalloc.start()
+    try:
+        result = build()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, retained, peak
+
+
+def dict_diff(old: dict, new: dict) -> tuple:
+    """The comparison detect_changes made before snapshots, kept for comparison"""
+    added = [path for path in new if path not in old]
+    modified = [path for path, file_hash in new.items() if path in old and old[path] != file_hash]
+    deleted = [path for path in old if path not in new]
+    return added, modified, deleted
+
+
+def benchmark_memory(args) -> int:
+    """Memory held by the baseline: dict of hex strings vs compact snapshot"""
+    print("⏱️ EMAD Snapshot Memory Benchmark")
+    print("=" * 50)
+    print("The snapshot is built from a scan's dict, as detect_changes does; its peak is what the\n"
+          "conversion needs on top of that dict, which is freed afterwards")
+
+    print(f"\n{'entries':>9} {'structure':>10} {'retained MB':>12} {'B/entry':>8} {'peak MB':>8} "
+          f"{'diff s':>7} {'saving':>7}")
+    for entry_count in args.entries:
+        # Previous baseline and a rescan with 1% of the files changed, as a full-scan comparison sees them
+        baseline, dict_retained, dict_peak = traced(lambda: dict(synthetic_hashes(entry_count)))
+        rescanned = dict(synthetic_hashes(entry_count, 100))
+        expected = (0, len(range(0, entry_count, 100)), 0)
+
+        started = time.perf_counter()
+        assert tuple(map(len, dict_diff(baseline, rescanned))) == expected
+        dict_seconds = time.perf_counter() - started
+        print(f"{entry_count:>9} {'dict':>10} {dict_retained / 1024 / 1024:>12.1f} "
+              f"{dict_retained / entry_count:>8.0f} {dict_peak / 1024 / 1024:>8.1f} {dict_seconds:>7.2f}")
+
+        snapshot, retained, peak = traced(lambda: EMADSnapshot.from_items(baseline.items()))
+        del baseline
+        rescanned = EMADSnapshot.from_items(rescanned.items())
+
+        started = time.perf_counter()
+        assert tuple(map(len, snapshot.diff(rescanned))) == expected
+        seconds = time.perf_counter() - started
+        print(f"{entry_count:>9} {'snapshot':>10} {retained / 1024 / 1024:>12.1f} {retained / entry_count:>8.0f} "
+              f"{peak / 1024 / 1024:>8.1f} {seconds:>7.2f} {dict_retained / retained:>6.1f}x")
+        del snapshot, rescanned
+
+    return 0
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='EMAD Auto-Sync Benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    hash_parser = subparsers.add_parser('hash', help='Cold-scan hashing throughput by worker count')
+    hash_parser.add_argument('--files', type=int, default=2000, help='Number of synthetic files')
+    hash_parser.add_argument('--size-kb', type=int, default=256, help='Size of each file in KB')
+    hash_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8],
+                             help='Worker counts to compare')
+    hash_parser.add_argument('--repeat', type=int, default=3, help='Runs per worker count (best is reported)')
+    hash_parser.set_defaults(func=benchmark_hash)
+
+    walk_parser = subparsers.add_parser('walk', help='Walk time with a large excluded node_modules tree')
+    walk_parser.add_argument('--files', type=int, default=2000, help='Number of project files')
+    walk_parser.add_argument('--node-modules-files', type=int, default=50000, help='Number of files in node_modules')
+    walk_parser.add_argument('--repeat', type=int, default=3, help='Runs per walker (best is reported)')
+    walk_parser.set_defaults(func=benchmark_walk)
+
+    match_parser = subparsers.add_parser('match', help='Per-path exclusion check cost')
+    match_parser.add_argument('--paths', type=int, default=100000, help='Number of paths to check')
+    match_parser.add_argument('--repeat', type=int, default=3, help='Runs per matcher (best is reported)')
+    match_parser.set_defaults(func=benchmark_match)
+
+    upload_parser = subparsers.add_parser('upload', help='Blob upload throughput against a local fake GitHub')
+    upload_parser.add_argument('--files', type=int, default=500, help='Number of synthetic files')
+    upload_parser.add_argument('--size-kb', type=int, default=16, help='Size of each file in KB')
+    upload_parser.add_argument('--latency-ms', type=float, default=50, help='Simulated API round-trip latency')
+    upload_parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16],
+                               help='Upload concurrency levels to compare')
+    upload_parser.set_defaults(func=benchmark_upload)
+
+    e2e_parser = subparsers.add_parser('e2e', help='Full monitor_cycle syncs against a local fake GitHub')
+    e2e_parser.add_argument('--sizes', type=int, nargs='+', default=[100, 10000, 100000],
+                            help='Synthetic tree sizes (files)')
+    e2e_parser.add_argument('--size-bytes', type=int, default=1024, help='Size of each file in bytes')
+    e2e_parser.add_argument('--latency-ms', type=float, default=0, help='Simulated API round-trip latency')
+    e2e_parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE, help='Baseline results file')
+    e2e_parser.add_argument('--time-tolerance', type=float, default=0.5,
+                            help='Allowed wall-time slowdown as a fraction of the baseline')
+    e2e_parser.add_argument('--update-baseline', action='store_true',
+                            help='Record these results as the new baseline instead of comparing')
+    e2e_parser.set_defaults(func=benchmark_e2e)
+
+    memory_parser = subparsers.add_parser('memory', help='Baseline memory: dict vs compact snapshot')
+    memory_parser.add_argument('--entries', type=int, nargs='+', default=[100000, 1000000],
+                               help='Baseline sizes (files)')
+    memory_parser.set_defaults(func=benchmark_memory)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
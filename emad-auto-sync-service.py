@@ -19,6 +19,7 @@ import sys
 import os
 import time
 import logging
+import threading
 from pathlib import Path
 
 try:
@@ -34,6 +35,7 @@ except ImportError:
 # Import the main auto-sync class
 sys.path.insert(0, str(Path(__file__).parent))
 from emad_auto_sync import EMADAutoSync, DEFAULT_BMAD_PATH, DEFAULT_MONITOR_INTERVAL
+from emad_workspace_daemon import EMADWorkspaceDaemon
 
 class EMADAutoSyncService(win32serviceutil.ServiceFramework):
     """Windows service wrapper for EMAD Auto-Sync"""
@@ -96,6 +98,12 @@ class EMADAutoSyncService(win32serviceutil.ServiceFramework):
             # Report that we're running
             self.ReportServiceStatus(win32service.SERVICE_RUNNING)
 
+            # EMAD_WORKSPACES names a workspaces file: monitor all of them from this one service
+            workspaces_file = os.environ.get('EMAD_WORKSPACES')
+            if workspaces_file:
+                self.run_workspace_daemon(Path(workspaces_file))
+                return
+
             # Create and run auto-sync instance
             try:
                 auto_sync = EMADAutoSync(self.bmad_path, self.monitor_interval)
@@ -115,12 +123,12 @@ class EMADAutoSyncService(win32serviceutil.ServiceFramework):
                 self.logger.error(f'Authentication error: {e}')
                 return
 
-            # Initial scan
+            # Load manifest or scan to establish baseline
             try:
-                auto_sync.file_hashes = auto_sync.scan_directory()
-                self.logger.info(f'Baseline established with {len(auto_sync.file_hashes)} files')
+                baseline_count = auto_sync.establish_baseline()
+                self.logger.info(f'Baseline established with {baseline_count} files')
             except Exception as e:
-                self.logger.error(f'Initial scan failed: {e}')
+                self.logger.error(f'Baseline setup failed: {e}')
                 return
 
             # Main monitoring loop
@@ -129,9 +137,12 @@ class EMADAutoSyncService(win32serviceutil.ServiceFramework):
                 try:
                     auto_sync.monitor_cycle()
 
-                    # Wait for next cycle or stop event
+                    # Wait for next cycle (sooner if queued changes are due) or stop event
+                    pending_due = auto_sync.change_queue.due_in()
+                    cycle_wait = self.monitor_interval if pending_due is None else \
+                        min(self.monitor_interval, max(1, int(pending_due + 0.999)))
                     wait_time = 0
-                    while wait_time < self.monitor_interval and self.is_running:
+                    while wait_time < cycle_wait and self.is_running:
                         if win32event.WaitForSingleObject(self.hWaitStop, 1000) == win32event.WAIT_OBJECT_0:
                             self.logger.info('Stop event received')
                             break
@@ -156,6 +167,25 @@ class EMADAutoSyncService(win32serviceutil.ServiceFramework):
                 (self._svc_name_, '')
             )
 
+    def run_workspace_daemon(self, workspaces_file):
+        """Run the multi-workspace daemon until the stop event is set"""
+        try:
+            workspace_daemon = EMADWorkspaceDaemon.from_config(workspaces_file)
+            self.logger.info(f'Created workspace daemon for {len(workspace_daemon.workspaces)} workspaces')
+        except ValueError as e:
+            self.logger.error(f'Failed to create workspace daemon: {e}')
+            return
+
+        # The daemon's loop runs on its own thread so the service can wait for the stop event
+        runner = threading.Thread(target=workspace_daemon.run, name='emad-workspaces')
+        runner.start()
+        while runner.is_alive():
+            if win32event.WaitForSingleObject(self.hWaitStop, 1000) == win32event.WAIT_OBJECT_0:
+                self.logger.info('Stop event received')
+                workspace_daemon.stop()
+                break
+        runner.join()
+
 def run_debug():
     """Run in debug mode (foreground)"""
     print("Running EMAD Auto-Sync in debug mode...")
@@ -163,7 +193,10 @@ def run_debug():
     bmad_path = Path(os.environ.get('EMAD_BMAD_PATH', DEFAULT_BMAD_PATH))
     monitor_interval = int(os.environ.get('EMAD_MONITOR_INTERVAL', DEFAULT_MONITOR_INTERVAL))
     
-    auto_sync = EMADAutoSync(bmad_path, monitor_interval)
+    if os.environ.get('EMAD_WORKSPACES'):
+        auto_sync = EMADWorkspaceDaemon.from_config(Path(os.environ['EMAD_WORKSPACES']))
+    else:
+        auto_sync = EMADAutoSync(bmad_path, monitor_interval)
     
     try:
         auto_sync.run()
@@ -19,50 +19,1026 @@ import os
 import sys
 import json
 import time
+import mmap
+import errno
+import random
+import select
+import struct
+import ctypes
+import ctypes.util
+import base64
 import hashlib
 import logging
+import tempfile
 import requests
 import threading
+from requests.adapters import HTTPAdapter
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait as wait_for_futures
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Set, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Set, Optional, Tuple
 import signal
+import asyncio
 import argparse
 
+# Add current directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+from emad_path_matcher import EMADPathMatcher
+from emad_git_transport import EMADGitTransport, EMADGitError
+from emad_merkle import EMADMerkleTree, FILE_MODE, EXEC_MODE
+from emad_snapshot import EMADSnapshot
+from emad_git_status import EMADGitStatusDetector
+from emad_renames import Rename, exact_renames, similar_candidates, content_similarity, similar_renames
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+
 # Configuration
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN', 'your_github_token_here')
 REPO_NAME = 'EMAD'
-GITHUB_API_BASE = 'https://api.github.com'
+GITHUB_API_BASE = os.getenv('EMAD_GITHUB_API_BASE', 'https://api.github.com')
 DEFAULT_MONITOR_INTERVAL = 3600  # 1 hour in seconds
 DEFAULT_BMAD_PATH = Path(__file__).parent.absolute()
+DEFAULT_HASH_WORKERS = max(1, min((os.cpu_count() or 1) // 2, 4))  # Same formula as emad-intelligent-config.py
+MANIFEST_VERSION = 1
+JOURNAL_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024          # Bytes hashed per update() call
+MMAP_THRESHOLD = 64 * 1024 * 1024      # Files at least this large are hashed through mmap
+UPLOAD_CHUNK_SIZE = 3 * 256 * 1024     # Raw bytes per base64 piece (multiple of 3, no padding)
+RACY_STAT_WINDOW_NS = 2_000_000_000  # Files modified this close to a scan are always rehashed
+HASH_PIPELINE_DEPTH = 4          # Files queued for hashing per hash worker before the walk waits
+DEFAULT_DEBOUNCE_SECONDS = 1     # Quiet time before detected changes are synced
+DEFAULT_MAX_SYNC_LATENCY = 60    # Seconds a change may wait for a quiet period before it is synced anyway
+DEFAULT_UPLOAD_CONCURRENCY = 4
+MAX_UPLOAD_CONCURRENCY = 16  # Keeps parallel writes under GitHub's secondary rate limits
+DEFAULT_MAX_COMMIT_FILES = 1000  # Larger syncs are split into several commits...
+DEFAULT_MAX_COMMIT_MB = 100      # ...as are syncs with more content than this
+DEFAULT_RETRY_ATTEMPTS = 3
+REQUEST_TIMEOUT = (10, 60)      # Seconds to connect, and to wait for the server between bytes
+RETRY_BACKOFF_BASE = 1.0        # Seconds; doubled per attempt, with full jitter
+RATE_LIMIT_PACE_FRACTION = 0.1  # Start spreading requests out below 10% of the hourly budget
+SECONDARY_LIMIT_DELAY = 60      # GitHub asks for at least a minute when no Retry-After is sent
+# One Git Data API commit per cycle, one Contents API commit per file, or one pushed commit per cycle
+SYNC_MODES = ('batch', 'per-file', 'git')
+LARGE_FILE_POLICIES = ('defer', 'skip')  # Files above max_file_size_mb: synced in commits of their own, or not at all
+DETECTORS = ('scan', 'git-status')  # Walk and stat the tree, or ask git status what changed
+SYNC_ENGINES = ('threads', 'httpx')  # Requests sent by requests.Session, or by httpx on one event loop
+
+PR_POLL_INITIAL_DELAY = 0.5     # Seconds before the first mergeability re-check, doubled per poll
+PR_POLL_MAX_DELAY = 4.0
+PR_MERGEABLE_TIMEOUT = 30.0     # Give up waiting and try the merge anyway
+FAST_FORWARD_ATTEMPTS = 3       # Direct push: main can move between reading its head and updating it
+
+StatKey = Tuple[int, int, int, int]  # (size, mtime_ns, inode, ctime_ns)
+RemoteEntry = Tuple[str, str, Optional[int]]  # (blob SHA, mode, size) in a remote tree
+
+# Generated configs that tune the daemon; later files override earlier ones
+SETTINGS_FILES = [
+    Path('.emad') / 'project-config.json',           # emad-project-templates.py
+    Path('config') / 'emad-intelligent-config.json'  # emad-intelligent-config.py
+]
+
+def load_sync_settings(bmad_path: Path) -> Dict[str, Dict[str, Any]]:
+    """Merge the monitoring, sync and performance sections of the generated configs"""
+    settings = {'monitoring': {}, 'sync': {}, 'performance': {}}
+    
+    for relative_path in SETTINGS_FILES:
+        config_path = Path(bmad_path) / relative_path
+        if not config_path.exists():
+            continue
+        
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.getLogger(__name__).warning(f'Ignoring unreadable config {config_path}: {e}')
+            continue
+        
+        for section, values in settings.items():
+            if isinstance(config.get(section), dict):
+                values.update(config[section])
+    
+    return settings
+
+def write_json_atomic(path: Path, data) -> None:
+    """Write JSON to a temporary file and rename it over the target"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+class EMADStreamingUploadBody:
+    """File-like JSON request body that base64-encodes a file while it is sent
+
+    The body is ``fields`` serialised as a JSON object with the file's base64
+    content appended as ``content_key``. Its length is known up front, so
+    requests sends it with a Content-Length header, and only one chunk of the
+    file is held in memory at a time.
+    """
+
+    def __init__(self, file_path: Path, fields: Dict[str, Any], content_key: str = 'content'):
+        self.file_path = Path(file_path)
+        self.file_size = self.file_path.stat().st_size
+        
+        encoded_fields = json.dumps(fields)[:-1]
+        separator = ', ' if fields else ''
+        self._prefix = f'{encoded_fields}{separator}"{content_key}": "'.encode('utf-8')
+        self._suffix = b'"}'
+        self.len = len(self._prefix) + 4 * ((self.file_size + 2) // 3) + len(self._suffix)
+        
+        self._file = None
+        self.seek(0)
+
+    def __len__(self) -> int:
+        return self.len
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        """Rewind to the start (the only supported seek, used when retrying a request)"""
+        if offset != 0 or whence != 0:
+            raise OSError('EMADStreamingUploadBody only supports seek(0)')
+        self.close()
+        self._pieces = self._generate_pieces()
+        self._piece = b''
+        self._offset = 0
+        return 0
+
+    def tell(self) -> int:
+        """Report the start position so requests can rewind the body on redirects"""
+        return 0
+
+    def _generate_pieces(self):
+        yield self._prefix
+        
+        self._file = open(self.file_path, 'rb')
+        remaining = self.file_size
+        while remaining > 0:
+            chunk = self._file.read(min(UPLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                raise OSError(f'{self.file_path} shrank while it was being uploaded')
+            remaining -= len(chunk)
+            yield base64.b64encode(chunk)
+        self.close()
+        
+        yield self._suffix
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            rest = [self._piece[self._offset:]]
+            rest.extend(self._pieces)
+            self._piece, self._offset = b'', 0
+            return b''.join(rest)
+        
+        while self._offset >= len(self._piece):
+            self._piece = next(self._pieces, None)
+            self._offset = 0
+            if self._piece is None:
+                self._piece = b''
+                return b''
+        
+        data = self._piece[self._offset:self._offset + size]
+        self._offset += len(data)
+        return data
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class EMADRequestScheduler:
+    """Single gateway for GitHub API calls: rate-limit budget, pacing and retries
+
+    Every response updates the budget from the X-RateLimit-* headers. Below
+    pace_fraction of the limit, requests are spread evenly over the time left
+    until the reset; once the budget is spent, they wait for the reset.
+    Connection errors, 5xx, 429 and 403 rate-limit responses are retried up
+    to retry_attempts times, honouring Retry-After and otherwise backing off
+    exponentially with full jitter. Waits are shared, so every thread backs
+    off together. Streaming bodies are rewound before each retry. Requests
+    without a timeout of their own get the (connect, read) timeout, so a
+    stalled connection fails and is retried instead of hanging the sync.
+
+    Returned responses are the final attempt; callers keep their own status
+    handling. Connection errors are re-raised once retries are exhausted.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, session: requests.Session, logger: logging.Logger,
+                 retry_attempts: int = DEFAULT_RETRY_ATTEMPTS, backoff_base: float = RETRY_BACKOFF_BASE,
+                 backoff_max: float = 30.0, pace_fraction: float = RATE_LIMIT_PACE_FRACTION,
+                 secondary_delay: float = SECONDARY_LIMIT_DELAY, timeout: Tuple[float, float] = REQUEST_TIMEOUT):
+        self.session = session
+        self.logger = logger
+        self.retry_attempts = max(0, retry_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pace_fraction = pace_fraction
+        self.secondary_delay = secondary_delay
+        self.timeout = timeout
+        self.sleep = time.sleep  # Replaceable in tests
+        self.clock = time.time   # X-RateLimit-Reset is in epoch seconds
+        self.lock = threading.Lock()
+
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[float] = None
+        self.blocked_until = 0.0
+        self.next_slot = 0.0
+        self.in_flight = 0  # Reserved requests without a response yet
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0, 'throttled': 0, 'throttle_seconds': 0.0}
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request('PUT', url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.Response:
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request('DELETE', url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request once the budget allows it, retrying transient failures"""
+        attempt = 0
+        while True:
+            try:
+                self._throttle(self._reserve())
+                self._start_attempt(attempt, kwargs)
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                retry = self._finish_attempt(method, url, attempt, error=e)
+            except BaseException:
+                self._release()
+                raise
+            else:
+                retry = self._finish_attempt(method, url, attempt, response=response)
+            if not retry:
+                return response
+            attempt += 1
+
+    def _start_attempt(self, attempt: int, kwargs: Dict[str, Any]):
+        kwargs.setdefault('timeout', self.timeout)
+        body = kwargs.get('data')
+        if attempt and hasattr(body, 'seek'):
+            body.seek(0)
+        with self.lock:
+            self.stats['requests'] += 1
+
+    def _finish_attempt(self, method: str, url: str, attempt: int, response=None,
+                        error: Optional[Exception] = None) -> bool:
+        """Book the outcome of one attempt: True to retry it once the shared wait is over
+
+        Shared by both engines' request loops, which only differ in how they
+        wait and send. A final response is left to the caller; a connection
+        error is re-raised once the retries are spent.
+        """
+        if response is not None:
+            self._update_budget(response)
+        self._release()
+
+        if response is not None:
+            delay = self._retry_delay(response, attempt)
+            if delay is None:
+                return False
+            outcome = f'returned {response.status_code}'
+        else:
+            delay = self._backoff(attempt)
+            outcome = f'failed ({error.__class__.__name__})'
+
+        if attempt >= self.retry_attempts:
+            with self.lock:
+                self.stats['failures'] += 1
+            if error is not None:
+                raise error
+            return False
+
+        self.logger.warning(f'{method} {url} {outcome}, retrying in {delay:.1f}s ({attempt + 1}/{self.retry_attempts})')
+        if response is not None:
+            response.close()
+        with self.lock:
+            self.stats['retries'] += 1
+            self.blocked_until = max(self.blocked_until, self.clock() + delay)
+        return True
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _retry_delay(self, response: requests.Response, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying, or None if the response is final"""
+        status = response.status_code
+        if status not in self.RETRY_STATUSES and status != 403:
+            return None
+
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is not None:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                pass
+
+        if status == 403 or status == 429:
+            if response.headers.get('X-RateLimit-Remaining') == '0' and self.reset_at is not None:
+                return max(0.0, self.reset_at - self.clock()) + 1  # Primary limit: wait for the reset
+            if 'secondary rate limit' in response.text.lower():
+                return max(self.secondary_delay, self._backoff(attempt))
+            if status == 403:
+                return None  # A real permission error
+        return self._backoff(attempt)
+
+    def _update_budget(self, response: requests.Response):
+        headers = response.headers
+        try:
+            limit = int(headers['X-RateLimit-Limit'])
+            remaining = int(headers['X-RateLimit-Remaining'])
+            reset_at = float(headers['X-RateLimit-Reset'])
+        except (KeyError, ValueError):
+            return
+
+        with self.lock:
+            # The server had not necessarily seen the other requests in flight, so
+            # count them as spent; within one window the lowest estimate wins
+            remaining -= self.in_flight - 1
+            if self.reset_at == reset_at and self.remaining is not None:
+                remaining = min(remaining, self.remaining)
+            self.limit, self.remaining, self.reset_at = limit, max(0, remaining), reset_at
+
+    def _release(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def _reserve(self) -> float:
+        """Claim a slot in the budget and return how long to wait for it"""
+        with self.lock:
+            self.in_flight += 1
+            now = self.clock()
+            wait = max(0.0, self.blocked_until - now)
+
+            if self.reset_at is not None and now >= self.reset_at:
+                self.remaining = None  # New window; the next response reports the budget
+                self.reset_at = None
+
+            if self.remaining is not None and self.reset_at is not None:
+                if self.remaining <= 0:
+                    wait = max(wait, self.reset_at - now + 1)
+                elif self.limit and self.remaining < self.limit * self.pace_fraction:
+                    start = max(now + wait, self.next_slot)
+                    self.next_slot = start + (self.reset_at - now) / self.remaining
+                    wait = start - now
+                    self.remaining -= 1  # Count requests in flight before their responses arrive
+                else:
+                    self.remaining -= 1
+
+            return wait
+
+    def _throttle(self, wait: float):
+        if wait <= 0:
+            return
+        with self.lock:
+            self.stats['throttled'] += 1
+            self.stats['throttle_seconds'] += wait
+        if wait >= 1:
+            self.logger.info(f'Waiting {wait:.1f}s for the GitHub API rate limit')
+        self.sleep(wait)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Request counters plus the last known rate-limit budget"""
+        with self.lock:
+            return dict(self.stats, limit=self.limit, remaining=self.remaining,
+                        reset_at=self.reset_at)
+
+
+class EMADWatchLimitError(OSError):
+    """Raised when the OS refuses to add more filesystem watches"""
+
+class _InotifyBackend:
+    """Recursive inotify watcher implemented directly on libc through ctypes"""
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                  IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+    EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, name length
+
+    name = 'inotify'
+
+    def __init__(self, watcher: 'EMADChangeWatcher'):
+        self.watcher = watcher
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self.libc.inotify_init1.argtypes = [ctypes.c_int]
+        self.libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = -1
+        self.watch_dirs: Dict[int, Path] = {}
+        self.thread = None
+        self._wake_read, self._wake_write = -1, -1
+
+    @staticmethod
+    def is_supported() -> bool:
+        return sys.platform.startswith('linux') and ctypes.util.find_library('c') is not None
+
+    def start(self):
+        self.fd = self.libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f'inotify_init1 failed: {os.strerror(err)}')
+        self._wake_read, self._wake_write = os.pipe()
+        self.add_watch_tree(self.watcher.root)
+        self.thread = threading.Thread(target=self._read_loop, name='emad-inotify', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self._wake_write >= 0:
+            os.write(self._wake_write, b'x')
+        if self.thread:
+            self.thread.join(timeout=5)
+            self.thread = None
+        for fd in (self.fd, self._wake_read, self._wake_write):
+            if fd >= 0:
+                os.close(fd)
+        self.fd = self._wake_read = self._wake_write = -1
+        self.watch_dirs.clear()
+
+    def _add_watch(self, directory: Path) -> int:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), self.WATCH_MASK | self.IN_ONLYDIR)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), str(directory))
+        return wd
+
+    def add_watch_tree(self, top: Path):
+        """Watch top and every non-excluded directory below it"""
+        for dir_path, dir_names, _ in os.walk(top):
+            directory = Path(dir_path)
+            dir_names[:] = [name for name in dir_names
+                            if not self.watcher.should_exclude(directory / name)]
+            try:
+                self.watch_dirs[self._add_watch(directory)] = directory
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    raise EMADWatchLimitError(
+                        f'inotify watch limit reached while watching {directory} '
+                        f'(raise fs.inotify.max_user_watches)') from e
+                if e.errno not in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                    raise
+
+    def _read_loop(self):
+        while True:
+            try:
+                readable, _, _ = select.select([self.fd, self._wake_read], [], [])
+            except (OSError, ValueError):
+                return
+            if self._wake_read in readable:
+                return
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError as e:
+                self.watcher.mark_overflow(f'inotify read failed: {e}')
+                return
+            self._handle_events(data)
+
+    def _handle_events(self, data: bytes):
+        offset = 0
+        while offset + self.EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = data[offset:offset + name_length].rstrip(b'\0')
+            offset += name_length
+
+            if mask & self.IN_Q_OVERFLOW:
+                self.watcher.mark_overflow('inotify event queue overflowed')
+                continue
+            if mask & self.IN_IGNORED:
+                self.watch_dirs.pop(wd, None)
+                continue
+
+            directory = self.watch_dirs.get(wd)
+            if directory is None:
+                continue
+            path = directory / os.fsdecode(name) if name else directory
+            self.watcher.mark_dirty(path)
+
+            # New directories need their own watches; anything created inside them
+            # before the watch existed is covered by marking the directory dirty
+            if mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                if not self.watcher.should_exclude(path):
+                    try:
+                        self.add_watch_tree(path)
+                    except EMADWatchLimitError as e:
+                        self.watcher.mark_overflow(str(e))
+
+class _WatchdogBackend:
+    """Watcher backed by the optional watchdog package"""
+
+    name = 'watchdog'
+
+    def __init__(self, watcher: 'EMADChangeWatcher'):
+        self.watcher = watcher
+        self.observer = None
+
+    @staticmethod
+    def is_supported() -> bool:
+        return WATCHDOG_AVAILABLE
+
+    def start(self):
+        watcher = self.watcher
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory and event.event_type == 'modified':
+                    return
+                watcher.mark_dirty(Path(event.src_path))
+                dest_path = getattr(event, 'dest_path', None)
+                if dest_path:
+                    watcher.mark_dirty(Path(dest_path))
+
+        self.observer = Observer()
+        self.observer.schedule(Handler(), str(watcher.root), recursive=True)
+        self.observer.start()
+
+    def stop(self):
+        if self.observer:
+            self.observer.stop()
+            self.observer.join(timeout=5)
+            self.observer = None
+
+class EMADChangeWatcher:
+    """Collects paths touched under a root so only those need rescanning
+
+    should_exclude(path) is called for event paths and for directories before
+    they are watched. Backends are tried in order: watchdog (optional dependency), then a
+    ctypes inotify implementation on Linux. Queue overflows and watch-limit
+    exhaustion are reported through drain() as a request for a full rescan.
+    """
+
+    BACKENDS = {'watchdog': _WatchdogBackend, 'inotify': _InotifyBackend}
+
+    def __init__(self, root: Path, should_exclude, logger: logging.Logger, backend: str = 'auto'):
+        self.root = Path(root)
+        self.should_exclude = should_exclude
+        self.logger = logger
+        self.requested_backend = backend
+        self.backend = None
+        self._lock = threading.Lock()
+        self._pending = threading.Event()
+        self._dirty: Set[str] = set()
+        self._overflow = False
+        self.listeners: List[Callable[[], None]] = []  # Called from watcher threads when changes are pending
+
+    @property
+    def active(self) -> bool:
+        return self.backend is not None
+
+    def start(self) -> bool:
+        """Start watching; returns False if no backend could be started"""
+        names = ['watchdog', 'inotify'] if self.requested_backend == 'auto' else [self.requested_backend]
+        
+        for name in names:
+            backend_class = self.BACKENDS.get(name)
+            if backend_class is None or not backend_class.is_supported():
+                continue
+            
+            backend = backend_class(self)
+            try:
+                backend.start()
+            except Exception as e:
+                self.logger.warning(f'Could not start {name} watcher: {e}')
+                backend.stop()
+                continue
+            
+            self.backend = backend
+            self.logger.info(f'Watching {self.root} for changes using {name}')
+            return True
+        
+        self.logger.warning('No filesystem watcher available, using periodic scans')
+        return False
+
+    def stop(self):
+        if self.backend:
+            self.backend.stop()
+            self.backend = None
+        self._notify()
+
+    def _notify(self):
+        self._pending.set()
+        for listener in self.listeners:
+            listener()
+
+    def mark_dirty(self, path: Path):
+        """Record a touched path (absolute) relative to the watched root"""
+        try:
+            relative_path = str(path.relative_to(self.root))
+        except ValueError:
+            return
+        if relative_path == '.' or self.should_exclude(path):
+            return
+        with self._lock:
+            self._dirty.add(relative_path)
+        self._notify()
+
+    def mark_overflow(self, reason: str):
+        """Events were lost; the next drain() asks for a full rescan"""
+        self.logger.warning(f'Filesystem watcher lost events ({reason}), scheduling a full rescan')
+        with self._lock:
+            self._overflow = True
+        self._notify()
+
+    def wait(self, timeout: float) -> bool:
+        """Block until changes are pending or timeout elapses"""
+        return self._pending.wait(timeout)
+
+    def drain(self) -> Tuple[Set[str], bool]:
+        """Return (dirty paths, full rescan needed) and reset the pending state"""
+        with self._lock:
+            dirty, overflow = self._dirty, self._overflow
+            self._dirty, self._overflow = set(), False
+            self._pending.clear()
+        return dirty, overflow
+
+class EMADChangeQueue:
+    """Coalesces detected changes until the workspace has been quiet
+
+    Changes are held until nothing new has arrived for debounce_seconds, or
+    until the oldest one has waited max_latency_seconds, so a burst such as a
+    checkout or a code generator becomes one sync. Each path keeps one net
+    change: repeated edits collapse, an add followed by a delete cancels out
+    and a delete followed by an add becomes a modification.
+    """
+
+    def __init__(self, debounce_seconds: float = DEFAULT_DEBOUNCE_SECONDS,
+                 max_latency_seconds: float = DEFAULT_MAX_SYNC_LATENCY):
+        self.debounce_seconds = max(0.0, debounce_seconds)
+        self.max_latency_seconds = max(self.debounce_seconds, max_latency_seconds)
+        self.clock = time.time  # Comparable with file mtimes; replaceable in tests
+        self.pending: Dict[str, str] = {}  # path -> 'added', 'modified' or 'deleted'
+        self.first_change: Optional[float] = None
+        self.last_change: Optional[float] = None
+        self.hold_until = 0.0  # Retry delay after a failed sync
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    @staticmethod
+    def combine(earlier: Optional[str], later: str) -> Optional[str]:
+        """Net effect of two changes to one path; None when they cancel out"""
+        if earlier == 'added':
+            return None if later == 'deleted' else 'added'
+        if earlier == 'deleted' and later != 'deleted':
+            return 'modified'
+        return later
+
+    def add(self, changes: Dict[str, List[str]], changed_at: Optional[float] = None):
+        """Queue a detect_changes() result; changed_at is when the newest change happened"""
+        now = self.clock()
+        changed_at = now if changed_at is None else min(changed_at, now)
+        touched = False
+        
+        for kind in ('added', 'modified', 'deleted'):
+            for file_path in changes.get(kind, []):
+                touched = True
+                combined = self.combine(self.pending.get(file_path), kind)
+                if combined is None:
+                    del self.pending[file_path]
+                else:
+                    self.pending[file_path] = combined
+        
+        if touched:
+            if self.first_change is None:
+                self.first_change = now
+            self.last_change = changed_at if self.last_change is None else max(self.last_change, changed_at)
+        if not self.pending:
+            self.first_change = self.last_change = None
+
+    def requeue(self, changes: Dict[str, List[str]], hold_seconds: float = 0.0):
+        """Put back changes whose sync failed, ahead of anything queued since
+
+        They become due again no sooner than hold_seconds from now.
+        """
+        later, later_first, later_last = self.pending, self.first_change, self.last_change
+        self.pending, self.first_change, self.last_change = {}, None, None
+        self.add(changes)
+        for file_path, kind in later.items():
+            combined = self.combine(self.pending.get(file_path), kind)
+            if combined is None:
+                self.pending.pop(file_path, None)
+            else:
+                self.pending[file_path] = combined
+        
+        if later_last is not None:
+            self.first_change = min(self.first_change or later_first, later_first)
+            self.last_change = max(self.last_change or later_last, later_last)
+        if self.pending:
+            self.hold_until = self.clock() + hold_seconds
+        else:
+            self.first_change = self.last_change = None
+
+    def due_in(self) -> Optional[float]:
+        """Seconds until the queued changes should be synced, None if nothing is queued"""
+        if not self.pending:
+            return None
+        due = min(self.last_change + self.debounce_seconds, self.first_change + self.max_latency_seconds)
+        return max(0.0, due - self.clock(), self.hold_until - self.clock())
+
+    def ready(self) -> bool:
+        return self.due_in() == 0.0
+
+    def drain(self) -> Dict[str, List[str]]:
+        """Take every queued change, in detect_changes() form"""
+        changes = {'added': [], 'modified': [], 'deleted': []}
+        for file_path, kind in sorted(self.pending.items()):
+            changes[kind].append(file_path)
+        self.pending = {}
+        self.first_change = self.last_change = None
+        return changes
+
+class EMADUploadPipeline:
+    """Uploads the blobs of changed files while the scan that finds them is still running
+
+    offer() blocks while limit uploads are in flight, so a fast scan never
+    runs further ahead of the network than that. Blobs are collected by the
+    SHA-256 they were offered for; one whose returned SHA differs from the
+    blob SHA the scan computed (the file changed in between) is dropped and
+    left for the regular upload. Failed uploads are dropped the same way.
+    """
+
+    def __init__(self, submit: Callable[[str], Future], limit: int, known_blobs: Set[str]):
+        self.submit = submit
+        self.slots = threading.BoundedSemaphore(limit)
+        self.known_blobs = known_blobs  # Blob SHAs the repository already holds
+        self.offered: Set[str] = set()
+        self.in_flight: Set[Future] = set()
+        self.blob_shas: Dict[str, str] = {}  # sha256 -> uploaded blob SHA
+        self.lock = threading.Lock()
+        self.executor: Optional[ThreadPoolExecutor] = None  # Shut down by whoever created it
+
+    def offer(self, file_path: str, file_hash: str, expected_blob_sha: Optional[str]):
+        """Start uploading file_path unless its content is already uploaded, offered or in the repository"""
+        if file_hash in self.offered or expected_blob_sha in self.known_blobs:
+            return
+        self.offered.add(file_hash)
+        self.slots.acquire()
+        try:
+            future = self.submit(file_path)
+        except Exception:
+            self.slots.release()
+            raise
+        with self.lock:
+            self.in_flight.add(future)
+        future.add_done_callback(lambda done: self._finished(done, file_hash, expected_blob_sha))
+
+    def _finished(self, future: Future, file_hash: str, expected_blob_sha: Optional[str]):
+        blob_sha = None
+        if not future.cancelled() and future.exception() is None:
+            blob_sha = future.result()
+        with self.lock:
+            self.in_flight.discard(future)
+            if blob_sha and expected_blob_sha in (None, blob_sha):
+                self.blob_shas[file_hash] = blob_sha
+        self.slots.release()
+
+    def finish(self) -> Dict[str, str]:
+        """Wait for the uploads still running and return sha256 -> blob SHA of those that succeeded"""
+        with self.lock:
+            running = list(self.in_flight)
+        wait_for_futures(running)
+        return self.blob_shas
+
+class _WorkspaceLogger(logging.LoggerAdapter):
+    """Prefixes log lines with the workspace they are about"""
+
+    def process(self, msg, kwargs):
+        return f'[{self.extra}] {msg}', kwargs
 
 class EMADAutoSync:
-    def __init__(self, bmad_path: Path, monitor_interval: int = DEFAULT_MONITOR_INTERVAL):
+    def __init__(self, bmad_path: Path, monitor_interval: int = DEFAULT_MONITOR_INTERVAL,
+                 hash_workers: Optional[int] = None, watch: Optional[bool] = None,
+                 sync_mode: Optional[str] = None, api_base: str = GITHUB_API_BASE,
+                 upload_concurrency: Optional[int] = None, blob_hashes: Optional[bool] = None,
+                 repository: Optional[str] = None, workspace: Optional[str] = None, shared=None,
+                 direct_push: Optional[bool] = None, detector: Optional[str] = None):
         self.bmad_path = Path(bmad_path)
+        # Set when one daemon syncs several workspaces: a name that tags log lines
+        # and pool metrics, and the pools, session and scheduler they all share
+        self.workspace = workspace
+        self.shared = shared
+        self.root_prefix = os.path.abspath(self.bmad_path)
         self.monitor_interval = monitor_interval
         self.running = False
         self.username = None
-        self.file_hashes = {}
+        self._file_hashes = EMADSnapshot(os.sep)
+        self._merkle: Optional[EMADMerkleTree] = None
+        # path -> (stat key, sha256) from the last scan; lets unchanged files skip rehashing
+        self.stat_cache: Dict[str, Tuple[StatKey, str]] = {}
+        self.executables: Set[str] = set()  # Scanned files with the exec bit set, committed as mode 100755
+        self.scan_stats = {'skipped': 0, 'rehashed': 0}
+        self.sync_stats = {'synced_changes': 0, 'syncs': 0, 'failed_syncs': 0}
+        self.manifest_path = self.bmad_path / '.emad' / 'sync-manifest.json'
+        # Write-ahead record of the sync in progress: branch, per-file progress, uploaded blobs, PR
+        self.journal_path = self.bmad_path / '.emad' / 'sync-journal.json'
+        self.journal: Optional[Dict[str, Any]] = None
         self.excluded_patterns = {
             '.git', '__pycache__', 'node_modules', '.vscode', '.DS_Store',
-            '*.log', '*.tmp', '*.temp', '.env', '.env.*'
+            '*.log', '*.tmp', '*.temp', '.env', '.env.*', '.emad'
         }
         
         # Setup logging
         self.setup_logging()
         
+        # Tuning from the generated project/intelligent configs
+        self.settings = load_sync_settings(self.bmad_path)
+        self.hash_workers = max(1, int(hash_workers or self.settings['performance'].get('worker_count')
+                                       or DEFAULT_HASH_WORKERS))
+        
+        # Built-in exclusions plus the generated include/exclude globs and .gitignore rules
+        monitoring = self.settings['monitoring']
+        self.matcher = EMADPathMatcher.for_workspace(
+            self.bmad_path,
+            exclude_patterns=sorted(self.excluded_patterns) + list(monitoring.get('exclude_patterns', [])),
+            include_patterns=monitoring.get('include_patterns'),
+            use_gitignore=monitoring.get('respect_gitignore', True)
+        )
+        
+        # Event-driven mode: a watcher feeds dirty paths and monitor_interval
+        # becomes the interval of the safety-net full scan
+        self.watch_mode = bool(self.settings['monitoring'].get('watch_mode', False) if watch is None else watch)
+        self.watcher: Optional[EMADChangeWatcher] = None
+        self.last_full_scan = 0.0
+        
+        # git-status detection: in a git worktree, only what git status reports (plus untracked
+        # and ignored paths) is rescanned instead of the whole tree
+        self.detector = detector or monitoring.get('detector', 'scan')
+        self.git_status: Optional[EMADGitStatusDetector] = None
+        if self.detector not in DETECTORS:
+            self.logger.warning(f'Unknown change detector {self.detector!r}, using scan')
+            self.detector = 'scan'
+        if self.detector == 'git-status':
+            if EMADGitStatusDetector.is_available(self.bmad_path):
+                self.git_status = EMADGitStatusDetector(self.bmad_path, self.logger)
+            else:
+                self.logger.warning(f'{self.bmad_path} is not in a git worktree (or git is missing), using scan')
+                self.detector = 'scan'
+        
+        # Detected changes wait here until the workspace settles, so a burst syncs once
+        self.change_queue = EMADChangeQueue(
+            float(monitoring.get('debounce_seconds', DEFAULT_DEBOUNCE_SECONDS)),
+            float(monitoring.get('max_latency_seconds', DEFAULT_MAX_SYNC_LATENCY))
+        )
+        
+        # Git blob SHA-1s computed alongside SHA-256 let the sync skip content GitHub
+        # already has and fill in update SHAs without asking for them
+        self.blob_hashes = bool(self.settings['sync'].get('git_blob_hashes', True)
+                                if blob_hashes is None else blob_hashes)
+        self.blob_sha_index: Dict[str, str] = {}    # sha256 -> git blob SHA of scanned content
+        self.remote_blob_shas: Dict[str, str] = {}  # path -> git blob SHA as last synced
+        
+        # Mirror of main's tree, fetched once per tree SHA; answers every remote SHA lookup
+        self.remote_tree: Optional[Tuple[str, Dict[str, RemoteEntry]]] = None  # (tree SHA, path -> entry)
+        self.remote_head: Optional[Tuple[str, str]] = None  # (commit SHA, tree SHA) of main this cycle
+        self.committed_tree: Optional[Tuple[str, Dict[str, RemoteEntry]]] = None  # Tree written this cycle
+        
+        # Batch mode writes each cycle as one commit through the Git Data API;
+        # per-file mode keeps the original one-Contents-API-commit-per-file flow;
+        # git mode commits with git plumbing and pushes, when bmad_path is a checkout
+        self.sync_mode = sync_mode or self.settings['sync'].get('sync_mode', 'batch')
+        if self.sync_mode not in SYNC_MODES:
+            self.logger.warning(f'Unknown sync mode {self.sync_mode!r}, using batch')
+            self.sync_mode = 'batch'
+        self.git: Optional[EMADGitTransport] = None
+        self.git_pull_requests = bool(self.settings['sync'].get('git_pull_requests', False))
+        if self.sync_mode == 'git':
+            if EMADGitTransport.is_available(self.bmad_path):
+                self.git = EMADGitTransport(self.bmad_path, self.logger,
+                                            remote=self.settings['sync'].get('git_remote', 'origin'))
+            else:
+                self.logger.warning(f'{self.bmad_path} is not a git checkout (or git is missing), using batch')
+                self.sync_mode = 'batch'
+        
+        # Direct-push mode commits each batch straight onto main (fast-forward only) instead of
+        # going through a branch and an auto-merged pull request
+        self.direct_push = bool(self.settings['sync'].get('direct_push', False) if direct_push is None
+                                else direct_push)
+        if self.direct_push and self.sync_mode != 'batch':
+            if self.sync_mode == 'per-file':
+                self.logger.warning('Direct push needs batch mode, per-file syncs still go through pull requests')
+            self.direct_push = False
+        
+        # Concurrent blob uploads in batch mode, capped to stay clear of secondary rate limits
+        requested_concurrency = int(upload_concurrency or self.settings['sync'].get('upload_concurrency')
+                                    or DEFAULT_UPLOAD_CONCURRENCY)
+        self.upload_concurrency = max(1, min(requested_concurrency, MAX_UPLOAD_CONCURRENCY))
+        if self.upload_concurrency != requested_concurrency:
+            self.logger.warning(f'Upload concurrency {requested_concurrency} out of range, '
+                                f'using {self.upload_concurrency}')
+        
+        # Batch mode starts uploading the blobs of changed files while the scan is still
+        # running, so the network is busy while the disk is instead of after it
+        self.pipeline_uploads = bool(self.settings['sync'].get('pipeline_uploads', True))
+        self.prefetched_blobs: Dict[str, str] = {}  # sha256 -> blob SHA uploaded during a scan
+        
+        # Deleted and added files with the same content are reported as renames; above 0, files
+        # at least this similar (0-1) are too, at the cost of downloading the old blobs to compare
+        self.rename_similarity = min(1.0, max(0.0, float(self.settings['sync'].get('rename_similarity', 0))))
+        
+        # Batch syncs are split into commits of at most this many files and bytes, so a failure
+        # keeps the commits already written; files above monitoring.max_file_size_mb are
+        # deferred to commits of their own after the rest, or skipped
+        self.max_commit_files = max(1, int(self.settings['sync'].get('max_commit_files', DEFAULT_MAX_COMMIT_FILES)))
+        self.max_commit_bytes = int(float(self.settings['sync'].get('max_commit_mb', DEFAULT_MAX_COMMIT_MB))
+                                    * 1024 * 1024)
+        max_file_size_mb = monitoring.get('max_file_size_mb')
+        self.max_file_size = int(float(max_file_size_mb) * 1024 * 1024) if max_file_size_mb else None
+        self.large_file_policy = self.settings['sync'].get('large_file_policy', 'defer')
+        if self.large_file_policy not in LARGE_FILE_POLICIES:
+            self.logger.warning(f'Unknown large file policy {self.large_file_policy!r}, using defer')
+            self.large_file_policy = 'defer'
+        
+        # owner/name of the synced repository; defaults to the authenticated user's EMAD
+        self.repository = repository or self.settings['sync'].get('repository')
+        
         # Setup GitHub session
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.api_base = api_base.rstrip('/')
+        if self.shared is not None:
+            # One connection pool and one rate-limit budget for every workspace of the daemon
+            self.session, self.api = self.shared.session, self.shared.api
+        else:
+            # Every API call goes through the scheduler for rate limiting and retries
+            self.session, self.api = self.create_transport(
+                retry_attempts=int(self.settings['sync'].get('retry_attempts', DEFAULT_RETRY_ATTEMPTS)),
+                backoff_max=float(self.settings['sync'].get('retry_delay_seconds', 30))
+            )
+        # A failed sync is retried from the journal after this long
+        self.sync_retry_delay = float(self.settings['sync'].get('retry_delay_seconds', 30))
+        
+        # Setup signal handlers for graceful shutdown (a multi-workspace daemon installs its own)
+        if self.shared is None:
+            signal.signal(signal.SIGINT, self.signal_handler)
+            signal.signal(signal.SIGTERM, self.signal_handler)
+
+    def create_transport(self, **policy) -> Tuple[requests.Session, EMADRequestScheduler]:
+        """The session sending API requests and the scheduler every call goes through
+
+        policy is passed on to the scheduler (retry_attempts, backoff_max).
+        """
+        session = self.create_session(self.upload_concurrency)
+        return session, EMADRequestScheduler(session, self.logger, **policy)
+
+    @staticmethod
+    def api_headers() -> Dict[str, str]:
+        """Headers of every GitHub API request"""
+        return {
             'Authorization': f'Bearer {GITHUB_TOKEN}',
             'Accept': 'application/vnd.github+json',
             'X-GitHub-Api-Version': '2022-11-28',
             'User-Agent': 'EMAD-Auto-Sync-Monitor'
-        })
-        
-        # Setup signal handlers for graceful shutdown
-        signal.signal(signal.SIGINT, self.signal_handler)
-        signal.signal(signal.SIGTERM, self.signal_handler)
+        }
+
+    @staticmethod
+    def create_session(pool_size: int) -> requests.Session:
+        """GitHub API session keeping up to pool_size connections alive"""
+        session = requests.Session()
+        # One kept-alive connection per upload thread; pool_block makes extra
+        # threads wait for a connection instead of opening throwaway ones
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update(EMADAutoSync.api_headers())
+        return session
 
     def setup_logging(self):
         """Setup comprehensive logging"""
@@ -81,6 +1057,8 @@ class EMADAutoSync:
         )
         
         self.logger = logging.getLogger(__name__)
+        if self.workspace:
+            self.logger = _WorkspaceLogger(self.logger, self.workspace)
 
     def signal_handler(self, signum, frame):
         """Handle shutdown signals gracefully"""
@@ -90,7 +1068,7 @@ class EMADAutoSync:
     def authenticate(self) -> bool:
         """Authenticate with GitHub and get user info"""
         try:
-            response = self.session.get(f'{GITHUB_API_BASE}/user')
+            response = self.api.get(f'{self.api_base}/user')
             
             if response.status_code == 200:
                 user = response.json()
@@ -104,96 +1082,1167 @@ class EMADAutoSync:
             self.logger.error(f'Authentication error: {e}')
             return False
 
+    @property
+    def repo_api(self) -> str:
+        """API URL of the synced repository"""
+        return f'{self.api_base}/repos/{self.repository or f"{self.username}/{REPO_NAME}"}'
+
+    def relative_path(self, path: Path) -> Optional[str]:
+        """Path relative to bmad_path, or None if it lies outside"""
+        path_str = str(path) if os.path.isabs(path) else os.path.abspath(path)
+        root_str = self.root_prefix
+        if path_str == root_str:
+            return ''
+        if path_str.startswith(root_str) and path_str[len(root_str):len(root_str) + 1] == os.sep:
+            return path_str[len(root_str) + 1:]
+        return None
+
+    def is_excluded(self, relative_path: str, is_dir: bool = False) -> bool:
+        """Exclusion check for a path whose parent directories were already accepted"""
+        if self.matcher.is_excluded(relative_path, is_dir):
+            return True
+        return not is_dir and not self.matcher.is_included(relative_path)
+
     def should_exclude_file(self, file_path: Path) -> bool:
         """Check if file should be excluded from monitoring"""
-        file_str = str(file_path)
+        relative_path = self.relative_path(file_path)
+        if not relative_path:
+            return True
+        return self.matcher.is_path_excluded(relative_path) or not self.matcher.is_included(relative_path)
+
+    def should_exclude_dir(self, dir_path: Path) -> bool:
+        """Check if a path (typically a directory) is excluded, ignoring include patterns"""
+        relative_path = self.relative_path(dir_path)
+        if relative_path is None:
+            return True
+        return bool(relative_path) and self.matcher.is_path_excluded(relative_path, is_dir=dir_path.is_dir())
+
+    def calculate_file_digests(self, file_path: Path) -> Optional[Tuple[str, Optional[str]]]:
+        """Calculate SHA-256 and, in blob-hash mode, the git blob SHA-1 in one chunked read
+
+        The blob SHA is None if blob hashing is off or the file changed size
+        while it was read.
+        """
+        try:
+            digest = hashlib.sha256()
+            blob_digest = None
+            hashed_bytes = 0
+            
+            with open(file_path, 'rb') as f:
+                file_size = os.fstat(f.fileno()).st_size
+                updates = [digest.update]
+                if self.blob_hashes:
+                    # Same object id git hash-object (and the GitHub API) computes
+                    blob_digest = hashlib.sha1(f'blob {file_size}\0'.encode())
+                    updates.append(blob_digest.update)
+                
+                if file_size >= MMAP_THRESHOLD:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        view = memoryview(mapped)
+                        try:
+                            for offset in range(0, len(view), HASH_CHUNK_SIZE):
+                                with view[offset:offset + HASH_CHUNK_SIZE] as chunk:
+                                    for update in updates:
+                                        update(chunk)
+                                    hashed_bytes += len(chunk)
+                        finally:
+                            view.release()
+                else:
+                    buffer = bytearray(HASH_CHUNK_SIZE)
+                    view = memoryview(buffer)
+                    while True:
+                        read_count = f.readinto(buffer)
+                        if not read_count:
+                            break
+                        for update in updates:
+                            update(view[:read_count])
+                        hashed_bytes += read_count
+            
+            blob_sha = blob_digest.hexdigest() if blob_digest and hashed_bytes == file_size else None
+            return digest.hexdigest(), blob_sha
+        except Exception as e:
+            self.logger.error(f'Error calculating hash for {file_path}: {e}')
+            return None
+
+    def calculate_file_hash(self, file_path: Path) -> Optional[str]:
+        """Calculate SHA-256 hash of file content in fixed-size chunks"""
+        digests = self.calculate_file_digests(file_path)
+        return digests[0] if digests else None
+
+    @staticmethod
+    def stat_key(st: os.stat_result) -> StatKey:
+        """Build the stat tuple used to decide whether a file needs rehashing"""
+        return (st.st_size, st.st_mtime_ns, st.st_ino, st.st_ctime_ns)
+
+    def hash_files(self, file_paths: List[Path]) -> List[Optional[Tuple[str, Optional[str]]]]:
+        """Hash files on a bounded worker pool, returning (sha256, blob SHA) in input order"""
+        if self.shared is not None:
+            return self.shared.hash_pool.map(self.workspace, self.calculate_file_digests, file_paths)
+        if self.hash_workers <= 1 or len(file_paths) < 2:
+            return [self.calculate_file_digests(file_path) for file_path in file_paths]
         
-        for pattern in self.excluded_patterns:
-            if pattern.startswith('*'):
-                if file_str.endswith(pattern[1:]):
-                    return True
-            elif pattern in file_str:
+        # calculate_file_digests logs and returns None on error, so one bad file never
+        # aborts the batch; map() keeps results aligned with file_paths
+        with ThreadPoolExecutor(max_workers=self.hash_workers, thread_name_prefix='emad-hash') as executor:
+            return list(executor.map(self.calculate_file_digests, file_paths))
+
+    def walk_files(self, start: Path, unreadable: Optional[List[str]] = None):
+        """Yield (relative path, path, stat) for non-excluded files at or below start
+
+        Excluded directories are pruned before descending into them, nested
+        .gitignore files are loaded as their directories are reached, and each
+        file is stat'ed once through its DirEntry. Directories that exist but
+        cannot be listed are appended to unreadable (relative paths).
+        """
+        relative_start = self.relative_path(start)
+        if relative_start is None:
+            return
+        
+        if not start.is_dir():
+            if start.is_file() and not self.should_exclude_file(start):
+                try:
+                    yield relative_start, start, start.stat()
+                except OSError:
+                    pass
+            return
+        
+        if relative_start and self.should_exclude_dir(start):
+            return
+        
+        use_gitignore = self.settings['monitoring'].get('respect_gitignore', True)
+        pending = [(start, relative_start + os.sep if relative_start else '')]
+        while pending:
+            directory, directory_prefix = pending.pop()
+            try:
+                with os.scandir(directory) as scanner:
+                    entries = list(scanner)
+            except OSError as e:
+                self.logger.warning(f'Cannot scan directory {directory}: {e}')
+                if unreadable is not None and not isinstance(e, (FileNotFoundError, NotADirectoryError)):
+                    unreadable.append(directory_prefix.rstrip(os.sep))
+                continue
+            
+            gitignore = directory / '.gitignore'
+            if use_gitignore and (any(entry.name == '.gitignore' for entry in entries)
+                                  or self.matcher.has_gitignore(gitignore)):
+                # A deleted .gitignore is dropped from the matcher
+                self.matcher.add_gitignore(gitignore, base=directory_prefix.replace(os.sep, '/'))
+            
+            for entry in entries:
+                relative_path = directory_prefix + entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not self.is_excluded(relative_path, is_dir=True):
+                            pending.append((Path(entry.path), relative_path + os.sep))
+                    elif entry.is_file():
+                        if not self.is_excluded(relative_path):
+                            yield relative_path, Path(entry.path), entry.stat()
+                except OSError:
+                    continue  # Vanished or unreadable entry
+
+    def hash_submitter(self):
+        """Function submitting calculate_file_digests for a path, and the executor to shut down after"""
+        if self.shared is not None:
+            return (lambda file_path: self.shared.hash_pool.submit(self.workspace, self.calculate_file_digests,
+                                                                   file_path)), None
+        if self.hash_workers <= 1:
+            def submit_inline(file_path):
+                future = Future()
+                future.set_result(self.calculate_file_digests(file_path))
+                return future
+            return submit_inline, None
+        executor = ThreadPoolExecutor(max_workers=self.hash_workers, thread_name_prefix='emad-hash')
+        return (lambda file_path: executor.submit(self.calculate_file_digests, file_path)), executor
+
+    def hash_entries(self, walk_entries, stat_cache,
+                     pipeline: Optional[EMADUploadPipeline] = None
+                     ) -> Tuple[Dict[str, str], Dict[str, Tuple[StatKey, str]], Set[str]]:
+        """Hash walked files that miss stat_cache, returning (hashes, stat cache entries, executables)
+
+        Walking, hashing and (with a pipeline) uploading overlap: files are
+        hashed on the worker pool while the walk goes on, at most
+        HASH_PIPELINE_DEPTH per worker ahead of it, and each file whose hash
+        differs from the baseline is offered to the pipeline as soon as its
+        hash is known, unless it was modified within the debounce period.
+        """
+        hashes = {}
+        new_stat_cache = {}
+        executables = set()
+        track_exec_bit = os.name != 'nt'  # Windows has no exec bit; file_mode keeps the repository's
+        stats = {'skipped': 0, 'rehashed': 0}
+        scan_started_ns = time.time_ns()
+        quiet_ns = int(self.change_queue.debounce_seconds * 1_000_000_000)
+        
+        def settle(relative_path: str, key: StatKey, digests: Optional[Tuple[str, Optional[str]]]):
+            if not digests:
+                return
+            file_hash, blob_sha = digests
+            if blob_sha:
+                self.blob_sha_index[file_hash] = blob_sha
+            
+            hashes[relative_path] = file_hash
+            # A file modified within the racy window could change again without
+            # its mtime moving, so only trust its stat tuple on a later scan
+            if scan_started_ns - key[1] > RACY_STAT_WINDOW_NS:
+                new_stat_cache[relative_path] = (key, file_hash)
+            # A file written within the debounce period may be rewritten before it syncs;
+            # one above max_file_size_mb waits for a commit of its own, or is never synced
+            if (pipeline is not None and scan_started_ns - key[1] > quiet_ns
+                    and (self.max_file_size is None or key[0] <= self.max_file_size)
+                    and self._file_hashes.get(relative_path) != file_hash):
+                pipeline.offer(relative_path, file_hash, self.blob_sha_index.get(file_hash))
+        
+        submit, executor = self.hash_submitter()
+        in_flight = deque()  # (relative path, stat key, future), oldest first
+        window = self.hash_workers * HASH_PIPELINE_DEPTH
+        try:
+            for relative_path, file_path, file_stat in walk_entries:
+                key = self.stat_key(file_stat)
+                if track_exec_bit and file_stat.st_mode & 0o111:
+                    executables.add(relative_path)
+                cached = stat_cache.get(relative_path)
+                
+                if cached and cached[0] == key:
+                    # Unchanged since the scan the baseline came from, so there is nothing to offer for upload
+                    stats['skipped'] += 1
+                    hashes[relative_path] = cached[1]
+                    new_stat_cache[relative_path] = cached
+                    continue
+                
+                stats['rehashed'] += 1
+                in_flight.append((relative_path, key, submit(file_path)))
+                if len(in_flight) >= window:
+                    relative_path, key, future = in_flight.popleft()
+                    settle(relative_path, key, future.result())
+            
+            while in_flight:
+                relative_path, key, future = in_flight.popleft()
+                settle(relative_path, key, future.result())
+        finally:
+            for _, _, future in in_flight:
+                future.cancel()
+            if executor is not None:
+                executor.shutdown(wait=True)
+        
+        self.scan_stats = stats
+        return hashes, new_stat_cache, executables & hashes.keys()
+
+    def scan_directory(self, upload_changes: bool = False) -> Optional[EMADSnapshot]:
+        """Scan directory and return file hashes, or None if the scan failed
+
+        Files whose (size, mtime_ns, inode, ctime_ns) tuple matches the previous
+        scan reuse the cached hash; the rest are hashed on the worker pool.
+        upload_changes starts uploading changed files while the scan runs.
+        A failed scan leaves the stat cache and executables as they were.
+        """
+        pipeline = self.start_upload_pipeline() if upload_changes else None
+        unreadable = []
+        try:
+            current_hashes, stat_cache, executables = self.hash_entries(
+                self.walk_files(self.bmad_path, unreadable), self.stat_cache, pipeline)
+        except Exception as e:
+            self.logger.error(f'Error scanning directory: {e}')
+            return None
+        finally:
+            self.finish_upload_pipeline(pipeline)
+        
+        self.keep_unreadable(unreadable, current_hashes, stat_cache, executables)
+        self.stat_cache, self.executables = stat_cache, executables
+        self.last_full_scan = time.monotonic()
+        return EMADSnapshot.from_items(current_hashes.items(), os.sep)
+
+    def scan_paths(self, dirty_paths: Set[str], trust_stat_cache: bool = False,
+                   upload_changes: bool = False) -> Optional[Dict[str, List[str]]]:
+        """Rescan only the given relative paths and return what changed below them
+
+        A dirty path may be a file, a directory (its whole subtree is rescanned)
+        or a path that no longer exists (it and anything below it are dropped).
+        The baseline is updated in place; its entries under a dirty directory
+        come from the Merkle tree, so nothing outside the dirty roots is
+        visited. Returns None if the rescan failed. trust_stat_cache lets
+        files whose stat tuple is unchanged skip rehashing, for candidates
+        that were not seen changing; upload_changes is as for scan_directory.
+        """
+        # Collapse paths nested under another dirty path
+        roots = []
+        for relative_path in sorted(dirty_paths):
+            if not roots or not relative_path.startswith(roots[-1] + os.sep):
+                roots.append(relative_path)
+        
+        unreadable = []
+        
+        def dirty_files():
+            for relative_path in roots:
+                yield from self.walk_files(self.bmad_path / relative_path, unreadable)
+        
+        # The watcher saw these paths change, so their stat tuples are not trusted
+        pipeline = self.start_upload_pipeline() if upload_changes else None
+        try:
+            hashes, new_stat_cache, executables = self.hash_entries(
+                dirty_files(), self.stat_cache if trust_stat_cache else {}, pipeline)
+        except Exception as e:
+            self.logger.error(f'Error scanning changed paths: {e}')
+            return None
+        finally:
+            self.finish_upload_pipeline(pipeline)
+        
+        merkle = self.merkle
+        previous = {}
+        for relative_path in roots:
+            if relative_path in self._file_hashes:
+                previous[relative_path] = self._file_hashes[relative_path]
+            for file_path, _ in merkle.walk(relative_path):
+                previous[file_path] = self._file_hashes[file_path]
+        self.keep_unreadable(unreadable, hashes, new_stat_cache, executables)
+        
+        modified = [path for path, file_hash in hashes.items() if path in previous and previous[path] != file_hash]
+        modified += self.exec_bit_flips(self.executables & previous.keys(), executables,
+                                        lambda path: path in previous and previous[path] == hashes.get(path))
+        changes = {
+            'added': sorted(path for path in hashes if path not in previous),
+            'modified': sorted(modified),
+            'deleted': sorted(path for path in previous if path not in hashes)
+        }
+        
+        for file_path in previous:
+            self.stat_cache.pop(file_path, None)
+        self.executables.difference_update(previous)
+        self.executables.update(executables)
+        for file_path in changes['deleted']:
+            del self._file_hashes[file_path]
+            merkle.remove(file_path)
+        for file_path in changes['added'] + changes['modified']:
+            self._file_hashes[file_path] = hashes[file_path]
+            merkle.set(file_path, self.merkle_leaf(hashes[file_path]), self.file_mode(file_path))
+        self.stat_cache.update(new_stat_cache)
+        return changes
+
+    def keep_unreadable(self, unreadable: List[str], hashes: Dict[str, str],
+                        stat_cache: Dict[str, Tuple[StatKey, str]], executables: Set[str]):
+        """Carry the baseline's files under directories a scan could not list into its results
+
+        A directory that fails to list (EACCES, EIO, a stale NFS handle) is
+        not known to be empty, so its files keep their last-seen state until
+        a scan can read it, instead of being reported deleted.
+        """
+        for directory in unreadable:
+            kept = 0
+            for file_path, _ in self.merkle.walk(directory):
+                kept += 1
+                hashes[file_path] = self._file_hashes[file_path]
+                if file_path in self.stat_cache:
+                    stat_cache[file_path] = self.stat_cache[file_path]
+                if file_path in self.executables:
+                    executables.add(file_path)
+            if kept:
+                self.logger.warning(f'Keeping {kept} files under unreadable {directory or "."} as last seen')
+
+    def blob_upload_submitter(self):
+        """Function submitting create_blob for a path, and the executor to shut down after"""
+        if self.shared is not None:
+            return (lambda file_path: self.shared.upload_pool.submit(self.workspace, self.create_blob,
+                                                                     file_path)), None
+        executor = ThreadPoolExecutor(max_workers=self.upload_concurrency, thread_name_prefix='emad-upload')
+        return (lambda file_path: executor.submit(self.create_blob, file_path)), executor
+
+    def start_upload_pipeline(self) -> Optional[EMADUploadPipeline]:
+        """An upload pipeline for the next scan, if batch mode will commit the blobs it uploads"""
+        if not (self.pipeline_uploads and self.sync_mode == 'batch' and (self.username or self.repository)):
+            return None
+        known_blobs = set(self.remote_blob_shas.values())
+        if self.remote_tree is not None:
+            known_blobs.update(entry[0] for entry in self.remote_tree[1].values())
+        
+        submit, executor = self.blob_upload_submitter()
+        pipeline = EMADUploadPipeline(submit, self.upload_concurrency, known_blobs)
+        pipeline.executor = executor
+        # Content uploaded by an earlier scan or sync attempt is not offered again
+        pipeline.offered.update(self.prefetched_blobs)
+        pipeline.offered.update((self.journal or {}).get('blobs', {}))
+        return pipeline
+
+    def finish_upload_pipeline(self, pipeline: Optional[EMADUploadPipeline]):
+        """Wait for the scan's uploads and keep the blobs for the sync that commits them"""
+        if pipeline is None:
+            return
+        try:
+            blob_shas = pipeline.finish()
+        finally:
+            if pipeline.executor is not None:
+                pipeline.executor.shutdown(wait=True)
+        if blob_shas:
+            self.prefetched_blobs.update(blob_shas)
+            self.logger.info(f'Uploaded {len(blob_shas)} blobs while scanning')
+
+    def load_manifest(self) -> bool:
+        """Load file hashes and stat cache from the on-disk manifest"""
+        if not self.manifest_path.exists():
+            return False
+        
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            
+            if manifest.get('version') != MANIFEST_VERSION:
+                self.logger.warning(f'Ignoring hash manifest with unsupported version: {manifest.get("version")}')
+                return False
+            
+            files = manifest['files']
+            self.file_hashes = EMADSnapshot.from_items(((path, entry['sha256']) for path, entry in files.items()),
+                                                       os.sep)
+            self.remote_blob_shas = {path: entry['blob'] for path, entry in files.items() if entry.get('blob')}
+            self.blob_sha_index = {entry['sha256']: entry['blob'] for entry in files.values() if entry.get('blob')}
+            self.stat_cache = {
+                path: (tuple(entry['stat']), entry['sha256'])
+                for path, entry in files.items() if entry.get('stat')
+            }
+            self.executables = {path for path, entry in files.items() if entry.get('mode') == EXEC_MODE}
+            return True
+        except Exception as e:
+            self.logger.error(f'Error loading hash manifest {self.manifest_path}: {e}')
+            return False
+
+    def save_manifest(self) -> bool:
+        """Atomically persist the synced file hashes and their stat tuples"""
+        files = {}
+        for path, file_hash in self.file_hashes.items():
+            entry = {'sha256': file_hash}
+            if self.remote_blob_shas.get(path) and self.remote_blob_shas[path] == self.blob_sha_index.get(file_hash):
+                entry['blob'] = self.remote_blob_shas[path]
+            cached = self.stat_cache.get(path)
+            if cached and cached[1] == file_hash:
+                entry['stat'] = list(cached[0])
+            if path in self.executables:
+                entry['mode'] = EXEC_MODE
+            files[path] = entry
+        
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'saved_at': datetime.now().isoformat(),
+            'files': files
+        }
+        
+        try:
+            write_json_atomic(self.manifest_path, manifest)
+            return True
+        except Exception as e:
+            self.logger.error(f'Error saving hash manifest {self.manifest_path}: {e}')
+            return False
+
+    def load_journal(self) -> Optional[Dict[str, Any]]:
+        """Load the journal of an unfinished sync, if one was left behind"""
+        if not self.journal_path.exists():
+            return None
+        
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                journal = json.load(f)
+            
+            if journal.get('version') != JOURNAL_VERSION:
+                self.logger.warning(f'Ignoring sync journal with unsupported version: {journal.get("version")}')
+                return None
+            return journal
+        except Exception as e:
+            self.logger.error(f'Error loading sync journal {self.journal_path}: {e}')
+            return None
+
+    def save_journal(self) -> bool:
+        """Atomically persist the journal before the step it records is relied on"""
+        try:
+            write_json_atomic(self.journal_path, self.journal)
+            return True
+        except Exception as e:
+            self.logger.error(f'Error saving sync journal {self.journal_path}: {e}')
+            return False
+
+    def clear_journal(self):
+        """Forget the sync in progress once it is merged or abandoned"""
+        self.journal = None
+        try:
+            self.journal_path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.logger.error(f'Error removing sync journal {self.journal_path}: {e}')
+
+    def establish_baseline(self) -> int:
+        """Resume from the saved manifest, or scan the directory for a fresh baseline"""
+        self.journal = self.load_journal()
+        if self.journal:
+            self.logger.info(f'Found unfinished sync on branch {self.journal["branch"]}, it will resume next cycle')
+        
+        if self.load_manifest():
+            self.logger.info(f'Loaded hash manifest with {len(self.file_hashes)} files; '
+                             f'changes made while stopped will sync on the next cycle')
+        else:
+            self.logger.info('Performing initial directory scan...')
+            file_hashes = self.scan_directory()
+            if file_hashes is None:
+                # Nothing is saved, so the next start scans again
+                self.logger.error('Initial scan failed; starting from an empty baseline')
+                self.file_hashes = EMADSnapshot(os.sep)
+                return 0
+            self.file_hashes = file_hashes
+            # The baseline is assumed to match the repository, as before
+            self.remote_blob_shas = {path: self.blob_sha_index[file_hash]
+                                     for path, file_hash in self.file_hashes.items()
+                                     if file_hash in self.blob_sha_index}
+            self.save_manifest()
+        
+        return len(self.file_hashes)
+
+    @property
+    def file_hashes(self) -> EMADSnapshot:
+        """Baseline: relative path -> SHA-256 of the content last seen, kept as a compact snapshot"""
+        return self._file_hashes
+
+    @file_hashes.setter
+    def file_hashes(self, file_hashes: Dict[str, str]):
+        if not isinstance(file_hashes, EMADSnapshot):
+            file_hashes = EMADSnapshot.from_items(file_hashes.items(), os.sep)
+        self._file_hashes = file_hashes
+        self._merkle = None
+
+    @property
+    def merkle(self) -> EMADMerkleTree:
+        """Directory digests over the baseline, built on first use and then kept current
+
+        Leaves are git blob SHAs where known, with the mode file_mode()
+        commits, so a directory's digest is the SHA of the git tree it would
+        sync as; a leaf without one (SHA-256) makes the digests of its
+        directories match no git tree.
+        """
+        if self._merkle is None or len(self._merkle) != len(self._file_hashes):
+            self._merkle = EMADMerkleTree.from_leaves(
+                ((file_path, self.merkle_leaf(file_hash), self.file_mode(file_path))
+                 for file_path, file_hash in self._file_hashes.items()), os.sep)
+        return self._merkle
+
+    def merkle_leaf(self, file_hash: str) -> str:
+        return self.blob_sha_index.get(file_hash, file_hash)
+
+    def detect_changes(self, dirty_paths: Optional[Set[str]] = None) -> Optional[Dict[str, List[str]]]:
+        """Detect file changes since last scan, or None if the scan failed
+
+        With dirty_paths (from the watcher) only those paths are rescanned;
+        with the git-status detector only the paths git reports; otherwise
+        the whole directory is scanned. A failed scan reports nothing and
+        keeps the baseline: an empty result would read as every file deleted.
+        """
+        if dirty_paths is not None:
+            changes = self.scan_paths(dirty_paths, upload_changes=True)
+            if changes is not None:
+                return changes
+        elif self.git_status is not None:
+            changes = self.detect_git_status_changes()
+            if changes is not None:
+                return changes
+        
+        previous_executables = self.executables
+        current_hashes = self.scan_directory(upload_changes=True)
+        if current_hashes is None:
+            return None
+        
+        # Both snapshots are sorted, so one merge pass finds added, modified and deleted files
+        added, modified, deleted = self.file_hashes.diff(current_hashes)
+        content_changed = set(modified)
+        modified += self.exec_bit_flips(
+            previous_executables, self.executables,
+            lambda path: path in current_hashes and path in self.file_hashes and path not in content_changed)
+        changes = {
+            'added': added,
+            'modified': sorted(modified),
+            'deleted': deleted
+        }
+        
+        # Update stored hashes, carrying the Merkle tree over instead of rebuilding it
+        self._file_hashes = current_hashes
+        if self._merkle is not None:
+            for file_path in changes['deleted']:
+                self._merkle.remove(file_path)
+            for file_path in changes['added'] + changes['modified']:
+                self._merkle.set(file_path, self.merkle_leaf(current_hashes[file_path]), self.file_mode(file_path))
+        if self.git_status is not None and not self.blob_hashes:
+            self.learn_index_blob_shas(current_hashes)
+        
+        # Keep blob SHAs only for content that is still present
+        if self.blob_sha_index:
+            live_hashes = set(current_hashes.values())
+            self.blob_sha_index = {file_hash: blob_sha for file_hash, blob_sha in self.blob_sha_index.items()
+                                   if file_hash in live_hashes}
+        
+        return changes
+
+    @staticmethod
+    def exec_bit_flips(before: Set[str], after: Set[str], unchanged: Callable[[str], bool]) -> List[str]:
+        """Files whose exec bit was set or cleared while their content stayed the same
+
+        A chmod leaves the content hash alone, so these are only found by
+        comparing the executables before and after a scan.
+        """
+        if os.name == 'nt':
+            return []  # No exec bit; file_mode keeps the repository's
+        return [file_path for file_path in before ^ after if unchanged(file_path)]
+
+    def detect_git_status_changes(self) -> Optional[Dict[str, List[str]]]:
+        """Rescan the candidates from git status, or None when a full scan is needed"""
+        candidates = self.git_status.candidates()
+        if candidates is None:
+            return None
+        changes = self.scan_paths(candidates, trust_stat_cache=True, upload_changes=True)
+        if changes is None:
+            self.git_status.dirty = None  # Rescan everything next time
+            return None
+        
+        if not self.blob_hashes:
+            self.learn_index_blob_shas(changes['added'] + changes['modified'])
+        return changes
+
+    def learn_index_blob_shas(self, file_paths: Iterable[str]):
+        """Take blob SHAs of clean tracked files from the git index instead of hashing for them
+
+        Only files last modified before git status ran qualify, so a file
+        edited between the status and the scan never gets its old blob SHA.
+        """
+        settled_before = self.git_status.checked_at_ns - RACY_STAT_WINDOW_NS
+        missing = [file_path for file_path in file_paths
+                   if file_path in self.stat_cache and self.stat_cache[file_path][0][1] < settled_before
+                   and self.file_hashes.get(file_path) not in self.blob_sha_index]
+        for file_path, blob_sha in self.git_status.index_blob_shas(missing).items():
+            self.blob_sha_index[self.file_hashes[file_path]] = blob_sha
+            if self._merkle is not None:
+                self._merkle.set(file_path, blob_sha, self.file_mode(file_path))
+
+    def local_blob_sha(self, file_path: str) -> Optional[str]:
+        """Git blob SHA of a file's scanned content, if known"""
+        file_hash = self.file_hashes.get(file_path)
+        return self.blob_sha_index.get(file_hash) if file_hash else None
+
+    def skip_unchanged_remote(self, changes: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Drop added/modified files whose content (and mode, where known) already matches the repository's"""
+        unchanged = set()
+        for file_path in changes['added'] + changes['modified']:
+            local_sha = self.local_blob_sha(file_path)
+            if local_sha and self.cached_file_sha(file_path) == local_sha and self.remote_mode_matches(file_path):
+                unchanged.add(file_path)
+        if not unchanged:
+            return changes
+        
+        self.logger.info(f'Skipping {len(unchanged)} files whose content already matches the repository')
+        return {kind: [file_path for file_path in file_paths if file_path not in unchanged]
+                for kind, file_paths in changes.items()}
+
+    def mark_synced(self, changes: Dict[str, List[str]]):
+        """Record the blob SHAs the repository now holds for the synced files"""
+        for file_path in changes['added'] + changes['modified']:
+            blob_sha = self.local_blob_sha(file_path)
+            if blob_sha:
+                self.remote_blob_shas[file_path] = blob_sha
+            else:
+                self.remote_blob_shas.pop(file_path, None)
+        for file_path in changes['deleted']:
+            self.remote_blob_shas.pop(file_path, None)
+
+    def create_branch(self, branch_name: str, main_sha: Optional[str] = None) -> bool:
+        """Create a new branch from main (main_sha, if already known)"""
+        if main_sha is None:
+            main_sha = self.branch_sha('main')
+            if main_sha is None:
+                return False
+        return self.create_ref(branch_name, main_sha)
+
+    def get_file_sha(self, file_path: str, branch: str = 'main') -> Optional[str]:
+        """Get existing file SHA from repository"""
+        try:
+            api_path = f'{self.repo_api}/contents/{file_path}'
+            params = {'ref': branch}
+            
+            response = self.api.get(api_path, params=params)
+            
+            if response.status_code == 200:
+                return response.json().get('sha')
+            else:
+                return None
+        except Exception as e:
+            self.logger.error(f'Error getting file SHA for {file_path}: {e}')
+            return None
+
+    @staticmethod
+    def remote_path(file_path: str) -> str:
+        """Repository path of a local relative path"""
+        return file_path.replace(os.sep, '/') if os.sep != '/' else file_path
+
+    def sha_lookups_cached(self) -> bool:
+        """Whether known_file_sha answers from local state rather than asking GitHub"""
+        return self.remote_tree is not None or self.blob_hashes
+
+    def cached_file_sha(self, file_path: str) -> Optional[str]:
+        """Remote blob SHA from the tree mirror, else from the last sync in blob-hash mode"""
+        if self.remote_tree is not None:
+            entry = self.remote_tree[1].get(self.remote_path(file_path))
+            return entry[0] if entry else None
+        return self.remote_blob_shas.get(file_path) if self.blob_hashes else None
+
+    def remote_mode_matches(self, file_path: str) -> bool:
+        """Whether the tree mirror has a file with the mode it would be committed with
+
+        True when the mode is unknown (no mirror), and in per-file mode,
+        whose Contents API writes cannot change a mode.
+        """
+        if self.remote_tree is None or self.sync_mode == 'per-file':
+            return True
+        entry = self.remote_tree[1].get(self.remote_path(file_path))
+        return entry is None or entry[1] == self.file_mode(file_path, self.remote_tree[1])
+
+    def known_file_sha(self, file_path: str, branch: str) -> Optional[str]:
+        """Remote blob SHA from local state when it is kept (sha_lookups_cached), else looked up"""
+        if self.sha_lookups_cached():
+            return self.cached_file_sha(file_path)
+        return self.get_file_sha(file_path, branch)
+
+    def upload_file_to_branch(self, file_path: str, branch_name: str, commit_message: str) -> bool:
+        """Upload file to specific branch"""
+        body = None
+        try:
+            local_file_path = self.bmad_path / file_path
+            
+            # Existing file SHA, known from the last sync or looked up
+            existing_sha = self.known_file_sha(file_path, branch_name)
+            
+            api_path = f'{self.repo_api}/contents/{file_path}'
+            
+            for attempt in range(2):
+                file_data = {
+                    'message': commit_message,
+                    'branch': branch_name
+                }
+                
+                if existing_sha:
+                    file_data['sha'] = existing_sha
+                
+                # Stream the base64 content instead of holding encoded copies of the file
+                body = EMADStreamingUploadBody(local_file_path, file_data)
+                response = self.api.put(api_path, data=body, headers={'Content-Type': 'application/json'})
+                body.close()
+                
+                if response.status_code in [409, 422] and self.sha_lookups_cached() and attempt == 0:
+                    # The recorded SHA is stale (changed outside this daemon); ask GitHub
+                    existing_sha = self.get_file_sha(file_path, branch_name)
+                    continue
+                break
+            
+            if response.status_code in [200, 201]:
+                self.logger.info(f'Uploaded {file_path} to branch {branch_name}')
+                return True
+            else:
+                self.logger.error(f'Failed to upload {file_path}: {response.status_code} - {response.text}')
+                return False
+        except Exception as e:
+            self.logger.error(f'Error uploading file {file_path}: {e}')
+            return False
+        finally:
+            if body is not None:
+                body.close()
+
+    def delete_file_from_branch(self, file_path: str, branch_name: str, commit_message: str) -> bool:
+        """Delete file from specific branch"""
+        try:
+            # File SHA, known from the last sync or looked up
+            file_sha = self.known_file_sha(file_path, branch_name)
+            
+            api_path = f'{self.repo_api}/contents/{file_path}'
+            
+            for attempt in range(2):
+                if not file_sha:
+                    self.logger.warning(f'File {file_path} not found in repository')
+                    return True  # File already doesn't exist
+                
+                delete_data = {
+                    'message': commit_message,
+                    'sha': file_sha,
+                    'branch': branch_name
+                }
+                
+                response = self.api.delete(api_path, json=delete_data)
+                
+                if response.status_code in [404, 409, 422] and self.sha_lookups_cached() and attempt == 0:
+                    # The recorded SHA is stale (changed outside this daemon); ask GitHub
+                    file_sha = self.get_file_sha(file_path, branch_name)
+                    continue
+                break
+            
+            if response.status_code == 200:
+                self.logger.info(f'Deleted {file_path} from branch {branch_name}')
                 return True
+            else:
+                self.logger.error(f'Failed to delete {file_path}: {response.status_code} - {response.text}')
+                return False
+        except Exception as e:
+            self.logger.error(f'Error deleting file {file_path}: {e}')
+            return False
+
+    def branch_exists(self, branch: str) -> Optional[bool]:
+        """Whether a branch exists, or None if GitHub could not say"""
+        try:
+            response = self.api.get(f'{self.repo_api}/git/refs/heads/{branch}')
+            if response.status_code in [200, 404]:
+                return response.status_code == 200
+            self.logger.error(f'Failed to get {branch} branch: {response.status_code}')
+            return None
+        except Exception as e:
+            self.logger.error(f'Error getting {branch} branch: {e}')
+            return None
+
+    def branch_sha(self, branch: str) -> Optional[str]:
+        """Commit SHA a branch points at, or None if it does not exist or GitHub could not say"""
+        try:
+            response = self.api.get(f'{self.repo_api}/git/refs/heads/{branch}')
+            if response.status_code == 200:
+                return response.json()['object']['sha']
+            if response.status_code != 404:
+                self.logger.error(f'Failed to get {branch} branch: {response.status_code}')
+            return None
+        except Exception as e:
+            self.logger.error(f'Error getting {branch} branch: {e}')
+            return None
+
+    def get_branch_head(self, branch: str = 'main') -> Optional[Tuple[str, str]]:
+        """Get the (commit SHA, tree SHA) a branch points at"""
+        try:
+            response = self.api.get(f'{self.repo_api}/git/refs/heads/{branch}')
+            
+            if response.status_code != 200:
+                self.logger.error(f'Failed to get {branch} branch: {response.status_code}')
+                return None
+            
+            commit_sha = response.json()['object']['sha']
+            
+            response = self.api.get(f'{self.repo_api}/git/commits/{commit_sha}')
+            
+            if response.status_code != 200:
+                self.logger.error(f'Failed to get commit {commit_sha}: {response.status_code}')
+                return None
+            
+            return commit_sha, response.json()['tree']['sha']
+        except Exception as e:
+            self.logger.error(f'Error getting {branch} branch head: {e}')
+            return None
+
+    def local_tree_index(self, tree_sha: str, prefix: str = '') -> Optional[Dict[str, RemoteEntry]]:
+        """Index of a remote tree the local baseline matches exactly, without listing it
+
+        prefix is the tree's repository path ('' for the root, else ending in
+        "/"). Returns None unless that directory's Merkle digest is tree_sha.
+        Sizes are not known locally and are left as None.
+        """
+        directory = prefix.rstrip('/').replace('/', os.sep)
+        merkle = self.merkle
+        if merkle.digest(directory) != tree_sha:
+            return None
+        return {self.remote_path(file_path): (leaf, merkle.mode(file_path), None)
+                for file_path, leaf in merkle.walk(directory)}
+
+    def fetch_tree_index(self, tree_sha: str) -> Optional[Dict[str, RemoteEntry]]:
+        """List every file under a tree: path -> (blob SHA, mode, size)
+
+        Trees whose SHA equals the Merkle digest of the same local directory
+        are taken from the baseline instead of being listed.
+        """
+        index = self.local_tree_index(tree_sha)
+        if index is not None:
+            self.logger.info(f'Local files match tree {tree_sha[:7]}, no listing needed')
+            return index
         
-        return False
+        try:
+            response = self.api.get(f'{self.repo_api}/git/trees/{tree_sha}', params={'recursive': '1'})
+            
+            if response.status_code != 200:
+                self.logger.error(f'Failed to get tree {tree_sha}: {response.status_code}')
+                return None
+            
+            listing = response.json()
+            if not listing.get('truncated'):
+                return {entry['path']: (entry['sha'], entry['mode'], entry.get('size'))
+                        for entry in listing['tree'] if entry['type'] == 'blob'}
+            
+            # Too large for one recursive listing; walk the subtrees one level at a time
+            self.logger.info(f'Recursive listing of tree {tree_sha[:7]} was truncated, listing subtrees')
+            index = {}
+            pending = [(tree_sha, '')]
+            while pending:
+                subtree_sha, prefix = pending.pop()
+                response = self.api.get(f'{self.repo_api}/git/trees/{subtree_sha}')
+                
+                if response.status_code != 200:
+                    self.logger.error(f'Failed to get tree {subtree_sha}: {response.status_code}')
+                    return None
+                
+                for entry in response.json()['tree']:
+                    if entry['type'] == 'tree':
+                        subtree_prefix = f'{prefix}{entry["path"]}/'
+                        local_index = self.local_tree_index(entry['sha'], subtree_prefix)
+                        if local_index is None:
+                            pending.append((entry['sha'], subtree_prefix))
+                        else:
+                            index.update(local_index)
+                    elif entry['type'] == 'blob':
+                        index[prefix + entry['path']] = (entry['sha'], entry['mode'], entry.get('size'))
+            return index
+        except Exception as e:
+            self.logger.error(f'Error listing tree {tree_sha}: {e}')
+            return None
 
-    def calculate_file_hash(self, file_path: Path) -> Optional[str]:
-        """Calculate SHA-256 hash of file content"""
+    def refresh_remote_tree(self) -> Optional[Dict[str, RemoteEntry]]:
+        """Point the mirror at main's current tree, fetching it only if its SHA changed
+
+        Returns the path index, or None if it could not be loaded (lookups
+        then fall back to the manifest or the Contents API).
+        """
+        self.remote_head = self.get_branch_head('main')
+        if self.remote_head is None:
+            return None
+        
+        tree_sha = self.remote_head[1]
+        if self.remote_tree is None or self.remote_tree[0] != tree_sha:
+            index = self.fetch_tree_index(tree_sha)
+            if index is None:
+                self.remote_tree = None
+                return None
+            self.remote_tree = (tree_sha, index)
+            self.logger.info(f'Mirrored repository tree {tree_sha[:7]} ({len(index)} files)')
+        
+        return self.remote_tree[1]
+
+    def drift_report(self) -> Optional[Dict[str, List[str]]]:
+        """Compare the repository's main tree with the local manifest
+
+        remote_only: files in the repository the manifest does not know about
+        changed_remotely: files whose blob differs from the one last synced
+        """
+        index = self.refresh_remote_tree()
+        if index is None:
+            return None
+        return self.drift_against(index)
+
+    def drift_against(self, index: Dict[str, RemoteEntry]) -> Dict[str, List[str]]:
+        """drift_report() for an already fetched tree index"""
+        known = {self.remote_path(file_path): file_path for file_path in self.file_hashes}
+        return {
+            'remote_only': sorted(path for path in index if path not in known),
+            'changed_remotely': sorted(
+                path for path, entry in index.items()
+                if path in known and self.remote_blob_shas.get(known[path]) not in (None, entry[0])
+            )
+        }
+
+    def get_blob(self, blob_sha: str) -> Optional[bytes]:
+        """Download a blob's content"""
         try:
-            with open(file_path, 'rb') as f:
-                content = f.read()
-                return hashlib.sha256(content).hexdigest()
+            response = self.api.get(f'{self.repo_api}/git/blobs/{blob_sha}')
+            
+            if response.status_code == 200:
+                return base64.b64decode(response.json()['content'])
+            self.logger.error(f'Failed to get blob {blob_sha}: {response.status_code}')
+            return None
+        except Exception as e:
+            self.logger.error(f'Error getting blob {blob_sha}: {e}')
+            return None
+
+    def rename_candidates(self, changes: Dict[str, List[str]]) -> Tuple[List[Rename], List[Tuple[str, str, str]]]:
+        """Exact renames among changes, and (old, new, old blob SHA) pairs to compare for near renames
+
+        Exact matches need the blob SHA of both sides: the repository's for
+        the deleted path and the scanned one for the added path.
+        """
+        deleted_blobs = {}
+        for file_path in changes['deleted']:
+            blob_sha = self.cached_file_sha(file_path)
+            if blob_sha:
+                deleted_blobs[file_path] = blob_sha
+        added_blobs = {}
+        for file_path in changes['added']:
+            blob_sha = self.local_blob_sha(file_path)
+            if blob_sha:
+                added_blobs[file_path] = blob_sha
+        
+        renames = [(old_path, new_path, 100) for old_path, new_path in exact_renames(deleted_blobs, added_blobs, os.sep)]
+        if not self.rename_similarity or not changes['deleted'] or not changes['added']:
+            return renames, []
+        
+        renamed = {path for old_path, new_path, _ in renames for path in (old_path, new_path)}
+        index = self.remote_tree[1] if self.remote_tree is not None else {}
+        deleted_sizes = {}
+        for file_path, blob_sha in deleted_blobs.items():
+            if file_path not in renamed:
+                entry = index.get(self.remote_path(file_path))
+                deleted_sizes[file_path] = entry[2] if entry else None
+        added_sizes = {}
+        for file_path in changes['added']:
+            if file_path not in renamed:
+                try:
+                    added_sizes[file_path] = (self.bmad_path / file_path).stat().st_size
+                except OSError:
+                    continue
+        
+        pairs = similar_candidates(deleted_sizes, added_sizes, self.rename_similarity, os.sep)
+        return renames, [(old_path, new_path, deleted_blobs[old_path]) for old_path, new_path in pairs]
+
+    def score_renames(self, candidates: List[Tuple[str, str, str]],
+                      old_contents: Dict[str, Optional[bytes]]) -> List[Tuple[float, str, str]]:
+        """(similarity, old, new) of the candidate pairs whose old content was downloaded"""
+        scores = []
+        for old_path, new_path, blob_sha in candidates:
+            if old_contents.get(blob_sha) is None:
+                continue
+            try:
+                new_content = (self.bmad_path / new_path).read_bytes()
+            except OSError:
+                continue
+            scores.append((content_similarity(old_contents[blob_sha], new_content), old_path, new_path))
+        return scores
+
+    def detect_renames(self, changes: Dict[str, List[str]]) -> List[Rename]:
+        """(old, new, similarity percent) for deleted files that reappear among the added ones"""
+        renames, candidates = self.rename_candidates(changes)
+        if candidates:
+            old_contents = {}
+            for _, _, blob_sha in candidates:
+                if blob_sha not in old_contents:
+                    old_contents[blob_sha] = self.get_blob(blob_sha)
+            renames += similar_renames(self.score_renames(candidates, old_contents), self.rename_similarity)
+        if renames:
+            self.logger.info(f'Detected {len(renames)} renamed files')
+        return sorted(renames, key=lambda rename: rename[1])
+
+    def create_blob(self, file_path: str) -> Optional[str]:
+        """Upload a file's content as a git blob and return its SHA"""
+        body = None
+        try:
+            # Same streaming body as the Contents API upload
+            body = EMADStreamingUploadBody(self.bmad_path / file_path, {'encoding': 'base64'})
+            response = self.api.post(f'{self.repo_api}/git/blobs', data=body,
+                                         headers={'Content-Type': 'application/json'})
+            
+            if response.status_code == 201:
+                return response.json()['sha']
+            else:
+                self.logger.error(f'Failed to create blob for {file_path}: {response.status_code} - {response.text}')
+                return None
+        except Exception as e:
+            self.logger.error(f'Error creating blob for {file_path}: {e}')
+            return None
+        finally:
+            if body is not None:
+                body.close()
+
+    def upload_blobs(self, file_paths: List[str], uploaded: Optional[Dict[str, str]] = None) -> Optional[Dict[str, str]]:
+        """Upload files as blobs on a bounded pool of threads
+
+        Returns path -> blob SHA, or None as soon as any upload fails (uploads
+        not yet started are cancelled). Blobs are added to uploaded as they
+        complete, so a caller can keep the ones that made it before a failure.
+        """
+        blob_shas = {} if uploaded is None else uploaded
+        if self.upload_concurrency <= 1 or len(file_paths) < 2:
+            for file_path in file_paths:
+                blob_sha = self.create_blob(file_path)
+                if blob_sha is None:
+                    return None
+                blob_shas[file_path] = blob_sha
+            return blob_shas
+        
+        failed = False
+        if self.shared is not None:
+            executor = None
+            futures = {self.shared.upload_pool.submit(self.workspace, self.create_blob, file_path): file_path
+                       for file_path in file_paths}
+        else:
+            executor = ThreadPoolExecutor(max_workers=min(self.upload_concurrency, len(file_paths)),
+                                          thread_name_prefix='emad-upload')
+            futures = {executor.submit(self.create_blob, file_path): file_path for file_path in file_paths}
+        try:
+            for future in as_completed(futures):
+                blob_sha = future.result()
+                if blob_sha is None:
+                    for pending in futures:
+                        pending.cancel()
+                    failed = True
+                    break
+                blob_shas[futures[future]] = blob_sha
+        finally:
+            # Uploads already running finish either way
+            if executor is not None:
+                executor.shutdown(wait=True)
+            else:
+                wait_for_futures(futures)
+        
+        if failed:
+            # Uploads already running when the failure was seen still finish; keep what they produced
+            blob_shas.update((futures[future], future.result()) for future in futures
+                             if future.done() and not future.cancelled() and future.result())
+            return None
+        return blob_shas
+
+    def create_tree(self, base_tree: str, entries: List[Dict[str, Any]]) -> Optional[str]:
+        """Create a tree from base_tree with entries added, replaced or (sha None) removed"""
+        try:
+            tree_data = {
+                'base_tree': base_tree,
+                'tree': entries
+            }
+            
+            response = self.api.post(f'{self.repo_api}/git/trees', json=tree_data)
+            
+            if response.status_code == 201:
+                return response.json()['sha']
+            else:
+                self.logger.error(f'Failed to create tree: {response.status_code} - {response.text}')
+                return None
         except Exception as e:
-            self.logger.error(f'Error calculating hash for {file_path}: {e}')
+            self.logger.error(f'Error creating tree: {e}')
             return None
 
-    def scan_directory(self) -> Dict[str, str]:
-        """Scan directory and return file hashes"""
-        current_hashes = {}
-        
+    def create_commit(self, message: str, tree_sha: str, parent_sha: str) -> Optional[str]:
+        """Create a commit object and return its SHA"""
         try:
-            for file_path in self.bmad_path.rglob('*'):
-                if file_path.is_file() and not self.should_exclude_file(file_path):
-                    relative_path = file_path.relative_to(self.bmad_path)
-                    file_hash = self.calculate_file_hash(file_path)
-                    
-                    if file_hash:
-                        current_hashes[str(relative_path)] = file_hash
+            commit_data = {
+                'message': message,
+                'tree': tree_sha,
+                'parents': [parent_sha]
+            }
+            
+            response = self.api.post(f'{self.repo_api}/git/commits', json=commit_data)
+            
+            if response.status_code == 201:
+                return response.json()['sha']
+            else:
+                self.logger.error(f'Failed to create commit: {response.status_code} - {response.text}')
+                return None
         except Exception as e:
-            self.logger.error(f'Error scanning directory: {e}')
-        
-        return current_hashes
+            self.logger.error(f'Error creating commit: {e}')
+            return None
 
-    def detect_changes(self) -> Dict[str, List[str]]:
-        """Detect file changes since last scan"""
-        current_hashes = self.scan_directory()
-        
-        changes = {
-            'added': [],
-            'modified': [],
-            'deleted': []
-        }
-        
-        # Find added and modified files
-        for file_path, file_hash in current_hashes.items():
-            if file_path not in self.file_hashes:
-                changes['added'].append(file_path)
-            elif self.file_hashes[file_path] != file_hash:
-                changes['modified'].append(file_path)
-        
-        # Find deleted files
-        for file_path in self.file_hashes:
-            if file_path not in current_hashes:
-                changes['deleted'].append(file_path)
-        
-        # Update stored hashes
-        self.file_hashes = current_hashes
-        
-        return changes
+    def create_ref(self, branch_name: str, sha: str) -> bool:
+        """Create a branch pointing at a commit
 
-    def create_branch(self, branch_name: str) -> bool:
-        """Create a new branch from main"""
+        POSTs are retried after a dropped connection, which may have cut off
+        a request GitHub already handled; a branch already at sha counts as
+        created.
+        """
         try:
-            # Get main branch SHA
-            response = self.session.get(f'{GITHUB_API_BASE}/repos/{self.username}/{REPO_NAME}/git/refs/heads/main')
-            
-            if response.status_code != 200:
-                self.logger.error(f'Failed to get main branch: {response.status_code}')
-                return False
-            
-            main_sha = response.json()['object']['sha']
-            
-            # Create new branch
             branch_data = {
                 'ref': f'refs/heads/{branch_name}',
-                'sha': main_sha
+                'sha': sha
             }
             
-            response = self.session.post(f'{GITHUB_API_BASE}/repos/{self.username}/{REPO_NAME}/git/refs', json=branch_data)
+            response = self.api.post(f'{self.repo_api}/git/refs', json=branch_data)
             
             if response.status_code == 201:
                 self.logger.info(f'Created branch: {branch_name}')
                 return True
+            elif response.status_code == 422 and self.branch_sha(branch_name) == sha:
+                self.logger.info(f'Branch {branch_name} already exists at {sha[:7]}')
+                return True
             else:
                 self.logger.error(f'Failed to create branch: {response.status_code} - {response.text}')
                 return False
@@ -201,90 +2250,442 @@ class EMADAutoSync:
             self.logger.error(f'Error creating branch: {e}')
             return False
 
-    def get_file_sha(self, file_path: str, branch: str = 'main') -> Optional[str]:
-        """Get existing file SHA from repository"""
+    def update_ref(self, branch_name: str, sha: str) -> bool:
+        """Point an existing branch at a new commit (forced)"""
         try:
-            api_path = f'{GITHUB_API_BASE}/repos/{self.username}/{REPO_NAME}/contents/{file_path}'
-            params = {'ref': branch}
-            
-            response = self.session.get(api_path, params=params)
+            response = self.api.patch(f'{self.repo_api}/git/refs/heads/{branch_name}',
+                                      json={'sha': sha, 'force': True})
             
             if response.status_code == 200:
-                return response.json().get('sha')
-            else:
-                return None
-        except Exception as e:
-            self.logger.error(f'Error getting file SHA for {file_path}: {e}')
-            return None
-
-    def upload_file_to_branch(self, file_path: str, branch_name: str, commit_message: str) -> bool:
-        """Upload file to specific branch"""
-        try:
-            local_file_path = self.bmad_path / file_path
-            
-            # Read file content and encode to base64
-            with open(local_file_path, 'rb') as f:
-                import base64
-                content = base64.b64encode(f.read()).decode('utf-8')
-            
-            # Get existing file SHA if it exists
-            existing_sha = self.get_file_sha(file_path, branch_name)
-            
-            api_path = f'{GITHUB_API_BASE}/repos/{self.username}/{REPO_NAME}/contents/{file_path}'
-            
-            file_data = {
-                'message': commit_message,
-                'content': content,
-                'branch': branch_name
-            }
-            
-            if existing_sha:
-                file_data['sha'] = existing_sha
-            
-            response = self.session.put(api_path, json=file_data)
-            
-            if response.status_code in [200, 201]:
-                self.logger.info(f'Uploaded {file_path} to branch {branch_name}')
+                self.logger.info(f'Updated branch: {branch_name}')
                 return True
             else:
-                self.logger.error(f'Failed to upload {file_path}: {response.status_code} - {response.text}')
+                self.logger.error(f'Failed to update branch: {response.status_code} - {response.text}')
                 return False
         except Exception as e:
-            self.logger.error(f'Error uploading file {file_path}: {e}')
+            self.logger.error(f'Error updating branch: {e}')
             return False
 
-    def delete_file_from_branch(self, file_path: str, branch_name: str, commit_message: str) -> bool:
-        """Delete file from specific branch"""
+    def fast_forward_ref(self, branch_name: str, sha: str) -> Optional[bool]:
+        """Move a branch to a commit descending from it: True, False if it is not a fast-forward, None on error"""
         try:
-            # Get file SHA
-            file_sha = self.get_file_sha(file_path, branch_name)
-            
-            if not file_sha:
-                self.logger.warning(f'File {file_path} not found in repository')
-                return True  # File already doesn't exist
-            
-            api_path = f'{GITHUB_API_BASE}/repos/{self.username}/{REPO_NAME}/contents/{file_path}'
-            
-            delete_data = {
-                'message': commit_message,
-                'sha': file_sha,
-                'branch': branch_name
-            }
-            
-            response = self.session.delete(api_path, json=delete_data)
+            response = self.api.patch(f'{self.repo_api}/git/refs/heads/{branch_name}',
+                                      json={'sha': sha, 'force': False})
             
             if response.status_code == 200:
-                self.logger.info(f'Deleted {file_path} from branch {branch_name}')
                 return True
+            if response.status_code == 422:
+                return False  # The branch moved since the commit's parent was read
+            self.logger.error(f'Failed to update branch {branch_name}: {response.status_code} - {response.text}')
+            return None
+        except Exception as e:
+            self.logger.error(f'Error updating branch {branch_name}: {e}')
+            return None
+
+    def change_targets(self, changes: Dict[str, List[str]]) -> Dict[str, Optional[str]]:
+        """What each changed path should hold: its sha256, or None once deleted"""
+        targets = {file_path: self.file_hashes.get(file_path) for file_path in changes['added'] + changes['modified']}
+        targets.update((file_path, None) for file_path in changes['deleted'])
+        return targets
+
+    def branch_holds(self, targets: Dict[str, Optional[str]]) -> bool:
+        """Whether the journaled branch commit already has exactly these changes"""
+        return bool(self.journal.get('commit')) and self.journal.get('commit_targets') == targets
+
+    def committed_part(self, targets: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+        """Targets the journaled branch commit already holds, if they are a part of these; else empty"""
+        committed = self.journal.get('commit_targets') or {}
+        if not self.journal.get('commit') or any(targets.get(file_path, False) != target
+                                                 for file_path, target in committed.items()):
+            return {}
+        return committed
+
+    @staticmethod
+    def without_paths(changes: Dict[str, List[str]], paths) -> Dict[str, List[str]]:
+        return {kind: [file_path for file_path in file_paths if file_path not in paths]
+                for kind, file_paths in changes.items()}
+
+    def file_size(self, file_path: str) -> int:
+        try:
+            return (self.bmad_path / file_path).stat().st_size
+        except OSError:
+            return 0
+
+    def skip_large_files(self, changes: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Drop added/modified files above max_file_size_mb under the skip policy
+
+        The repository keeps whatever it had at those paths. The baseline
+        still moves on, so a skipped file is looked at again once it changes.
+        """
+        if self.max_file_size is None or self.large_file_policy != 'skip':
+            return changes
+        large = [file_path for file_path in changes['added'] + changes['modified']
+                 if self.file_size(file_path) > self.max_file_size]
+        if not large:
+            return changes
+        
+        listed = ', '.join(large[:5]) + (f' and {len(large) - 5} more' if len(large) > 5 else '')
+        self.logger.warning(f'Not syncing {len(large)} files over '
+                            f'{self.max_file_size / (1024 * 1024):.3g} MB: {listed}')
+        return self.without_paths(changes, set(large))
+
+    def split_changes(self, changes: Dict[str, List[str]]) -> List[Dict[str, List[str]]]:
+        """Split changes into commits of at most max_commit_files paths and max_commit_bytes of content
+
+        Uploads come before deletions, so no intermediate commit lacks content
+        the sync keeps. Files above max_file_size_mb (defer policy) come
+        last, one commit each, so a huge upload failing holds nothing else back.
+        """
+        chunks, deferred = [], []
+        chunk, count, size = {'added': [], 'modified': [], 'deleted': []}, 0, 0
+        
+        def place(kind: str, file_path: str, file_size: int):
+            nonlocal chunk, count, size
+            if count and (count >= self.max_commit_files or size + file_size > self.max_commit_bytes):
+                chunks.append(chunk)
+                chunk, count, size = {'added': [], 'modified': [], 'deleted': []}, 0, 0
+            chunk[kind].append(file_path)
+            count += 1
+            size += file_size
+        
+        for kind in ('added', 'modified'):
+            for file_path in changes[kind]:
+                file_size = self.file_size(file_path)
+                if self.max_file_size is not None and file_size > self.max_file_size:
+                    deferred.append((kind, file_path))
+                else:
+                    place(kind, file_path, file_size)
+        for file_path in changes['deleted']:
+            place('deleted', file_path, 0)
+        if count:
+            chunks.append(chunk)
+        
+        for kind, file_path in deferred:
+            chunks.append({'added': [], 'modified': [], 'deleted': [], kind: [file_path]})
+        if len(chunks) > 1:
+            self.logger.info(f'Splitting {sum(map(len, changes.values()))} changes into {len(chunks)} commits')
+        return chunks or [changes]
+
+    @staticmethod
+    def chunk_message(commit_message: str, number: int, chunks: int) -> str:
+        return commit_message if chunks == 1 else f'{commit_message} (part {number}/{chunks})'
+
+    def tree_index(self, tree_sha: str) -> Optional[Dict[str, RemoteEntry]]:
+        """Path index of a tree this cycle knows: main's mirrored tree or the last one written"""
+        for known in (self.remote_tree, self.committed_tree):
+            if known is not None and known[0] == tree_sha:
+                return known[1]
+        return None
+
+    def reusable_blobs(self, upload_paths: List[str], targets: Dict[str, Optional[str]],
+                       index: Optional[Dict[str, RemoteEntry]]) -> Dict[str, str]:
+        """Blobs GitHub already holds (copies, renames, reverts, earlier attempts), so they need no upload"""
+        known_blobs = set(self.remote_blob_shas.values())
+        if index is not None:
+            known_blobs.update(entry[0] for entry in index.values())
+        journaled_blobs = self.journal.setdefault('blobs', {})  # sha256 -> blob SHA uploaded by an earlier attempt
+        
+        reused = {}
+        prefetched = 0
+        for file_path in upload_paths:
+            blob_sha = self.local_blob_sha(file_path)
+            if blob_sha in known_blobs:
+                reused[file_path] = blob_sha
+            elif targets[file_path] in journaled_blobs:
+                reused[file_path] = journaled_blobs[targets[file_path]]
+            elif targets[file_path] in self.prefetched_blobs:
+                # Uploaded while the scan ran; journaled like any other upload
+                reused[file_path] = journaled_blobs[targets[file_path]] = self.prefetched_blobs[targets[file_path]]
+                prefetched += 1
+        if len(reused) > prefetched:
+            self.logger.info(f'Reused {len(reused) - prefetched} blobs already in the repository')
+        if prefetched:
+            self.logger.info(f'Using {prefetched} blobs uploaded during the scan')
+        return reused
+
+    def record_uploaded_blobs(self, targets: Dict[str, Optional[str]], uploaded: Dict[str, str]):
+        """Journal blobs as soon as they exist, so a retry does not upload them again"""
+        if uploaded:
+            self.journal.setdefault('blobs', {}).update(
+                (targets[file_path], blob_sha) for file_path, blob_sha in uploaded.items())
+            self.save_journal()
+
+    def file_mode(self, file_path: str, index: Optional[Dict[str, RemoteEntry]] = None) -> str:
+        """Tree mode to commit a local file with: 100755 if the scan saw its exec bit
+
+        Where the filesystem has no exec bit (Windows) the mode the
+        repository already has is kept, as git does with core.fileMode off.
+        """
+        if os.name != 'nt':
+            return EXEC_MODE if file_path in self.executables else FILE_MODE
+        entry = index.get(self.remote_path(file_path)) if index else None
+        return entry[1] if entry and entry[1] in (FILE_MODE, EXEC_MODE) else FILE_MODE
+
+    def tree_entries(self, changes: Dict[str, List[str]], blob_shas: Dict[str, str],
+                     index: Optional[Dict[str, RemoteEntry]]) -> List[Dict[str, Any]]:
+        """Trees API entries writing the uploaded blobs and removing deleted paths"""
+        entries = [{'path': self.remote_path(file_path), 'mode': self.file_mode(file_path, index), 'type': 'blob',
+                    'sha': blob_shas[file_path]}
+                   for file_path in changes['added'] + changes['modified']]
+        
+        for file_path in changes['deleted']:
+            # The trees API rejects deleting a path the base tree does not have
+            if index is None or self.remote_path(file_path) in index:
+                entries.append({'path': self.remote_path(file_path), 'mode': FILE_MODE, 'type': 'blob', 'sha': None})
+        return entries
+
+    def remember_committed_tree(self, tree_sha: str, index: Optional[Dict[str, RemoteEntry]],
+                                entries: List[Dict[str, Any]]):
+        """What main's tree will hold once the branch is merged, so the next cycle needs no fetch"""
+        if index is None:
+            return
+        committed = dict(index)
+        for entry in entries:
+            if entry['sha'] is None:
+                committed.pop(entry['path'], None)
             else:
-                self.logger.error(f'Failed to delete {file_path}: {response.status_code} - {response.text}')
+                committed[entry['path']] = (entry['sha'], entry['mode'], None)
+        self.committed_tree = (tree_sha, committed)
+
+    def record_commit(self, commit_sha: str, targets: Dict[str, Optional[str]]):
+        self.journal.update(branch_created=True, commit=commit_sha, commit_targets=targets)
+        self.save_journal()
+
+    def write_commit(self, changes: Dict[str, List[str]], commit_message: str, blob_shas: Dict[str, str],
+                     base: Optional[Tuple[str, str]] = None) -> Optional[Tuple[str, str, int]]:
+        """Commit uploaded changes on top of base, main's head by default: (commit SHA, tree SHA, entries written)
+
+        Nothing points at the commit yet.
+        """
+        head = base or self.remote_head or self.get_branch_head('main')
+        if head is None:
+            return None
+        base_commit, base_tree = head
+        
+        index = self.tree_index(base_tree)
+        entries = self.tree_entries(changes, blob_shas, index)
+        tree_sha = self.create_tree(base_tree, entries)
+        if tree_sha is None:
+            return None
+        self.remember_committed_tree(tree_sha, index, entries)
+        
+        commit_sha = self.create_commit(commit_message, tree_sha, base_commit)
+        if commit_sha is None:
+            return None
+        return commit_sha, tree_sha, len(entries)
+
+    def chunk_uploads(self, chunks: List[Dict[str, List[str]]], targets: Dict[str, Optional[str]]
+                      ) -> Iterator[Tuple[Dict[str, List[str]], Optional[Dict[str, str]]]]:
+        """Yield each chunk of changes with the blob SHAs of its files, None once an upload failed
+
+        The next chunk's blobs upload on a background thread while the caller
+        commits the current one. Only the uploads run there; deciding what to
+        reuse and journaling what was uploaded stay on the caller's thread, so
+        a retry uploads only the missing blobs.
+        """
+        index = self.remote_tree[1] if self.remote_tree is not None else None
+        prefetch = ThreadPoolExecutor(max_workers=1, thread_name_prefix='emad-chunk')
+        
+        def start(chunk):
+            upload_paths = chunk['added'] + chunk['modified']
+            reused = self.reusable_blobs(upload_paths, targets, index)
+            uploaded = {}
+            future = prefetch.submit(self.upload_blobs, [file_path for file_path in upload_paths
+                                                         if file_path not in reused], uploaded)
+            return reused, uploaded, future
+        
+        pending = start(chunks[0])
+        try:
+            for position, chunk in enumerate(chunks):
+                reused, uploaded, future = pending
+                pending = None
+                try:
+                    blob_shas = future.result()
+                finally:
+                    self.record_uploaded_blobs(targets, uploaded)
+                if blob_shas is None:
+                    yield chunk, None
+                    return
+                if position + 1 < len(chunks):
+                    pending = start(chunks[position + 1])
+                blob_shas.update(reused)
+                yield chunk, blob_shas
+        finally:
+            if pending is not None:
+                # The caller stopped early; the upload already started finishes and is journaled
+                wait_for_futures([pending[2]])
+                self.record_uploaded_blobs(targets, pending[1])
+            prefetch.shutdown(wait=True)
+
+    def log_commit_progress(self, number: int, chunks: int, entry_count: int, commit_sha: str, where: str,
+                            done: int, total: int):
+        if chunks == 1:
+            self.logger.info(f'Committed {entry_count} file changes {where} as {commit_sha[:7]}')
+        else:
+            self.logger.info(f'Committed part {number}/{chunks} ({entry_count} file changes) {where} as '
+                             f'{commit_sha[:7]}, {done}/{total} changes done')
+
+    def commit_changes_to_branch(self, changes: Dict[str, List[str]], branch_name: str, commit_message: str) -> bool:
+        """Write the changes as commits on a new branch via the Git Data API
+
+        Costs one blob per added/modified file (uploaded upload_concurrency at
+        a time) plus five calls (ref, base commit, tree, commit, new ref) for
+        a sync that fits one commit. Larger syncs are split (split_changes)
+        and each further commit costs a tree, a commit and a ref update; its
+        blobs upload while the previous commit is written.
+        Nothing is visible on GitHub until the first ref is created, so a
+        failure before that leaves no branch behind. Uploaded blobs and each
+        commit are journaled; a resumed sync uploads only the missing blobs
+        and continues after the last commit the branch holds, as long as its
+        changes are still wanted.
+        """
+        targets = self.change_targets(changes)
+        if self.branch_holds(targets):
+            self.logger.info(f'Branch {branch_name} already holds these changes as {self.journal["commit"][:7]}')
+            return True
+        
+        base, committed = None, self.committed_part(targets)
+        if committed:
+            head = self.get_branch_head(branch_name)
+            if head is not None and head[0] == self.journal['commit']:
+                base = head
+                changes = self.without_paths(changes, committed)
+                self.logger.info(f'Branch {branch_name} already holds {len(committed)} of these changes, '
+                                 f'committing the other {len(targets) - len(committed)}')
+            else:
+                committed = {}
+        
+        chunks = self.split_changes(changes)
+        uploads = self.chunk_uploads(chunks, targets)
+        try:
+            for number, (chunk, blob_shas) in enumerate(uploads, 1):
+                if blob_shas is None:
+                    return False
+                written = self.write_commit(chunk, self.chunk_message(commit_message, number, len(chunks)),
+                                            blob_shas, base)
+                if written is None:
+                    return False
+                commit_sha, tree_sha, entry_count = written
+                
+                if self.journal.get('branch_created'):
+                    if not self.update_ref(branch_name, commit_sha):
+                        return False
+                elif not self.create_ref(branch_name, commit_sha):
+                    return False
+                
+                committed.update((file_path, targets[file_path]) for file_paths in chunk.values()
+                                 for file_path in file_paths)
+                self.record_commit(commit_sha, committed)
+                self.log_commit_progress(number, len(chunks), entry_count, commit_sha, f'to branch {branch_name}',
+                                         len(committed), len(targets))
+                base = (commit_sha, tree_sha)
+        finally:
+            uploads.close()
+        return True
+
+    def commit_changes_to_main(self, changes: Dict[str, List[str]], commit_message: str) -> bool:
+        """Write the changes as commits and fast-forward main to each (direct-push mode)
+
+        Skips the branch, pull request, merge and branch deletion of the
+        default flow. If main moves between reading its head and updating it,
+        the update is refused as not a fast-forward and the commit is rebuilt
+        on the new head, reusing the blobs already uploaded. A large sync is
+        split as for a branch; commits that landed before a failure stay on
+        main, and the retry skips their files as already in the repository.
+        """
+        targets = self.change_targets(changes)
+        chunks = self.split_changes(changes)
+        uploads = self.chunk_uploads(chunks, targets)
+        base, done = None, 0
+        try:
+            for number, (chunk, blob_shas) in enumerate(uploads, 1):
+                if blob_shas is None:
+                    return False
+                message = self.chunk_message(commit_message, number, len(chunks))
+                for _ in range(FAST_FORWARD_ATTEMPTS):
+                    written = self.write_commit(chunk, message, blob_shas, base)
+                    if written is None:
+                        return False
+                    commit_sha, tree_sha, entry_count = written
+                    
+                    moved = self.fast_forward_ref('main', commit_sha)
+                    if moved is None:
+                        return False
+                    if moved:
+                        break
+                    
+                    self.logger.info('main moved during the sync, rebuilding the commit on its new head')
+                    self.committed_tree = None
+                    self.refresh_remote_tree()
+                    if self.remote_head is None:
+                        return False
+                    base = None
+                else:
+                    self.logger.error(f'main kept moving, gave up after {FAST_FORWARD_ATTEMPTS} attempts')
+                    return False
+                
+                done += sum(len(file_paths) for file_paths in chunk.values())
+                self.log_commit_progress(number, len(chunks), entry_count, commit_sha, 'directly to main',
+                                         done, len(targets))
+                base = (commit_sha, tree_sha)
+        finally:
+            uploads.close()
+        return True
+
+    def push_changes_per_file(self, changes: Dict[str, List[str]], branch_name: str) -> bool:
+        """Create a branch and write each change as its own Contents API commit
+
+        Each completed file is journaled; a resumed sync reuses the branch and
+        skips files already written with the same content.
+        """
+        if not self.journal.get('branch_created'):
+            if not self.create_branch(branch_name, self.remote_head[0] if self.remote_head else None):
                 return False
-        except Exception as e:
-            self.logger.error(f'Error deleting file {file_path}: {e}')
-            return False
+            self.record_branch_created()
+        
+        success = True
+        for file_path, target, commit_msg in self.pending_file_writes(changes, branch_name):
+            if target is None:
+                written = self.delete_file_from_branch(file_path, branch_name, commit_msg)
+            else:
+                written = self.upload_file_to_branch(file_path, branch_name, commit_msg)
+            if written:
+                self.record_file_written(file_path, target)
+            else:
+                success = False
+        
+        return success
+
+    def record_branch_created(self):
+        self.journal['branch_created'] = True
+        self.save_journal()
+
+    def pending_file_writes(self, changes: Dict[str, List[str]],
+                            branch_name: str) -> List[Tuple[str, Optional[str], str]]:
+        """(path, target sha256 or None to delete, commit message) for writes the branch still lacks"""
+        done = self.journal.setdefault('done', {})  # path -> sha256 written to the branch, None once deleted
+        writes = []
+        for kind, verb in (('added', 'Add'), ('modified', 'Update'), ('deleted', 'Delete')):
+            for file_path in changes[kind]:
+                target = None if kind == 'deleted' else self.file_hashes.get(file_path)
+                if file_path not in done or done[file_path] != target:
+                    writes.append((file_path, target, f"{verb} {file_path}"))
+        
+        skipped = len(changes['added']) + len(changes['modified']) + len(changes['deleted']) - len(writes)
+        if skipped:
+            self.logger.info(f'Skipped {skipped} files already written to branch {branch_name}')
+        return writes
+
+    def record_file_written(self, file_path: str, target: Optional[str]):
+        self.journal['done'][file_path] = target
+        self.save_journal()
 
     def create_pull_request(self, branch_name: str, title: str, body: str) -> Optional[int]:
-        """Create pull request"""
+        """Create pull request
+
+        Like create_ref, a retried POST may find the pull request its first
+        attempt opened; that one is used.
+        """
         try:
             pr_data = {
                 'title': title,
@@ -293,19 +2694,70 @@ class EMADAutoSync:
                 'base': 'main'
             }
             
-            response = self.session.post(f'{GITHUB_API_BASE}/repos/{self.username}/{REPO_NAME}/pulls', json=pr_data)
+            response = self.api.post(f'{self.repo_api}/pulls', json=pr_data)
             
             if response.status_code == 201:
                 pr = response.json()
                 self.logger.info(f'Created PR #{pr["number"]}: {title}')
                 return pr['number']
+            elif response.status_code == 422 and 'already exists' in response.text:
+                pr_number = self.find_pull_request(branch_name)
+                if pr_number is not None:
+                    self.logger.info(f'PR #{pr_number} for {branch_name} already exists')
+                    return pr_number
+            self.logger.error(f'Failed to create PR: {response.status_code} - {response.text}')
+            return None
+        except Exception as e:
+            self.logger.error(f'Error creating PR: {e}')
+            return None
+
+    def find_pull_request(self, branch_name: str) -> Optional[int]:
+        """Number of the open pull request from branch_name into main, if any"""
+        owner = self.repo_api.rsplit('/', 2)[1]
+        response = self.api.get(f'{self.repo_api}/pulls',
+                                params={'head': f'{owner}:{branch_name}', 'base': 'main', 'state': 'open'})
+        if response.status_code != 200:
+            self.logger.error(f'Failed to list PRs for {branch_name}: {response.status_code}')
+            return None
+        pulls = response.json()
+        return pulls[0]['number'] if pulls else None
+
+    def get_pull_request(self, pr_number: int) -> Optional[Dict[str, Any]]:
+        """Get a pull request's state"""
+        try:
+            response = self.api.get(f'{self.repo_api}/pulls/{pr_number}')
+            
+            if response.status_code == 200:
+                return response.json()
             else:
-                self.logger.error(f'Failed to create PR: {response.status_code} - {response.text}')
+                self.logger.error(f'Failed to get PR #{pr_number}: {response.status_code}')
                 return None
         except Exception as e:
-            self.logger.error(f'Error creating PR: {e}')
+            self.logger.error(f'Error getting PR #{pr_number}: {e}')
             return None
 
+    def wait_until_mergeable(self, pr_number: int, timeout: float = PR_MERGEABLE_TIMEOUT):
+        """Poll a new PR until GitHub has computed its mergeability
+
+        Replaces the fixed delay before merging: a PR that is ready is merged
+        after one check, a slow one is re-checked with growing delays.
+        """
+        delay = PR_POLL_INITIAL_DELAY
+        deadline = time.monotonic() + timeout
+        while True:
+            pull = self.get_pull_request(pr_number)
+            if pull is None or pull.get('mergeable') is not None or pull.get('merged'):
+                return
+            if time.monotonic() + delay > deadline:
+                self.logger.warning(f'PR #{pr_number} mergeability still unknown, trying to merge anyway')
+                return
+            self.pause(delay)
+            delay = min(delay * 2, PR_POLL_MAX_DELAY)
+
+    def pause(self, seconds: float):
+        """Wait within a sync, e.g. between PR polls; the httpx engine's stop() cuts it short"""
+        time.sleep(seconds)
+
     def merge_pull_request(self, pr_number: int) -> bool:
         """Merge pull request"""
         try:
@@ -314,7 +2766,7 @@ class EMADAutoSync:
                 'merge_method': 'squash'
             }
             
-            response = self.session.put(f'{GITHUB_API_BASE}/repos/{self.username}/{REPO_NAME}/pulls/{pr_number}/merge', json=merge_data)
+            response = self.api.put(f'{self.repo_api}/pulls/{pr_number}/merge', json=merge_data)
             
             if response.status_code == 200:
                 self.logger.info(f'Merged PR #{pr_number}')
@@ -329,7 +2781,7 @@ class EMADAutoSync:
     def delete_branch(self, branch_name: str) -> bool:
         """Delete branch after merge"""
         try:
-            response = self.session.delete(f'{GITHUB_API_BASE}/repos/{self.username}/{REPO_NAME}/git/refs/heads/{branch_name}')
+            response = self.api.delete(f'{self.repo_api}/git/refs/heads/{branch_name}')
             
             if response.status_code == 204:
                 self.logger.info(f'Deleted branch: {branch_name}')
@@ -341,68 +2793,207 @@ class EMADAutoSync:
             self.logger.error(f'Error deleting branch {branch_name}: {e}')
             return False
 
-    def process_changes(self, changes: Dict[str, List[str]]) -> bool:
-        """Process detected changes and sync to repository"""
-        if not any(changes.values()):
-            return True  # No changes to process
+    def settle_journal(self, changes: Dict[str, List[str]]):
+        """Decide what happens to an unfinished sync before resuming it
 
-        # Create timestamp-based branch name
-        timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M")
-        branch_name = f"auto-update-{timestamp}"
+        A pull request that was merged before the daemon could record it is
+        cleaned up. A branch holding changes that are no longer wanted (a file
+        written to it was since reverted) is deleted so a fresh one is started.
+        """
+        journal = self.journal
+        branch_name = journal['branch']
+        
+        if journal.get('pr') and self.journal_pull_merged(self.get_pull_request(journal['pr'])):
+            self.delete_branch(branch_name)
+            self.clear_journal()
+            return
+        
+        if self.journal_superseded(changes):
+            if journal.get('branch_created'):
+                self.delete_branch(branch_name)
+            self.clear_journal()
+        elif journal.get('branch_created') and self.branch_exists(branch_name) is False:
+            self.journal_branch_lost()
 
-        # Create branch
-        if not self.create_branch(branch_name):
-            return False
+    def journal_pull_merged(self, pull: Optional[Dict[str, Any]]) -> bool:
+        """Check the journaled PR: True if already merged; a PR closed unmerged is forgotten"""
+        journal = self.journal
+        if pull and pull.get('merged'):
+            self.logger.info(f'PR #{journal["pr"]} of the interrupted sync was already merged')
+            return True
+        if pull and pull.get('state') == 'closed':
+            self.logger.info(f'PR #{journal["pr"]} was closed without merging, opening a new one')
+            journal['pr'] = None
+        return False
 
-        success = True
+    def journal_superseded(self, changes: Dict[str, List[str]]) -> bool:
+        """Whether the journaled branch holds writes the current changes no longer want"""
+        wanted = set(changes['added'] + changes['modified'] + changes['deleted'])
+        if not wanted or any(file_path not in wanted for file_path in self.journal.get('done', {})):
+            self.logger.info(f'Abandoning branch {self.journal["branch"]} of an interrupted sync, '
+                             f'its changes were superseded')
+            return True
+        return False
+
+    def journal_branch_lost(self):
+        self.logger.info(f'Branch {self.journal["branch"]} of the interrupted sync was deleted, recreating it')
+        self.journal.update(branch_created=False, done={}, commit=None, pr=None)
+
+    def begin_journal(self, changes: Dict[str, List[str]]) -> Dict[str, Any]:
+        """Start a journal for a new sync, or resume the unfinished one, with the current changes"""
+        if self.journal is None:
+            # Create timestamp-based branch name
+            timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M")
+            self.journal = {'version': JOURNAL_VERSION, 'branch': f"auto-update-{timestamp}",
+                            'timestamp': timestamp, 'branch_created': False, 'pr': None}
+        else:
+            self.logger.info(f'Resuming interrupted sync on branch {self.journal["branch"]}')
+        self.journal['changes'] = changes
+        self.save_journal()
+        return self.journal
+
+    def record_pull_request(self, pr_number: int):
+        self.journal['pr'] = pr_number
+        self.save_journal()
+
+    def finish_sync(self, changes: Dict[str, List[str]]):
+        """Record a merged sync: the repository now holds these blobs and the journal is done"""
+        self.mark_synced(changes)
+        self.clear_journal()
+        if self.committed_tree is not None:
+            self.remote_tree = self.committed_tree
+
+    def uses_api(self) -> bool:
+        """Whether syncing needs the GitHub REST API (git mode without pull requests does not)"""
+        return self.sync_mode != 'git' or self.git_pull_requests
+
+    def git_push(self, changes: Dict[str, List[str]], message: str, branch: str) -> Optional[str]:
+        """Commit the changes on top of the remote main with git and push them to branch
 
+        Returns the pushed commit SHA, '' if the remote already matched, or
+        None if git failed.
+        """
         try:
-            # Process added files
-            for file_path in changes['added']:
-                commit_msg = f"Add {file_path}"
-                if not self.upload_file_to_branch(file_path, branch_name, commit_msg):
-                    success = False
+            commit_sha = self.git.commit_and_push(changes['added'] + changes['modified'], changes['deleted'],
+                                                  message, branch, base_branch='main')
+        except EMADGitError as e:
+            self.logger.error(f'Error pushing changes with git: {e}')
+            return None
+        if commit_sha is None:
+            self.logger.info(f'{self.git.remote}/main already holds these changes')
+        return commit_sha or ''
 
-            # Process modified files
-            for file_path in changes['modified']:
-                commit_msg = f"Update {file_path}"
-                if not self.upload_file_to_branch(file_path, branch_name, commit_msg):
-                    success = False
+    def push_changes_with_git(self, changes: Dict[str, List[str]]) -> bool:
+        """Sync through git: push straight to main, or (sync.git_pull_requests) via a merged PR"""
+        timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M")
+        total_changes = len(changes['added']) + len(changes['modified']) + len(changes['deleted'])
+        title = f"Auto-sync: {total_changes} file changes ({timestamp})"
+        
+        if not self.git_pull_requests:
+            return self.git_push(changes, title, 'main') is not None
+        
+        branch_name = f"auto-update-{timestamp}"
+        commit_sha = self.git_push(changes, title, branch_name)
+        if not commit_sha:
+            return commit_sha == ''
+        
+        pr_body = self.generate_pr_body(changes, timestamp, self.detect_renames(changes))
+        pr_number = self.create_pull_request(branch_name, title, pr_body)
+        if pr_number and self.merge_pull_request(pr_number):
+            self.delete_branch(branch_name)
+            return True
+        return False
 
-            # Process deleted files
-            for file_path in changes['deleted']:
-                commit_msg = f"Delete {file_path}"
-                if not self.delete_file_from_branch(file_path, branch_name, commit_msg):
-                    success = False
+    def process_changes(self, changes: Dict[str, List[str]]) -> bool:
+        """Process detected changes and sync to repository
 
+        Progress is journaled ahead of each step, so a sync that fails or is
+        interrupted resumes on the same branch and pull request, writing only
+        what is still missing. Callers commit file_hashes (save_manifest)
+        only after this returns True.
+        """
+        changes = self.skip_large_files(changes)
+        if self.sync_mode == 'git':
+            # A push either lands whole or not at all, so git mode needs no journal
+            if not any(changes.values()):
+                return True
+            success = self.push_changes_with_git(changes)
             if success:
-                # Create PR
-                total_changes = len(changes['added']) + len(changes['modified']) + len(changes['deleted'])
-                pr_title = f"Auto-sync: {total_changes} file changes ({timestamp})"
+                self.mark_synced(changes)
+            return success
+        
+        if not any(changes.values()) and self.journal is None:
+            return True  # No changes to process
+
+        # One tree fetch (none if main still has the tree we last wrote) replaces per-file SHA lookups
+        self.committed_tree = None
+        self.refresh_remote_tree()
+        
+        changes = self.skip_unchanged_remote(changes)
+        if self.journal is not None:
+            self.settle_journal(changes)
+        if not any(changes.values()):
+            if self.direct_push and self.journal is not None:
+                self.clear_journal()  # An interrupted direct push that landed before it was recorded
+            return True  # Everything already matches the repository
+
+        journal = self.begin_journal(changes)
+        timestamp = journal['timestamp']
+        branch_name = journal['branch']
+        total_changes = len(changes['added']) + len(changes['modified']) + len(changes['deleted'])
+        pr_title = f"Auto-sync: {total_changes} file changes ({timestamp})"
 
-                pr_body = self.generate_pr_body(changes, timestamp)
-                pr_number = self.create_pull_request(branch_name, pr_title, pr_body)
+        try:
+            if self.direct_push:
+                if self.commit_changes_to_main(changes, pr_title):
+                    self.finish_sync(changes)
+                    self.logger.info(f'Successfully synced {total_changes} changes')
+                    return True
+                self.logger.error('Failed to commit changes to main; uploaded blobs are journaled for the retry')
+                return False
+            
+            if self.sync_mode == 'batch' and not journal.get('done'):
+                success = self.commit_changes_to_branch(changes, branch_name, pr_title)
+                if not success and not journal.get('branch_created'):
+                    self.logger.warning('Batch sync failed, falling back to per-file uploads')
+                    success = self.push_changes_per_file(changes, branch_name)
+            else:
+                success = self.push_changes_per_file(changes, branch_name)
+
+            if success:
+                # Create PR, unless the interrupted sync already opened one
+                pr_number = journal.get('pr')
+                if not pr_number:
+                    pr_body = self.generate_pr_body(changes, timestamp, self.detect_renames(changes))
+                    pr_number = self.create_pull_request(branch_name, pr_title, pr_body)
+                    if pr_number:
+                        self.record_pull_request(pr_number)
 
                 if pr_number:
-                    # Auto-merge PR
-                    time.sleep(2)  # Brief delay for PR to be ready
+                    # Auto-merge PR once GitHub has worked out that it can, then clean up the branch
+                    self.wait_until_mergeable(pr_number)
                     if self.merge_pull_request(pr_number):
-                        # Clean up branch
-                        time.sleep(1)
                         self.delete_branch(branch_name)
+                        self.finish_sync(changes)
                         self.logger.info(f'Successfully synced {total_changes} changes')
                         return True
 
             # If we get here, something failed
-            self.logger.error(f'Failed to process changes, branch {branch_name} may need manual cleanup')
+            self.logger.error(f'Failed to process changes; progress on branch {branch_name} is journaled '
+                              f'and will resume on the next attempt')
             return False
 
         except Exception as e:
             self.logger.error(f'Error processing changes: {e}')
             return False
 
-    def generate_pr_body(self, changes: Dict[str, List[str]], timestamp: str) -> str:
-        """Generate descriptive PR body"""
+    def generate_pr_body(self, changes: Dict[str, List[str]], timestamp: str,
+                         renames: Optional[List[Rename]] = None) -> str:
+        """Generate descriptive PR body
+
+        Renamed files are listed once as renames instead of as a deletion and
+        an addition.
+        """
         body_parts = [
             f"**Automated sync from local BMAD-METHOD directory**",
             f"**Timestamp**: {timestamp}",
@@ -410,6 +3001,18 @@ class EMADAutoSync:
             f"## Changes Summary"
         ]
 
+        if renames:
+            renamed = {path for old_path, new_path, _ in renames for path in (old_path, new_path)}
+            changes = {kind: [file_path for file_path in file_paths if file_path not in renamed]
+                       for kind, file_paths in changes.items()}
+            body_parts.append(f"### 🔀 Renamed Files ({len(renames)})")
+            for old_path, new_path, similarity in renames[:10]:  # Limit to first 10
+                edited = f" ({similarity}% similar)" if similarity < 100 else ""
+                body_parts.append(f"- `{old_path}` → `{new_path}`{edited}")
+            if len(renames) > 10:
+                body_parts.append(f"- ... and {len(renames) - 10} more")
+            body_parts.append("")
+
         if changes['added']:
             body_parts.append(f"### ➕ Added Files ({len(changes['added'])})")
             for file_path in changes['added'][:10]:  # Limit to first 10
@@ -441,60 +3044,193 @@ class EMADAutoSync:
 
         return "\n".join(body_parts)
 
-    def monitor_cycle(self):
-        """Single monitoring cycle"""
-        try:
-            self.logger.info('Starting monitoring cycle...')
+    def start_watcher(self, backend: str = 'auto') -> bool:
+        """Start event-driven change detection; False means periodic scans are used"""
+        # Dirty paths may be directories, so the watcher only applies exclusions;
+        # include patterns are applied when the paths are rescanned
+        self.watcher = EMADChangeWatcher(self.bmad_path, self.should_exclude_dir, self.logger, backend)
+        if not self.watcher.start():
+            self.watcher = None
+            return False
+        return True
+
+    def stop_watcher(self):
+        """Stop the filesystem watcher if one is running"""
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+
+    def wait_for_changes(self, should_stop=None) -> Optional[Set[str]]:
+        """Block until the next monitoring cycle is due
+
+        Returns the dirty paths to rescan, or None when a full scan is due:
+        always in polling mode, and in watch mode when the safety-net interval
+        has elapsed or the watcher lost events.
+        """
+        if should_stop is None:
+            should_stop = lambda: not self.running
+        
+        if not (self.watcher and self.watcher.active):
+            # Queued changes are due sooner than the next interval: rescan then to see if they settled
+            pending_due = self.change_queue.due_in()
+            deadline = time.monotonic() + (self.monitor_interval if pending_due is None
+                                           else min(self.monitor_interval, pending_due))
+            while not should_stop():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                time.sleep(min(1.0, remaining))
+            return None
+        
+        while not should_stop():
+            if time.monotonic() - self.last_full_scan >= self.monitor_interval:
+                return None
+            
+            pending_due = self.change_queue.due_in()
+            if pending_due == 0.0:
+                return set()  # Quiet period over: sync what is queued
+            
+            if self.watcher.wait(1.0 if pending_due is None else min(1.0, pending_due)):
+                dirty_paths, overflow = self.watcher.drain()
+                if overflow:
+                    return None
+                if dirty_paths:
+                    return dirty_paths
+        
+        return set()
+
+    def last_change_time(self, changes: Dict[str, List[str]]) -> Optional[float]:
+        """Newest mtime among added/modified files, or None when files were deleted
 
-            # Detect changes
-            changes = self.detect_changes()
+        Lets changes that were already quiet when a scan found them skip the debounce.
+        """
+        if changes['deleted']:
+            return None
+        mtimes = [self.stat_cache[file_path][0][1] for file_path in changes['added'] + changes['modified']
+                  if file_path in self.stat_cache]
+        return max(mtimes) / 1e9 if mtimes else None
 
-            total_changes = sum(len(files) for files in changes.values())
+    def detect_and_queue(self, dirty_paths: Optional[Set[str]] = None):
+        """Detect changes and add them to the change queue"""
+        if dirty_paths is None or dirty_paths:
+            scope = 'full scan' if dirty_paths is None else f'{len(dirty_paths)} changed paths'
+            self.logger.info(f'Starting monitoring cycle ({scope})...')
 
-            if total_changes > 0:
-                self.logger.info(f'Detected {total_changes} changes: '
-                               f'{len(changes["added"])} added, '
-                               f'{len(changes["modified"])} modified, '
-                               f'{len(changes["deleted"])} deleted')
+        # Detect changes
+        changes = self.detect_changes(dirty_paths)
+        if changes is None:
+            self.logger.warning('Scan failed, no changes detected this cycle; the baseline is kept')
+            return 0
 
-                # Process changes
-                if self.process_changes(changes):
-                    self.logger.info('Changes successfully synced to repository')
-                else:
-                    self.logger.error('Failed to sync changes')
+        total_changes = sum(len(files) for files in changes.values())
+        scan_summary = (f'{self.scan_stats["rehashed"]} rehashed, '
+                        f'{self.scan_stats["skipped"]} skipped via stat cache')
+
+        if total_changes > 0:
+            self.logger.info(f'Detected {total_changes} changes: '
+                           f'{len(changes["added"])} added, '
+                           f'{len(changes["modified"])} modified, '
+                           f'{len(changes["deleted"])} deleted '
+                           f'({scan_summary})')
+            self.change_queue.add(changes, self.last_change_time(changes))
+        elif dirty_paths is None or dirty_paths:
+            self.logger.info(f'No changes detected ({scan_summary})')
+        return total_changes
+
+    def take_due_changes(self, detected: int, flush: bool = False) -> Optional[Dict[str, List[str]]]:
+        """Drain the queue if a sync is due (quiet, flushed, or a journaled sync to finish)"""
+        if self.change_queue.pending and not (flush or self.change_queue.ready()):
+            self.logger.info(f'{len(self.change_queue)} changes queued, syncing once quiet '
+                             f'(in {self.change_queue.due_in():.1f}s)')
+            return None
+        if self.change_queue.pending or detected > 0 or self.journal is not None:
+            return self.change_queue.drain()
+        return None
+
+    def sync_finished(self, changes: Dict[str, List[str]], success: bool):
+        """Commit the new baseline after a sync, or queue its changes for a retry"""
+        queued = sum(len(files) for files in changes.values())
+        if success:
+            self.sync_stats['syncs'] += 1
+            self.sync_stats['synced_changes'] += queued
+            if not self.change_queue.pending:
+                self.prefetched_blobs.clear()  # Committed, or for content that is gone
+            # Only now do the new hashes become the baseline a restart compares against
+            self.save_manifest()
+            if queued:
+                self.logger.info(f'{queued} changes successfully synced to repository')
             else:
-                self.logger.info('No changes detected')
+                self.logger.info('Queued changes cancelled each other out, nothing to sync')
+        else:
+            # Keep the changes; the journal lets the retry pick up where this attempt stopped
+            self.sync_stats['failed_syncs'] += 1
+            self.change_queue.requeue(changes, self.sync_retry_delay)
+            self.logger.error(f'Failed to sync changes, retrying in {self.sync_retry_delay:.0f}s')
+
+    def log_api_budget(self):
+        api_metrics = self.api.metrics()
+        if api_metrics['remaining'] is not None:
+            self.logger.info(f'GitHub API budget: {api_metrics["remaining"]}/{api_metrics["limit"]} remaining, '
+                             f'{api_metrics["retries"]} retries, '
+                             f'{api_metrics["throttle_seconds"]:.1f}s throttled so far')
+
+    def monitor_cycle(self, dirty_paths: Optional[Set[str]] = None, flush: bool = False):
+        """Single monitoring cycle
+
+        Detected changes are queued and synced once the workspace has been quiet
+        for the debounce period; flush syncs whatever is queued right away.
+        """
+        try:
+            detected = self.detect_and_queue(dirty_paths)
+            changes = self.take_due_changes(detected, flush)
+            if changes is not None:
+                self.sync_finished(changes, self.process_changes(changes))
+            self.log_api_budget()
 
         except Exception as e:
             self.logger.error(f'Error in monitoring cycle: {e}')
 
-    def run(self):
-        """Main monitoring loop"""
-        if not self.authenticate():
-            self.logger.error('Failed to authenticate with GitHub')
+    def test_cycle(self) -> bool:
+        """Authenticate, load the baseline and sync whatever is pending right away"""
+        if self.uses_api() and not self.authenticate():
             return False
+        self.establish_baseline()
+        self.monitor_cycle(flush=True)
+        return True
 
+    def log_startup(self):
         self.logger.info(f'Starting EMAD Auto-Sync monitoring...')
         self.logger.info(f'Monitoring directory: {self.bmad_path}')
-        self.logger.info(f'Repository: {self.username}/{REPO_NAME}')
+        if self.sync_mode == 'git':
+            self.logger.info(f'Repository: git remote {self.git.remote}')
+        else:
+            self.logger.info(f'Repository: {self.repository or f"{self.username}/{REPO_NAME}"}')
         self.logger.info(f'Monitor interval: {self.monitor_interval} seconds')
+        self.logger.info(f'Hash workers: {self.hash_workers}')
+
+    def run(self):
+        """Main monitoring loop"""
+        if self.uses_api() and not self.authenticate():
+            self.logger.error('Failed to authenticate with GitHub')
+            return False
+
+        self.log_startup()
 
-        # Initial scan to establish baseline
-        self.logger.info('Performing initial directory scan...')
-        self.file_hashes = self.scan_directory()
-        self.logger.info(f'Baseline established with {len(self.file_hashes)} files')
+        # Resume from the saved manifest or scan to establish a baseline
+        baseline_count = self.establish_baseline()
+        self.logger.info(f'Baseline established with {baseline_count} files')
 
         self.running = True
+        if self.watch_mode:
+            self.start_watcher()
 
         try:
+            dirty_paths = None  # The first cycle is always a full scan
             while self.running:
-                self.monitor_cycle()
+                self.monitor_cycle(dirty_paths)
 
-                # Wait for next cycle
-                for _ in range(self.monitor_interval):
-                    if not self.running:
-                        break
-                    time.sleep(1)
+                # Wait for the next interval or, in watch mode, for changes
+                dirty_paths = self.wait_for_changes()
 
         except KeyboardInterrupt:
             self.logger.info('Received keyboard interrupt, shutting down...')
@@ -502,10 +3238,25 @@ class EMADAutoSync:
             self.logger.error(f'Unexpected error in main loop: {e}')
         finally:
             self.running = False
+            self.stop_watcher()
             self.logger.info('EMAD Auto-Sync monitoring stopped')
 
         return True
 
+def sync_engine_class(engine: str) -> type:
+    """EMADAutoSync, or EMADHttpxAutoSync for the httpx engine when httpx is installed"""
+    if engine == 'httpx':
+        from emad_httpx_sync import EMADHttpxAutoSync, HTTPX_AVAILABLE
+        if HTTPX_AVAILABLE:
+            return EMADHttpxAutoSync
+        logging.getLogger(__name__).warning('The httpx engine needs httpx (pip install httpx), using threads')
+    return EMADAutoSync
+
+
+def run_engine(result):
+    """Run the httpx engine's coroutine to completion; threaded engine results pass through"""
+    return asyncio.run(result) if asyncio.iscoroutine(result) else result
+
 def main():
     """Main entry point"""
     parser = argparse.ArgumentParser(description='EMAD Auto-Sync Monitoring System')
@@ -513,47 +3264,115 @@ def main():
                        help='Path to BMAD-METHOD directory to monitor')
     parser.add_argument('--interval', type=int, default=DEFAULT_MONITOR_INTERVAL,
                        help='Monitoring interval in seconds (default: 3600)')
+    parser.add_argument('--hash-workers', type=int, default=None,
+                       help='Number of hashing threads (default: performance.worker_count from config)')
+    parser.add_argument('--watch', action='store_true', default=None,
+                       help='Sync on filesystem events; --interval becomes the full-scan safety net')
+    parser.add_argument('--detector', choices=DETECTORS, default=None,
+                       help='scan: walk and stat the whole tree (default); git-status: rescan only what '
+                            'git status reports, when bmad_path is in a git worktree')
+    parser.add_argument('--sync-mode', choices=SYNC_MODES, default=None,
+                       help='batch: one commit per cycle (default); per-file: one commit per file; '
+                            'git: commit with git plumbing and push (bmad_path must be a git checkout)')
+    parser.add_argument('--direct-push', action='store_true', default=None,
+                       help='Batch mode: fast-forward main with each sync commit instead of merging a pull request '
+                            '(or set sync.direct_push)')
+    parser.add_argument('--upload-concurrency', type=int, default=None,
+                       help=f'Parallel blob uploads in batch mode (default: {DEFAULT_UPLOAD_CONCURRENCY}, '
+                            f'max: {MAX_UPLOAD_CONCURRENCY})')
+    parser.add_argument('--engine', choices=SYNC_ENGINES, default=None,
+                       help='threads: requests.Session (default); httpx: the same sync, its requests sent by httpx '
+                            'on one event loop and connection pool, so stopping fails them at once')
+    parser.add_argument('--workspaces', type=str, default=None,
+                       help='JSON file listing several workspaces to monitor from this one process, '
+                            'on shared hash/upload pools (see emad_workspace_daemon.py)')
     parser.add_argument('--daemon', action='store_true',
                        help='Run as daemon (background process)')
     parser.add_argument('--test', action='store_true',
                        help='Run a single test cycle and exit')
+    parser.add_argument('--drift-report', action='store_true',
+                       help='List repository files that differ from the last sync and exit')
 
     args = parser.parse_args()
 
+    if args.workspaces:
+        return run_workspaces(args)
+
     # Validate BMAD path
     bmad_path = Path(args.bmad_path)
     if not bmad_path.exists():
         print(f'Error: BMAD path does not exist: {bmad_path}')
         return 1
 
-    # Create auto-sync instance
-    auto_sync = EMADAutoSync(bmad_path, args.interval)
+    # Create auto-sync instance; the drift report is a one-off read and always uses the threaded engine
+    engine = args.engine or load_sync_settings(bmad_path)['sync'].get('engine', 'threads')
+    sync_class = EMADAutoSync if args.drift_report else sync_engine_class(engine)
+    auto_sync = sync_class(bmad_path, args.interval, hash_workers=args.hash_workers, watch=args.watch,
+                           sync_mode=args.sync_mode, upload_concurrency=args.upload_concurrency,
+                           direct_push=args.direct_push, detector=args.detector)
 
     if args.test:
         # Run single test cycle
         print('Running test cycle...')
-        if auto_sync.authenticate():
-            auto_sync.file_hashes = auto_sync.scan_directory()
-            auto_sync.monitor_cycle()
+        if run_engine(auto_sync.test_cycle()):
             print('Test cycle completed')
             return 0
         else:
             print('Authentication failed')
             return 1
 
-    if args.daemon:
-        # Run as daemon
+    if args.drift_report:
+        if not auto_sync.authenticate():
+            print('Authentication failed')
+            return 1
+        auto_sync.establish_baseline()
+        report = auto_sync.drift_report()
+        if report is None:
+            print('Could not read the repository tree')
+            return 1
+        for path in report['changed_remotely']:
+            print(f'changed remotely: {path}')
+        for path in report['remote_only']:
+            print(f'only in repository: {path}')
+        print(f"{len(report['changed_remotely'])} changed remotely, {len(report['remote_only'])} only in repository")
+        return 0
+
+    run_detached(args.daemon, lambda: run_engine(auto_sync.run()))
+    return 0
+
+def run_detached(detach: bool, run: Callable[[], Any]):
+    """Run the monitoring loop as a daemon (background process) or in the foreground"""
+    if detach:
         try:
             import daemon
             with daemon.DaemonContext():
-                auto_sync.run()
+                run()
         except ImportError:
             print('python-daemon not available, running in foreground')
-            auto_sync.run()
+            run()
     else:
-        # Run in foreground
-        auto_sync.run()
+        run()
 
+def run_workspaces(args) -> int:
+    """Monitor every workspace listed in args.workspaces from this one process"""
+    from emad_workspace_daemon import EMADWorkspaceDaemon, setup_daemon_logging
+    
+    setup_daemon_logging(DEFAULT_BMAD_PATH / 'logs')
+    try:
+        workspace_daemon = EMADWorkspaceDaemon.from_config(Path(args.workspaces))
+    except ValueError as e:
+        print(f'Error: {e}')
+        return 1
+    
+    if args.test:
+        print(f'Running test cycle for {len(workspace_daemon.workspaces)} workspaces...')
+        if workspace_daemon.run_once():
+            print('Test cycle completed')
+            return 0
+        print('Authentication failed')
+        return 1
+    
+    run_detached(args.daemon, workspace_daemon.run)
     return 0
 
 if __name__ == '__main__':
@@ -11,6 +11,7 @@ import sys
 import os
 import time
 import signal
+import asyncio
 import subprocess
 import threading
 from pathlib import Path
@@ -114,22 +115,35 @@ class EMADBackgroundRunner:
         # Write PID file
         self.write_pid()
         
+        # One process for every workspace listed in config/emad-workspaces.json
+        sys.path.insert(0, str(self.script_dir))
+        from emad_workspace_daemon import DEFAULT_WORKSPACES_FILE
+        if (self.script_dir / DEFAULT_WORKSPACES_FILE).exists():
+            return self.run_workspace_daemon(self.script_dir / DEFAULT_WORKSPACES_FILE)
+        
         # Import and create auto-sync instance
         try:
-            sys.path.insert(0, str(self.script_dir))
-            from emad_auto_sync import EMADAutoSync
+            from emad_auto_sync import EMADAutoSync, load_sync_settings, sync_engine_class
             
-            auto_sync = EMADAutoSync(self.script_dir)
-            self.log(f"Created auto-sync instance for: {self.script_dir}")
+            # The httpx engine falls back to threads when httpx is not installed
+            sync_class = sync_engine_class(load_sync_settings(self.script_dir)['sync'].get('engine', 'threads'))
+            auto_sync = sync_class(self.script_dir)
+            engine = 'threads' if sync_class is EMADAutoSync else 'httpx'
+            self.log(f"Created auto-sync instance for: {self.script_dir} ({engine} engine)")
             
         except Exception as e:
             self.log(f"Failed to create auto-sync instance: {e}")
             self.remove_pid()
             return False
         
-        # Test authentication
+        if engine == 'httpx':
+            return self.run_httpx_engine(auto_sync)
+
+        # Test authentication (git mode without pull requests only needs git's own credentials)
         try:
-            if auto_sync.authenticate():
+            if not auto_sync.uses_api():
+                self.log(f"Syncing through git remote: {auto_sync.git.remote}")
+            elif auto_sync.authenticate():
                 self.log(f"Authentication successful as: {auto_sync.username}")
             else:
                 self.log("Authentication failed")
@@ -140,45 +154,37 @@ class EMADBackgroundRunner:
             self.remove_pid()
             return False
         
-        # Initial scan
+        # Load manifest or scan to establish baseline
         try:
-            auto_sync.file_hashes = auto_sync.scan_directory()
-            self.log(f"Baseline established with {len(auto_sync.file_hashes)} files")
+            baseline_count = auto_sync.establish_baseline()
+            self.log(f"Baseline established with {baseline_count} files")
         except Exception as e:
-            self.log(f"Initial scan failed: {e}")
+            self.log(f"Baseline setup failed: {e}")
             self.remove_pid()
             return False
         
-        # Start failsafe monitoring if available
-        if self.failsafe:
-            try:
-                self.failsafe.start_monitoring()
-                self.log("Failsafe monitoring started")
-
-                # Update initialization timestamp
-                self.failsafe.state["last_emad_initialization"] = datetime.now().isoformat()
-                self.failsafe.save_state()
-
-            except Exception as e:
-                self.log(f"Warning: Could not start failsafe monitoring: {e}")
+        self.start_failsafe()
 
         # Main monitoring loop
         self.running = True
         self.log("Starting main monitoring loop...")
 
+        if auto_sync.watch_mode and auto_sync.start_watcher():
+            self.log("Filesystem watcher started, full scans every "
+                     f"{auto_sync.monitor_interval} seconds as a safety net")
+
         try:
+            dirty_paths = None  # The first cycle is always a full scan
             while self.running:
                 try:
-                    auto_sync.monitor_cycle()
+                    auto_sync.monitor_cycle(dirty_paths)
 
-                    # Wait for next cycle (check for stop every second)
-                    for _ in range(auto_sync.monitor_interval):
-                        if not self.running:
-                            break
-                        time.sleep(1)
+                    # Wait for next cycle or watcher events (checks for stop every second)
+                    dirty_paths = auto_sync.wait_for_changes(lambda: not self.running)
 
                 except Exception as e:
                     self.log(f"Error in monitoring cycle: {e}")
+                    dirty_paths = None
                     # Wait 1 minute before retrying
                     for _ in range(60):
                         if not self.running:
@@ -191,20 +197,92 @@ class EMADBackgroundRunner:
             self.log(f"Unexpected error: {e}")
         finally:
             self.running = False
+            auto_sync.stop_watcher()
 
-            # Stop failsafe monitoring
-            if self.failsafe:
-                try:
-                    self.failsafe.stop_monitoring()
-                    self.log("Failsafe monitoring stopped")
-                except Exception as e:
-                    self.log(f"Warning: Error stopping failsafe monitoring: {e}")
+            self.stop_failsafe()
+            self.remove_pid()
+            self.log("EMAD Background Runner stopped")
+
+        return True
+
+    def run_httpx_engine(self, auto_sync):
+        """Run the httpx engine, which authenticates, loads its baseline and loops by itself
+
+        SIGINT/SIGTERM cancel it immediately; the interrupted sync resumes
+        from its journal on the next start.
+        """
+        self.start_failsafe()
+        self.running = True
+        self.log("Starting httpx engine monitoring loop...")
+
+        try:
+            if not asyncio.run(auto_sync.run()):
+                self.log("Authentication failed")
+                return False
+        except KeyboardInterrupt:
+            self.log("Received keyboard interrupt")
+        except Exception as e:
+            self.log(f"Unexpected error: {e}")
+        finally:
+            self.running = False
+            self.stop_failsafe()
+            self.remove_pid()
+            self.log("EMAD Background Runner stopped")
+
+        return True
 
+    def run_workspace_daemon(self, workspaces_file):
+        """Monitor every listed workspace on shared pools until stopped"""
+        try:
+            from emad_workspace_daemon import EMADWorkspaceDaemon
+            workspace_daemon = EMADWorkspaceDaemon.from_config(workspaces_file)
+            self.log(f"Created workspace daemon for {len(workspace_daemon.workspaces)} workspaces "
+                     f"from {workspaces_file}")
+        except Exception as e:
+            self.log(f"Failed to create workspace daemon: {e}")
+            self.remove_pid()
+            return False
+
+        self.start_failsafe()
+        self.running = True
+
+        try:
+            if not workspace_daemon.run():
+                self.log("Authentication failed")
+                return False
+        except Exception as e:
+            self.log(f"Unexpected error: {e}")
+        finally:
+            self.running = False
+            self.stop_failsafe()
             self.remove_pid()
             self.log("EMAD Background Runner stopped")
 
         return True
 
+    def start_failsafe(self):
+        """Start failsafe monitoring if available"""
+        if self.failsafe:
+            try:
+                self.failsafe.start_monitoring()
+                self.log("Failsafe monitoring started")
+
+                # Update initialization timestamp
+                self.failsafe.state["last_emad_initialization"] = datetime.now().isoformat()
+                self.failsafe.save_state()
+
+            except Exception as e:
+                self.log(f"Warning: Could not start failsafe monitoring: {e}")
+
+    def stop_failsafe(self):
+        """Stop failsafe monitoring if it was started"""
+        if self.failsafe:
+            try:
+                self.failsafe.stop_monitoring()
+                self.log("Failsafe monitoring stopped")
+            except Exception as e:
+                self.log(f"Warning: Error stopping failsafe monitoring: {e}")
+
     def stop(self):
         """Stop the background runner"""
         if not self.is_running():
@@ -23,6 +23,11 @@ from typing import Dict, List, Optional, Tuple
 import threading
 import subprocess
 
+# Add current directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+from emad_path_matcher import EMADPathMatcher
+
 class EMADFailsafeConfig:
     """Configuration management for EMAD failsafe system"""
     
@@ -144,6 +149,14 @@ class EMADFailsafeSystem:
         # Monitoring threads
         self.failsafe_threads = []
         
+        # Files ignored when looking for recent changes
+        self.ignore_matcher = EMADPathMatcher.for_workspace(
+            emad_dir,
+            [".git", "__pycache__", "node_modules", ".vscode", "logs", "config",
+             "*.log", "*.tmp", "*.temp", "*.pyc"],
+            ignore_case=True
+        )
+        
         self.logger.info("EMAD Failsafe System initialized")
     
     def setup_logging(self):
@@ -241,13 +254,11 @@ class EMADFailsafeSystem:
     
     def _should_ignore_file(self, file_path: Path) -> bool:
         """Check if file should be ignored in monitoring"""
-        ignore_patterns = [
-            ".git", "__pycache__", "node_modules", ".vscode",
-            "logs", "config", ".log", ".tmp", ".temp", ".pyc"
-        ]
-        
-        file_str = str(file_path).lower()
-        return any(pattern in file_str for pattern in ignore_patterns)
+        try:
+            relative_path = file_path.relative_to(self.emad_dir)
+        except ValueError:
+            return True
+        return self.ignore_matcher.is_path_excluded(str(relative_path))
     
     def check_project_completion_status(self) -> Dict:
         """Check if project has been marked as completed"""
@@ -23,15 +23,39 @@ if main_script_path.exists():
     
     # Re-export all the important classes and constants
     EMADAutoSync = emad_auto_sync_main.EMADAutoSync
+    EMADStreamingUploadBody = emad_auto_sync_main.EMADStreamingUploadBody
+    EMADRequestScheduler = emad_auto_sync_main.EMADRequestScheduler
+    EMADChangeQueue = emad_auto_sync_main.EMADChangeQueue
+    EMADChangeWatcher = emad_auto_sync_main.EMADChangeWatcher
+    EMADWatchLimitError = emad_auto_sync_main.EMADWatchLimitError
     DEFAULT_BMAD_PATH = emad_auto_sync_main.DEFAULT_BMAD_PATH
     DEFAULT_MONITOR_INTERVAL = emad_auto_sync_main.DEFAULT_MONITOR_INTERVAL
+    DEFAULT_HASH_WORKERS = emad_auto_sync_main.DEFAULT_HASH_WORKERS
+    DEFAULT_UPLOAD_CONCURRENCY = emad_auto_sync_main.DEFAULT_UPLOAD_CONCURRENCY
+    DEFAULT_RETRY_ATTEMPTS = emad_auto_sync_main.DEFAULT_RETRY_ATTEMPTS
+    REQUEST_TIMEOUT = emad_auto_sync_main.REQUEST_TIMEOUT
+    GITHUB_API_BASE = emad_auto_sync_main.GITHUB_API_BASE
+    PR_POLL_INITIAL_DELAY = emad_auto_sync_main.PR_POLL_INITIAL_DELAY
+    PR_POLL_MAX_DELAY = emad_auto_sync_main.PR_POLL_MAX_DELAY
+    PR_MERGEABLE_TIMEOUT = emad_auto_sync_main.PR_MERGEABLE_TIMEOUT
+    FAST_FORWARD_ATTEMPTS = emad_auto_sync_main.FAST_FORWARD_ATTEMPTS
+    SYNC_ENGINES = emad_auto_sync_main.SYNC_ENGINES
+    load_sync_settings = emad_auto_sync_main.load_sync_settings
+    sync_engine_class = emad_auto_sync_main.sync_engine_class
+    run_engine = emad_auto_sync_main.run_engine
     
     # Re-export the main function if needed
     if hasattr(emad_auto_sync_main, 'main'):
         main = emad_auto_sync_main.main
     
     # Make this module act as a proxy to the main module
-    __all__ = ['EMADAutoSync', 'DEFAULT_BMAD_PATH', 'DEFAULT_MONITOR_INTERVAL', 'main']
+    __all__ = ['EMADAutoSync', 'EMADStreamingUploadBody', 'EMADRequestScheduler', 'EMADChangeQueue',
+               'EMADChangeWatcher', 'EMADWatchLimitError',
+               'DEFAULT_BMAD_PATH', 'DEFAULT_MONITOR_INTERVAL', 'DEFAULT_HASH_WORKERS',
+               'DEFAULT_UPLOAD_CONCURRENCY', 'DEFAULT_RETRY_ATTEMPTS', 'REQUEST_TIMEOUT', 'GITHUB_API_BASE',
+               'PR_POLL_INITIAL_DELAY', 'PR_POLL_MAX_DELAY', 'PR_MERGEABLE_TIMEOUT', 'FAST_FORWARD_ATTEMPTS',
+               'SYNC_ENGINES', 'load_sync_settings',
+               'sync_engine_class', 'run_engine', 'main']
     
 else:
     raise ImportError(f"Main script not found: {main_script_path}")
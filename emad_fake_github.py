@@ -0,0 +1,593 @@
+#!/usr/bin/env python3
+
+"""
+EMAD Fake GitHub
+
+A small in-process stand-in for the parts of the GitHub REST API used by
+EMAD Auto-Sync: the Git Data API (refs, commits, trees, blobs), the
+Contents API, and pull requests. Objects get real git SHA-1 ids, so tree
+and blob SHAs match what GitHub would return for the same content.
+
+Latency and a primary rate limit can be simulated, failures and lost
+responses can be queued per route, and every call and uploaded byte is
+counted. Used by the test
+suite and benchmarks to exercise the sync engine without a token or
+network access:
+
+    with EMADFakeGitHub() as github:
+        auto_sync = EMADAutoSync(path, api_base=github.url)
+        ...
+        github.files('main')  # {path: bytes}
+"""
+
+import re
+import json
+import time
+import base64
+import hashlib
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+FAKE_LOGIN = 'emad-test'
+BLOB_MODES = ('100644', '100755', '120000')
+
+
+class EMADFakeGitHubError(Exception):
+    """An API error: HTTP status plus message"""
+
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+def git_object_sha(object_type: str, payload: bytes) -> str:
+    """SHA-1 of a git object, as computed by git hash-object"""
+    return hashlib.sha1(f'{object_type} {len(payload)}\0'.encode() + payload).hexdigest()
+
+
+class EMADFakeGitHub:
+    """Thread-safe fake of one GitHub repository served over local HTTP"""
+
+    def __init__(self, files: Optional[Dict[str, bytes]] = None, login: str = FAKE_LOGIN, latency: float = 0.0,
+                 rate_limit: Optional[int] = None, rate_limit_window: float = 3600.0):
+        self.login = login
+        self.latency = latency  # Seconds added to every response, like a round trip to api.github.com
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        # Primary rate limit: rate_limit requests per window, reported in X-RateLimit-* headers
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.rate_limit_used = 0
+        self.rate_limit_reset = time.time() + rate_limit_window
+        self.rate_limited = 0
+
+        # GitHub truncates recursive tree listings (100,000 entries); tests can lower the limit
+        self.tree_listing_limit: Optional[int] = None
+
+        # Queued failures per route name: list of (status, headers, message); status 0 drops the connection
+        self.failures: Dict[str, List[Tuple[int, Dict[str, str], str]]] = {}
+        # Calls per route handled as usual whose response is then dropped, as when a connection breaks in between
+        self.lost_responses = Counter()
+        self.lock = threading.RLock()
+        self.objects: Dict[str, Tuple[str, object]] = {}
+        self.refs: Dict[str, str] = {}
+        self.pulls: Dict[int, Dict] = {}
+        self.calls = Counter()
+        self.bytes_received = 0  # Request bodies, i.e. what a client uploaded
+        self.bytes_sent = 0      # Response bodies
+        self.server = None
+        self.thread = None
+
+        tree_sha = self.write_tree_from_files({path: content for path, content in (files or {}).items()})
+        self.refs['heads/main'] = self.write_commit(tree_sha, [], 'Initial commit')
+
+    # Context manager / server lifecycle
+
+    def __enter__(self) -> 'EMADFakeGitHub':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self) -> str:
+        handler = type('EMADFakeGitHubHandler', (_RequestHandler,), {'github': self})
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name='emad-fake-github', daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    # Object store
+
+    def put_object(self, object_type: str, payload: bytes, parsed) -> str:
+        sha = git_object_sha(object_type, payload)
+        with self.lock:
+            self.objects.setdefault(sha, (object_type, parsed))
+        return sha
+
+    def get_object(self, sha: str, object_type: str):
+        with self.lock:
+            stored = self.objects.get(sha)
+        if stored is None or stored[0] != object_type:
+            raise EMADFakeGitHubError(404, f'{object_type} {sha} not found')
+        return stored[1]
+
+    def write_blob(self, content: bytes) -> str:
+        return self.put_object('blob', content, content)
+
+    def write_tree(self, entries: Dict[str, Tuple[str, str, str]]) -> str:
+        """entries: name -> (mode, type, sha)"""
+        def sort_key(name):
+            return name + '/' if entries[name][1] == 'tree' else name
+
+        payload = b''.join(
+            f'{entries[name][0] if entries[name][1] != "tree" else "40000"} {name}\0'.encode() +
+            bytes.fromhex(entries[name][2])
+            for name in sorted(entries, key=sort_key)
+        )
+        return self.put_object('tree', payload, dict(entries))
+
+    def write_commit(self, tree_sha: str, parents, message: str) -> str:
+        timestamp = int(time.time())
+        lines = [f'tree {tree_sha}'] + [f'parent {parent}' for parent in parents] + [
+            f'author EMAD Test <emad@example.com> {timestamp} +0000',
+            f'committer EMAD Test <emad@example.com> {timestamp} +0000',
+            '', message]
+        commit = {'tree': tree_sha, 'parents': list(parents), 'message': message}
+        return self.put_object('commit', '\n'.join(lines).encode(), commit)
+
+    def flatten_tree(self, tree_sha: str, prefix: str = '') -> Dict[str, Tuple[str, str]]:
+        """Recursive listing of blobs: path -> (mode, sha)"""
+        listing = {}
+        for name, (mode, object_type, sha) in self.get_object(tree_sha, 'tree').items():
+            if object_type == 'tree':
+                listing.update(self.flatten_tree(sha, prefix + name + '/'))
+            else:
+                listing[prefix + name] = (mode, sha)
+        return listing
+
+    def write_tree_from_listing(self, listing: Dict[str, Tuple[str, str]]) -> str:
+        root = {}
+        for path, entry in listing.items():
+            node = root
+            *directories, name = path.split('/')
+            for directory in directories:
+                node = node.setdefault(directory, {})
+            node[name] = entry
+
+        def write(node) -> str:
+            entries = {}
+            for name, child in node.items():
+                if isinstance(child, dict):
+                    entries[name] = ('040000', 'tree', write(child))
+                else:
+                    entries[name] = (child[0], 'blob', child[1])
+            return self.write_tree(entries)
+
+        return write(root)
+
+    def write_tree_from_files(self, files: Dict[str, bytes]) -> str:
+        return self.write_tree_from_listing({path: ('100644', self.write_blob(content))
+                                             for path, content in files.items()})
+
+    # Inspection helpers for tests
+
+    def head(self, branch: str = 'main') -> str:
+        with self.lock:
+            return self.refs[f'heads/{branch}']
+
+    def listing(self, branch: str = 'main') -> Dict[str, Tuple[str, str]]:
+        """path -> (mode, blob SHA) for every file on a branch"""
+        return self.flatten_tree(self.get_object(self.head(branch), 'commit')['tree'])
+
+    def files(self, branch: str = 'main') -> Dict[str, bytes]:
+        return {path: self.get_object(sha, 'blob') for path, (_, sha) in self.listing(branch).items()}
+
+    def commit_count(self, branch: str = 'main') -> int:
+        count, sha = 0, self.head(branch)
+        while sha:
+            count += 1
+            parents = self.get_object(sha, 'commit')['parents']
+            sha = parents[0] if parents else None
+        return count
+
+    def fail_next(self, route: str, status: int, count: int = 1, headers: Optional[Dict[str, str]] = None,
+                  message: str = 'Server Error'):
+        """Make the next count calls to route (e.g. 'POST create_blob') fail; status 0 drops the connection"""
+        with self.lock:
+            self.failures.setdefault(route, []).extend([(status, headers or {}, message)] * count)
+
+    def lose_next_response(self, route: str, count: int = 1):
+        """Handle the next count calls to route, then drop the connection instead of responding"""
+        with self.lock:
+            self.lost_responses[route] += count
+
+    def take_lost_response(self, route: str) -> bool:
+        with self.lock:
+            if self.lost_responses[route] <= 0:
+                return False
+            self.lost_responses[route] -= 1
+            return True
+
+    def take_failure(self, route: str) -> Optional[Tuple[int, Dict[str, str], str]]:
+        with self.lock:
+            queued = self.failures.get(route)
+            return queued.pop(0) if queued else None
+
+    def consume_rate_limit(self) -> Dict[str, str]:
+        """Count one request against the primary limit; returns the headers to send"""
+        with self.lock:
+            now = time.time()
+            if now >= self.rate_limit_reset:
+                self.rate_limit_used = 0
+                self.rate_limit_reset = now + self.rate_limit_window
+            exceeded = self.rate_limit_used >= self.rate_limit
+            if exceeded:
+                self.rate_limited += 1
+            else:
+                self.rate_limit_used += 1
+            headers = {
+                'X-RateLimit-Limit': str(self.rate_limit),
+                'X-RateLimit-Remaining': str(self.rate_limit - self.rate_limit_used),
+                'X-RateLimit-Reset': f'{self.rate_limit_reset:.3f}',
+                'X-RateLimit-Resource': 'core',
+            }
+        if exceeded:
+            raise EMADFakeGitHubError(403, 'API rate limit exceeded', headers)
+        return headers
+
+    def api_calls(self, prefix: str = '') -> int:
+        with self.lock:
+            return sum(count for route, count in self.calls.items() if route.startswith(prefix))
+
+    def reset_counters(self):
+        """Zero the call and byte counters, e.g. between benchmark phases"""
+        with self.lock:
+            self.calls.clear()
+            self.bytes_received = 0
+            self.bytes_sent = 0
+            self.max_in_flight = self.in_flight
+
+    # API operations
+
+    def update_ref(self, ref: str, sha: str, create: bool = False, expected: Optional[str] = None):
+        self.get_object(sha, 'commit')
+        with self.lock:
+            if create and ref in self.refs:
+                raise EMADFakeGitHubError(422, 'Reference already exists')
+            if not create and ref not in self.refs:
+                raise EMADFakeGitHubError(422, 'Reference does not exist')
+            if expected is not None and self.refs[ref] != expected:
+                raise EMADFakeGitHubError(422, 'Update is not a fast forward')
+            self.refs[ref] = sha
+
+    def create_tree(self, request: Dict) -> str:
+        listing = {}
+        if request.get('base_tree'):
+            listing = self.flatten_tree(request['base_tree'])
+
+        for entry in request.get('tree', []):
+            path = entry['path']
+            if entry.get('sha') is None and 'content' not in entry:
+                if path not in listing:
+                    raise EMADFakeGitHubError(422, f'GitRPC::BadObjectState: {path} does not exist in the base tree')
+                del listing[path]
+                continue
+            if entry.get('mode') not in BLOB_MODES or entry.get('type', 'blob') != 'blob':
+                raise EMADFakeGitHubError(422, f'Unsupported tree entry for {path}')
+            sha = entry['sha'] if entry.get('sha') else self.write_blob(entry['content'].encode())
+            self.get_object(sha, 'blob')
+            listing[path] = (entry['mode'], sha)
+
+        return self.write_tree_from_listing(listing)
+
+    def commit_file_change(self, branch: str, path: str, content: Optional[bytes], sha: Optional[str],
+                           message: str) -> Dict:
+        """Contents API create/update/delete: one commit per call"""
+        with self.lock:
+            parent = self.head(branch)
+            listing = self.flatten_tree(self.get_object(parent, 'commit')['tree'])
+            existing = listing.get(path)
+
+            if existing and sha != existing[1]:
+                raise EMADFakeGitHubError(409 if sha else 422, f'{path} does not match sha' if sha
+                                          else '"sha" wasn\'t supplied.')
+            if content is None:
+                if not existing:
+                    raise EMADFakeGitHubError(404, 'Not Found')
+                del listing[path]
+                blob_sha = None
+            else:
+                blob_sha = self.write_blob(content)
+                listing[path] = ('100644', blob_sha)
+
+            commit_sha = self.write_commit(self.write_tree_from_listing(listing), [parent], message)
+            self.update_ref(f'heads/{branch}', commit_sha, expected=parent)
+            return {'content': {'path': path, 'sha': blob_sha} if blob_sha else None, 'commit': {'sha': commit_sha}}
+
+    def merge_pull(self, number: int, request: Dict) -> Dict:
+        with self.lock:
+            pull = self.pulls.get(number)
+            if pull is None:
+                raise EMADFakeGitHubError(404, 'Not Found')
+            if pull['merged']:
+                raise EMADFakeGitHubError(405, 'Pull Request is not mergeable')
+
+            base_head = self.head(pull['base'])
+            head_tree = self.get_object(self.head(pull['head']), 'commit')['tree']
+            message = request.get('commit_title') or pull['title']
+            merge_sha = self.write_commit(head_tree, [base_head], message)
+            self.update_ref(f'heads/{pull["base"]}', merge_sha, expected=base_head)
+            pull['merged'] = True
+            pull['state'] = 'closed'
+            return {'sha': merge_sha, 'merged': True, 'message': 'Pull Request successfully merged'}
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """Routes GitHub REST calls onto an EMADFakeGitHub"""
+
+    github: EMADFakeGitHub = None
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+    ROUTES = [
+        ('GET', r'/user', 'user'),
+        ('GET', r'/repos/[^/]+/[^/]+/git/refs/(?P<ref>heads/.+)', 'get_ref'),
+        ('POST', r'/repos/[^/]+/[^/]+/git/refs', 'create_ref'),
+        ('PATCH', r'/repos/[^/]+/[^/]+/git/refs/(?P<ref>heads/.+)', 'patch_ref'),
+        ('DELETE', r'/repos/[^/]+/[^/]+/git/refs/(?P<ref>heads/.+)', 'delete_ref'),
+        ('GET', r'/repos/[^/]+/[^/]+/git/commits/(?P<sha>[0-9a-f]{40})', 'get_commit'),
+        ('POST', r'/repos/[^/]+/[^/]+/git/commits', 'create_commit'),
+        ('GET', r'/repos/[^/]+/[^/]+/git/trees/(?P<sha>[0-9a-f]{40})', 'get_tree'),
+        ('POST', r'/repos/[^/]+/[^/]+/git/trees', 'create_tree'),
+        ('GET', r'/repos/[^/]+/[^/]+/git/blobs/(?P<sha>[0-9a-f]{40})', 'get_blob'),
+        ('POST', r'/repos/[^/]+/[^/]+/git/blobs', 'create_blob'),
+        ('GET', r'/repos/[^/]+/[^/]+/contents/(?P<path>.+)', 'get_contents'),
+        ('PUT', r'/repos/[^/]+/[^/]+/contents/(?P<path>.+)', 'put_contents'),
+        ('DELETE', r'/repos/[^/]+/[^/]+/contents/(?P<path>.+)', 'delete_contents'),
+        ('GET', r'/repos/[^/]+/[^/]+/pulls', 'list_pulls'),
+        ('POST', r'/repos/[^/]+/[^/]+/pulls', 'create_pull'),
+        ('GET', r'/repos/[^/]+/[^/]+/pulls/(?P<number>\d+)', 'get_pull'),
+        ('PUT', r'/repos/[^/]+/[^/]+/pulls/(?P<number>\d+)/merge', 'merge_pull'),
+    ]
+    COMPILED_ROUTES = [(method, re.compile(pattern + r'\Z'), name) for method, pattern, name in ROUTES]
+
+    def log_message(self, format, *args):
+        pass  # Keep test output clean
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_PUT(self):
+        self.dispatch('PUT')
+
+    def do_PATCH(self):
+        self.dispatch('PATCH')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    def dispatch(self, method: str):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw_body = self.rfile.read(length) if length else b''
+
+        for route_method, pattern, name in self.COMPILED_ROUTES:
+            match = pattern.match(url.path)
+            if route_method == method and match:
+                break
+        else:
+            return self.respond(404, {'message': 'Not Found'})
+
+        github = self.github
+        with github.lock:
+            github.calls[f'{method} {name}'] += 1
+            github.bytes_received += len(raw_body)
+            github.in_flight += 1
+            github.max_in_flight = max(github.max_in_flight, github.in_flight)
+
+        headers = {}
+        try:
+            if github.latency:
+                time.sleep(github.latency)
+            if github.rate_limit is not None:
+                headers = github.consume_rate_limit()
+
+            failure = github.take_failure(f'{method} {name}')
+            if failure is not None:
+                status, failure_headers, message = failure
+                if status == 0:
+                    self.close_connection = True
+                    return
+                raise EMADFakeGitHubError(status, message, failure_headers)
+
+            request = json.loads(raw_body) if raw_body else {}
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            status, payload = getattr(self, f'handle_{name}')(request, query, **match.groupdict())
+            if github.take_lost_response(f'{method} {name}'):
+                self.close_connection = True
+                return
+        except EMADFakeGitHubError as e:
+            status, payload = e.status, {'message': str(e)}
+            headers = dict(headers, **e.headers)
+        except (KeyError, ValueError, TypeError) as e:
+            status, payload = 422, {'message': f'Invalid request: {e}'}
+        finally:
+            with github.lock:
+                github.in_flight -= 1
+        self.respond(status, payload, headers)
+
+    def respond(self, status: int, payload, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(payload).encode() if payload is not None else b''
+        with self.github.lock:
+            self.github.bytes_sent += len(data)
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for header, value in (headers or {}).items():
+                self.send_header(header, value)
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # The client gave up on the request (cancelled or timed out)
+
+    # Handlers return (status, payload)
+
+    def handle_user(self, request, query):
+        return 200, {'login': self.github.login}
+
+    def handle_get_ref(self, request, query, ref):
+        with self.github.lock:
+            sha = self.github.refs.get(ref)
+        if sha is None:
+            raise EMADFakeGitHubError(404, 'Not Found')
+        return 200, {'ref': f'refs/{ref}', 'object': {'sha': sha, 'type': 'commit'}}
+
+    def handle_create_ref(self, request, query):
+        ref = request['ref']
+        if not ref.startswith('refs/heads/'):
+            raise EMADFakeGitHubError(422, 'Reference name must start with refs/heads/')
+        self.github.update_ref(ref[len('refs/'):], request['sha'], create=True)
+        return 201, {'ref': ref, 'object': {'sha': request['sha'], 'type': 'commit'}}
+
+    def handle_patch_ref(self, request, query, ref):
+        with self.github.lock:
+            current = self.github.refs.get(ref)
+            if current is not None and not request.get('force'):
+                # Fast-forward only: the new commit must descend from the current one
+                sha, ancestors = request['sha'], set()
+                while sha and sha not in ancestors:
+                    ancestors.add(sha)
+                    parents = self.github.get_object(sha, 'commit')['parents']
+                    sha = parents[0] if parents else None
+                if current not in ancestors:
+                    raise EMADFakeGitHubError(422, 'Update is not a fast forward')
+            self.github.update_ref(ref, request['sha'])
+        return 200, {'ref': f'refs/{ref}', 'object': {'sha': request['sha'], 'type': 'commit'}}
+
+    def handle_delete_ref(self, request, query, ref):
+        with self.github.lock:
+            if self.github.refs.pop(ref, None) is None:
+                raise EMADFakeGitHubError(422, 'Reference does not exist')
+        return 204, None
+
+    def handle_get_commit(self, request, query, sha):
+        commit = self.github.get_object(sha, 'commit')
+        return 200, {'sha': sha, 'tree': {'sha': commit['tree']}, 'message': commit['message'],
+                     'parents': [{'sha': parent} for parent in commit['parents']]}
+
+    def handle_create_commit(self, request, query):
+        self.github.get_object(request['tree'], 'tree')
+        for parent in request.get('parents', []):
+            self.github.get_object(parent, 'commit')
+        sha = self.github.write_commit(request['tree'], request.get('parents', []), request['message'])
+        return 201, {'sha': sha, 'tree': {'sha': request['tree']}}
+
+    def tree_entry(self, path: str, mode: str, object_type: str, sha: str) -> Dict:
+        entry = {'path': path, 'mode': mode, 'type': object_type, 'sha': sha}
+        if object_type == 'blob':
+            entry['size'] = len(self.github.get_object(sha, 'blob'))
+        return entry
+
+    def handle_get_tree(self, request, query, sha):
+        if query.get('recursive'):
+            entries = [self.tree_entry(path, mode, 'blob', blob_sha)
+                       for path, (mode, blob_sha) in sorted(self.github.flatten_tree(sha).items())]
+        else:
+            entries = [self.tree_entry(name, mode, object_type, object_sha)
+                       for name, (mode, object_type, object_sha) in sorted(self.github.get_object(sha, 'tree').items())]
+
+        limit = self.github.tree_listing_limit
+        truncated = limit is not None and len(entries) > limit
+        return 200, {'sha': sha, 'tree': entries[:limit] if truncated else entries, 'truncated': truncated}
+
+    def handle_create_tree(self, request, query):
+        sha = self.github.create_tree(request)
+        return 201, {'sha': sha}
+
+    def handle_create_blob(self, request, query):
+        content = request['content']
+        data = base64.b64decode(content) if request.get('encoding') == 'base64' else content.encode()
+        return 201, {'sha': self.github.write_blob(data)}
+
+    def handle_get_blob(self, request, query, sha):
+        content = self.github.get_object(sha, 'blob')
+        return 200, {'sha': sha, 'size': len(content), 'encoding': 'base64',
+                     'content': base64.b64encode(content).decode()}
+
+    def handle_get_contents(self, request, query, path):
+        branch = query.get('ref', 'main')
+        commit = self.github.get_object(self.github.head(branch), 'commit')
+        entry = self.github.flatten_tree(commit['tree']).get(path)
+        if entry is None:
+            raise EMADFakeGitHubError(404, 'Not Found')
+        content = self.github.get_object(entry[1], 'blob')
+        return 200, {'path': path, 'sha': entry[1], 'encoding': 'base64',
+                     'content': base64.b64encode(content).decode()}
+
+    def handle_put_contents(self, request, query, path):
+        existed = request.get('sha') is not None
+        result = self.github.commit_file_change(request.get('branch', 'main'), path,
+                                                base64.b64decode(request['content']), request.get('sha'),
+                                                request['message'])
+        return (200 if existed else 201), result
+
+    def handle_delete_contents(self, request, query, path):
+        result = self.github.commit_file_change(request.get('branch', 'main'), path, None, request['sha'],
+                                                request['message'])
+        return 200, result
+
+    def handle_create_pull(self, request, query):
+        with self.github.lock:
+            self.github.head(request['base'])
+            if f'heads/{request["head"]}' not in self.github.refs:
+                raise EMADFakeGitHubError(422, 'Validation Failed: head does not exist')
+            if any(pull['head'] == request['head'] and pull['base'] == request['base'] and pull['state'] == 'open'
+                   for pull in self.github.pulls.values()):
+                raise EMADFakeGitHubError(422, f'A pull request already exists for '
+                                               f'{self.github.login}:{request["head"]}.')
+            number = len(self.github.pulls) + 1
+            self.github.pulls[number] = {'number': number, 'title': request['title'], 'body': request.get('body'),
+                                         'head': request['head'], 'base': request['base'], 'merged': False,
+                                         'state': 'open'}
+        return 201, {'number': number, 'state': 'open'}
+
+    def handle_list_pulls(self, request, query):
+        head = query.get('head', '').partition(':')[2]
+        with self.github.lock:
+            pulls = [pull for pull in self.github.pulls.values()
+                     if (not head or pull['head'] == head) and pull['base'] == query.get('base', pull['base'])
+                     and query.get('state', 'open') in ('all', pull['state'])]
+        return 200, [{'number': pull['number'], 'state': pull['state']} for pull in pulls]
+
+    def handle_get_pull(self, request, query, number):
+        with self.github.lock:
+            pull = self.github.pulls.get(int(number))
+        if pull is None:
+            raise EMADFakeGitHubError(404, 'Not Found')
+        return 200, {'number': pull['number'], 'state': pull['state'], 'merged': pull['merged'],
+                     'mergeable': not pull['merged'], 'mergeable_state': 'clean'}
+
+    def handle_merge_pull(self, request, query, number):
+        return 200, self.github.merge_pull(int(number), request)
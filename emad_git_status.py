@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+"""
+EMAD Git Status Detector
+
+Change detection for workspaces inside a git worktree. git already keeps a
+stat-cached index (fsmonitor-backed where configured), so `git status`
+answers "what differs from the index" without EMAD walking and stat'ing
+every file. Each cycle the detector returns the candidate paths to rescan:
+
+- tracked files git reports as modified, added, deleted or unmerged
+- untracked files and ignored paths, since EMAD may monitor what git ignores
+  (its exclusions still apply when the candidates are scanned)
+- the previous cycle's candidates, which may have gone back to clean (reverted,
+  stashed, committed)
+- files a moved HEAD (commit, checkout, pull) changed in the worktree
+
+Everything else is clean, so its content matches the index and the baseline
+still holds for it. The first cycle has no previous state and returns None,
+which asks for a full scan:
+
+    detector = EMADGitStatusDetector(workspace, logger)
+    candidates = detector.candidates()  # set of workspace-relative paths, or None
+    detector.index_blob_shas(paths)     # blob SHAs git recorded for clean files
+"""
+
+import os
+import time
+import shutil
+import logging
+import subprocess
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from emad_git_transport import EMADGitError
+
+TRACKED_FILE_MODES = ('100644', '100755')
+# Attributes under which the worktree bytes can differ from the blob in the index
+CONVERSION_ATTRIBUTES = ('filter', 'text', 'eol', 'ident')
+
+
+class EMADGitStatusDetector:
+    """Candidate changes of a workspace from git status, relative to the workspace"""
+
+    def __init__(self, workspace: Path, logger: logging.Logger):
+        self.workspace = Path(workspace)
+        self.logger = logger
+        self.prefix = self.git('rev-parse', '--show-prefix').strip()  # Workspace path inside the worktree, with '/'
+        self.head: Optional[str] = None
+        self.dirty: Optional[Set[str]] = None  # Candidates from the last status, None before the first
+        self.checked_at_ns = 0  # When the last status started
+        self.stats = {'status_runs': 0, 'candidates': 0}
+
+    @staticmethod
+    def is_available(workspace: Path) -> bool:
+        """Whether git is installed and workspace is inside a git worktree"""
+        if shutil.which('git') is None:
+            return False
+        try:
+            result = subprocess.run(['git', '-C', str(workspace), 'rev-parse', '--is-inside-work-tree'],
+                                    capture_output=True, text=True, check=True)
+        except (OSError, subprocess.CalledProcessError):
+            return False
+        return result.stdout.strip() == 'true'
+
+    def git(self, *args: str, stdin: Optional[str] = None, check: bool = True) -> str:
+        """Run a git command in the workspace and return its stdout"""
+        env = dict(os.environ, GIT_OPTIONAL_LOCKS='0')  # status must not take the index lock from the user
+        result = subprocess.run(['git', '-C', str(self.workspace), *args], input=stdin, capture_output=True,
+                                text=True, encoding='utf-8', errors='surrogateescape', env=env)
+        if check and result.returncode != 0:
+            raise EMADGitError(list(args), result.returncode, result.stderr)
+        return result.stdout
+
+    def local_path(self, repo_path: str) -> Optional[str]:
+        """Workspace-relative path (os.sep) of a worktree-relative one, None if outside the workspace"""
+        if not repo_path.startswith(self.prefix):
+            return None
+        return repo_path[len(self.prefix):].rstrip('/').replace('/', os.sep) or None
+
+    def current_head(self) -> Optional[str]:
+        return self.git('rev-parse', '-q', '--verify', 'HEAD^{commit}', check=False).strip() or None
+
+    def status_paths(self) -> Set[str]:
+        """Paths git status reports as anything but clean, below the workspace"""
+        output = self.git('status', '--porcelain=v2', '-z', '--untracked-files=all', '--ignored=matching',
+                          '--no-renames', '--', '.')
+        fields = output.split('\0')
+        paths = set()
+        index = 0
+        while index < len(fields):
+            entry = fields[index]
+            index += 1
+            if not entry:
+                continue
+            kind = entry[0]
+            if kind == '1':
+                repo_paths = [entry.split(' ', 8)[8]]
+            elif kind == '2':
+                repo_paths = [entry.split(' ', 9)[9], fields[index]]  # The original path is its own field
+                index += 1
+            elif kind == 'u':
+                repo_paths = [entry.split(' ', 10)[10]]
+            elif kind in '?!':
+                repo_paths = [entry[2:]]
+            else:
+                continue
+            for repo_path in repo_paths:
+                local_path = self.local_path(repo_path)
+                if local_path:
+                    paths.add(local_path)
+        return paths
+
+    def head_changes(self, old_head: str, new_head: str) -> Set[str]:
+        """Files that differ between two commits, below the workspace"""
+        output = self.git('diff', '--name-only', '-z', '--no-renames', '--relative', old_head, new_head, '--', '.')
+        return {path.replace('/', os.sep) for path in output.split('\0') if path}
+
+    def candidates(self) -> Optional[Set[str]]:
+        """Paths to rescan since the last call, or None when a full scan is needed
+
+        A full scan is needed on the first call and whenever git fails; the
+        state recorded here is what the next call compares against.
+        """
+        previous_head, previous_dirty = self.head, self.dirty
+        checked_at_ns = time.time_ns()
+        try:
+            head = self.current_head()
+            dirty = self.status_paths()
+            moved = set()
+            if previous_dirty is not None and head != previous_head:
+                if previous_head is None or head is None:
+                    previous_dirty = None  # Born or orphaned branch: nothing to diff against
+                else:
+                    moved = self.head_changes(previous_head, head)
+        except (OSError, EMADGitError) as e:
+            self.logger.warning(f'git status failed, falling back to a full scan: {e}')
+            self.head = self.dirty = None
+            return None
+
+        self.head, self.dirty, self.checked_at_ns = head, dirty, checked_at_ns
+        self.stats['status_runs'] += 1
+        if previous_dirty is None:
+            return None
+        candidates = dirty | previous_dirty | moved
+        self.stats['candidates'] = len(candidates)
+        return candidates
+
+    def index_blob_shas(self, paths: Iterable[str]) -> Dict[str, str]:
+        """Blob SHAs from the index for clean tracked files among paths
+
+        Only files whose worktree bytes are exactly the indexed blob qualify:
+        paths with a pending change, a content filter, eol conversion or ident
+        expansion are left out, and so is everything when core.autocrlf is on.
+        """
+        if self.dirty is None:
+            return {}  # No status to tell clean files from changed ones
+        wanted = {path for path in paths if path not in self.dirty}
+        if not wanted:
+            return {}
+        try:
+            if self.git('config', '--get', 'core.autocrlf', check=False).strip().lower() in ('true', 'input'):
+                return {}
+
+            shas = {}
+            for line in self.git('ls-files', '-s', '-z', '--', '.').split('\0'):
+                if not line:
+                    continue
+                info, _, file_path = line.partition('\t')
+                mode, sha, stage = info.split(' ')
+                local_path = file_path.replace('/', os.sep)
+                if stage == '0' and mode in TRACKED_FILE_MODES and local_path in wanted:
+                    shas[local_path] = sha
+
+            for file_path in self.converted_paths(list(shas)):
+                del shas[file_path]
+            return shas
+        except (OSError, EMADGitError) as e:
+            self.logger.warning(f'Could not read blob SHAs from the git index: {e}')
+            return {}
+
+    def converted_paths(self, paths: List[str]) -> Set[str]:
+        """Those of paths whose checkout is transformed by git attributes"""
+        if not paths:
+            return set()
+        output = self.git('check-attr', '-z', '--stdin', *CONVERSION_ATTRIBUTES,
+                          stdin=''.join(path.replace(os.sep, '/') + '\0' for path in paths))
+        fields = output.split('\0')
+        converted = set()
+        for index in range(0, len(fields) - 2, 3):
+            file_path, _, value = fields[index:index + 3]
+            if value not in ('unspecified', 'unset'):
+                converted.add(file_path.replace('/', os.sep))
+        return converted
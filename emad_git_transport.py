@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+
+"""
+EMAD Git Transport
+
+Syncs detected changes through git itself instead of the GitHub REST API,
+for workspaces that are already git checkouts. Changes are staged with git
+plumbing on a private index (hash-object, update-index, write-tree), so the
+checkout's own index, HEAD and working tree are never touched, committed
+with commit-tree on top of the remote branch, and sent as one packfile by
+git push:
+
+    transport = EMADGitTransport(workspace, logger, remote='origin')
+    transport.commit_and_push(['a.md'], ['old.md'], 'Auto-sync', 'main')
+
+The remote can be anything git push accepts, including a local bare
+repository, which is how the test suite exercises it.
+"""
+
+import os
+import shutil
+import logging
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from emad_merkle import FILE_MODE, EXEC_MODE
+
+EMPTY_TREE_SHA = '4b825dc642cb6eb9a060e54bf8d69288fbee4904'
+NULL_SHA = '0' * 40
+SYNC_REF_PREFIX = 'refs/emad-sync/'  # Local copies of fetched remote branches
+DEFAULT_IDENTITY = ('EMAD Auto-Sync', 'emad-auto-sync@localhost')
+PUSH_ATTEMPTS = 3  # The remote branch can move between fetch and push; rebuild the commit on top
+
+
+class EMADGitError(Exception):
+    """A git command failed"""
+
+    def __init__(self, args: List[str], returncode: int, stderr: str):
+        super().__init__(f'git {" ".join(args[:2])} failed ({returncode}): {stderr.strip()}')
+        self.returncode = returncode
+        self.stderr = stderr
+
+
+class EMADGitTransport:
+    """Commit changes from a git checkout onto a remote branch with git plumbing"""
+
+    def __init__(self, repo_path: Path, logger: logging.Logger, remote: str = 'origin',
+                 index_path: Optional[Path] = None):
+        self.repo_path = Path(repo_path)
+        self.logger = logger
+        self.remote = remote
+        self.index_path = Path(index_path) if index_path else self.repo_path / '.emad' / 'git-index'
+        self.index_base: Optional[str] = None  # Tree the private index was last loaded from
+        self.identity: Optional[Dict[str, str]] = None
+        self.exec_bit: Optional[bool] = None  # Whether git trusts the worktree's exec bit (core.fileMode)
+        self.stats = {'commits': 0, 'pushes': 0, 'rejected_pushes': 0}
+
+    @staticmethod
+    def is_available(repo_path: Path) -> bool:
+        """Whether git is installed and repo_path is the top of a git checkout"""
+        if shutil.which('git') is None:
+            return False
+        try:
+            result = subprocess.run(['git', '-C', str(repo_path), 'rev-parse', '--show-toplevel'],
+                                    capture_output=True, text=True, check=True)
+        except (OSError, subprocess.CalledProcessError):
+            return False
+        return os.path.samefile(result.stdout.strip(), repo_path)
+
+    def git(self, *args: str, stdin: Optional[str] = None, private_index: bool = False,
+            env: Optional[Dict[str, str]] = None) -> str:
+        """Run a git command in the checkout and return its stdout"""
+        command_env = dict(os.environ, GIT_TERMINAL_PROMPT='0')  # Fail instead of prompting for credentials
+        if private_index:
+            command_env['GIT_INDEX_FILE'] = str(self.index_path)
+        command_env.update(env or {})
+
+        result = subprocess.run(['git', '-C', str(self.repo_path), *args], input=stdin,
+                                capture_output=True, text=True, env=command_env)
+        if result.returncode != 0:
+            raise EMADGitError(list(args), result.returncode, result.stderr)
+        return result.stdout
+
+    def fetch(self, branch: str) -> Optional[str]:
+        """Fetch a remote branch and return its commit SHA, or None if it does not exist"""
+        local_ref = f'{SYNC_REF_PREFIX}{self.remote}/{branch}'
+        try:
+            self.git('fetch', '--quiet', '--no-tags', self.remote, f'+refs/heads/{branch}:{local_ref}')
+        except EMADGitError as e:
+            if "couldn't find remote ref" in e.stderr.lower():
+                return None  # Empty remote, or a branch not created yet
+            raise
+        return self.git('rev-parse', '--verify', f'{local_ref}^{{commit}}').strip()
+
+    def tree_of(self, commit_sha: Optional[str]) -> str:
+        if commit_sha is None:
+            return EMPTY_TREE_SHA
+        return self.git('rev-parse', f'{commit_sha}^{{tree}}').strip()
+
+    def stage(self, base_tree: str, upload_paths: List[str], deleted_paths: List[str]) -> str:
+        """Apply the changes to base_tree on the private index and return the new tree SHA
+
+        The index keeps its entries between syncs, so only a moved base tree
+        costs a full read-tree; otherwise just the changed paths are updated.
+        """
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.index_base != base_tree or not self.index_path.exists():
+            self.git('read-tree', base_tree, private_index=True)
+            self.index_base = base_tree
+
+        index_info = []
+        if upload_paths:
+            # Raw bytes, as the REST transport uploads them: no clean filters or line-ending conversion
+            blob_shas = self.git('hash-object', '-w', '--no-filters', '--stdin-paths',
+                                 stdin=''.join(f'{path}\n' for path in upload_paths)).split()
+            modes = self.file_modes(upload_paths)
+            index_info.extend(f'{modes[path]} {blob_sha}\t{self.repo_path_of(path)}'
+                              for path, blob_sha in zip(upload_paths, blob_shas))
+        index_info.extend(f'0 {NULL_SHA}\t{self.repo_path_of(path)}' for path in deleted_paths)
+
+        try:
+            if index_info:
+                self.git('update-index', '--index-info', stdin=''.join(f'{line}\n' for line in index_info),
+                         private_index=True)
+            tree_sha = self.git('write-tree', private_index=True).strip()
+        except EMADGitError:
+            self.index_base = None  # Unknown index state: reload it next time
+            raise
+        self.index_base = tree_sha
+        return tree_sha
+
+    def file_modes(self, paths: List[str]) -> Dict[str, str]:
+        """Index mode for each path: from the worktree's exec bit, or from the base tree where git ignores it
+
+        With core.fileMode off (the default on Windows) git keeps the mode a
+        file already has, and so does this; new files are then 100644.
+        """
+        if self.exec_bit is None:
+            try:
+                self.exec_bit = self.git('config', '--bool', 'core.fileMode').strip() != 'false'
+            except EMADGitError:
+                self.exec_bit = os.name != 'nt'  # Unset
+
+        if self.exec_bit:
+            modes = {}
+            for path in paths:
+                try:
+                    executable = os.stat(self.repo_path / path).st_mode & 0o111
+                except OSError:
+                    executable = False
+                modes[path] = EXEC_MODE if executable else FILE_MODE
+            return modes
+
+        # The private index holds the base tree's entries
+        executables = set()
+        for record in self.git('ls-files', '--stage', '-z', private_index=True).split('\0'):
+            info, _, path = record.partition('\t')
+            if info.startswith(EXEC_MODE):
+                executables.add(path)
+        return {path: EXEC_MODE if self.repo_path_of(path) in executables else FILE_MODE for path in paths}
+
+    @staticmethod
+    def repo_path_of(path: str) -> str:
+        return path.replace(os.sep, '/') if os.sep != '/' else path
+
+    def commit_identity(self) -> Dict[str, str]:
+        """Author/committer environment: the checkout's git identity, else a default one"""
+        if self.identity is None:
+            self.identity = {}
+            try:
+                self.git('config', 'user.email')
+            except EMADGitError:
+                name, email = DEFAULT_IDENTITY
+                self.identity = {'GIT_AUTHOR_NAME': name, 'GIT_AUTHOR_EMAIL': email,
+                                 'GIT_COMMITTER_NAME': name, 'GIT_COMMITTER_EMAIL': email}
+        return self.identity
+
+    def commit(self, tree_sha: str, parent_sha: Optional[str], message: str) -> str:
+        parents = ['-p', parent_sha] if parent_sha else []
+        commit_sha = self.git('commit-tree', tree_sha, *parents, '-m', message, env=self.commit_identity()).strip()
+        self.stats['commits'] += 1
+        return commit_sha
+
+    def push(self, commit_sha: str, branch: str, expected_sha: Optional[str]) -> bool:
+        """Push commit_sha to the remote branch; False if the branch moved from expected_sha"""
+        lease = f'--force-with-lease=refs/heads/{branch}:{expected_sha or ""}'
+        try:
+            self.git('push', '--quiet', lease, self.remote, f'{commit_sha}:refs/heads/{branch}')
+        except EMADGitError as e:
+            if 'stale info' in e.stderr or 'rejected' in e.stderr or 'fetch first' in e.stderr:
+                self.stats['rejected_pushes'] += 1
+                return False
+            raise
+        self.stats['pushes'] += 1
+        return True
+
+    def commit_and_push(self, upload_paths: List[str], deleted_paths: List[str], message: str,
+                        branch: str, base_branch: Optional[str] = None) -> Optional[str]:
+        """Commit the changes on top of base_branch and push the commit to branch
+
+        base_branch defaults to branch. Returns the pushed commit SHA, or None
+        if the remote already had exactly these contents. If the remote
+        branch moves before the push lands, the commit is rebuilt on its new
+        head. Raises EMADGitError when git fails.
+        """
+        base_branch = base_branch or branch
+        for attempt in range(PUSH_ATTEMPTS):
+            base_commit = self.fetch(base_branch)
+            base_tree = self.tree_of(base_commit)
+            tree_sha = self.stage(base_tree, upload_paths, deleted_paths)
+            if tree_sha == base_tree:
+                return None
+
+            commit_sha = self.commit(tree_sha, base_commit, message)
+            expected = base_commit if base_branch == branch else None
+            if self.push(commit_sha, branch, expected):
+                self.logger.info(f'Pushed {commit_sha[:7]} to {self.remote}/{branch}')
+                return commit_sha
+            self.logger.info(f'{self.remote}/{branch} moved during the sync, rebuilding the commit on its new head')
+
+        raise EMADGitError(['push', self.remote], 1, f'{self.remote}/{branch} kept moving, gave up after '
+                                                     f'{PUSH_ATTEMPTS} attempts')
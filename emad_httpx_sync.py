@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+
+"""
+EMAD httpx Transport
+
+EMADAutoSync's threaded sync flow with its GitHub requests sent by httpx
+on an asyncio event loop. It is a transport, not an asyncio-native engine:
+the flow, its upload threads included, runs on worker threads as it does
+in the threaded engine, and each request blocks its thread while the loop
+sends it. What the loop adds is one pool of kept-alive connections for
+uploads, tree listings and pull request polling alike, rate-limit waits
+that hold up only the request that waits, and a stop() that fails every
+request in flight, so the running cycle unwinds within moments instead of
+waiting out sleeps and timeouts.
+
+httpx is an optional dependency: without it the emad-auto-sync.py command
+line falls back to the threaded engine, as it falls back to inotify or
+polling without watchdog.
+
+    auto_sync = EMADHttpxAutoSync(path)
+    asyncio.run(auto_sync.run())
+"""
+
+import json
+import time
+import signal
+import asyncio
+import logging
+import requests
+import functools
+import threading
+import concurrent.futures
+from requests.structures import CaseInsensitiveDict
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Set, Tuple
+
+try:
+    import httpx
+    logging.getLogger('httpx').setLevel(logging.WARNING)  # It logs every request at INFO
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+from emad_auto_sync import EMADAutoSync, EMADRequestScheduler
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_REQUEST_TIMEOUT = 300   # Seconds to connect, or between bytes sent or received
+BODY_CHUNK_SIZE = 256 * 1024    # Bytes of a streamed body sent at a time
+INLINE_BODY_LIMIT = 1024 * 1024  # Larger streamed bodies are read on a worker thread
+
+
+class EMADHttpxResponse:
+    """The parts of requests.Response the sync engine reads"""
+
+    def __init__(self, status_code: int, reason: str, headers: CaseInsensitiveDict, content: bytes, url: str):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        self.url = url
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def close(self):
+        pass  # The body is already read and the connection back in the pool
+
+
+class EMADHttpxClient:
+    """requests-style session over an httpx.AsyncClient
+
+    One pool of kept-alive connections, at most pool_size of them; requests
+    beyond that wait for a connection. Bodies may be bytes or file-like
+    objects with a length (EMADStreamingUploadBody), which are streamed in
+    chunks. Failures are raised as requests.ConnectionError /
+    requests.Timeout so the shared retry policy treats both engines alike.
+    """
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, pool_size: int = DEFAULT_POOL_SIZE,
+                 timeout: float = DEFAULT_REQUEST_TIMEOUT):
+        # Framing headers are httpx's own
+        self.headers = {name: value for name, value in (headers or {}).items()
+                        if name.lower() not in ('connection', 'host', 'content-length')}
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout
+        self._client = None
+        self._loop = None
+
+    def _ensure_client(self) -> 'httpx.AsyncClient':
+        loop = asyncio.get_running_loop()
+        if self._client is None or loop is not self._loop:
+            # Connections belong to the loop that opened them; a new loop gets a new pool
+            self._loop = loop
+            # Requests queue for a free connection without a deadline, as uploads wait their turn
+            self._client = httpx.AsyncClient(
+                headers=self.headers, timeout=httpx.Timeout(self.timeout, pool=None),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            )
+        return self._client
+
+    async def request(self, method: str, url: str, params: Optional[Dict[str, Any]] = None, json: Any = None,
+                      data: Any = None, headers: Optional[Dict[str, str]] = None,
+                      timeout: Any = None) -> EMADHttpxResponse:
+        client = self._ensure_client()
+        request_headers = dict(headers or {})
+        content = data
+        if json is not None:
+            content = _json_bytes(json)
+            request_headers.setdefault('Content-Type', 'application/json')
+        elif data is not None and not isinstance(data, (bytes, bytearray, str)):
+            # A declared length keeps the upload from being sent chunked
+            request_headers['Content-Length'] = str(len(data))
+            content = _body_chunks(data)
+
+        try:
+            response = await client.request(method, url, params=params, content=content, headers=request_headers,
+                                            timeout=_httpx_timeout(timeout))
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(f'{method} {url} timed out: {e.__class__.__name__}') from e
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(f'{method} {url} failed: {e.__class__.__name__}: {e}') from e
+        return EMADHttpxResponse(response.status_code, response.reason_phrase, CaseInsensitiveDict(response.headers),
+                                 response.content, str(response.url))
+
+    async def aclose(self):
+        """Close the pooled connections"""
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+
+def _httpx_timeout(timeout: Any) -> Any:
+    """httpx form of a requests timeout: seconds, or a (connect, read) pair"""
+    if timeout is None:
+        return httpx.USE_CLIENT_DEFAULT
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect, pool=None)
+    return httpx.Timeout(timeout, pool=None)
+
+
+async def _body_chunks(body) -> AsyncIterator[bytes]:
+    """Chunks of a streamed body, which reads (and base64-encodes) the file as it goes; big ones off the loop"""
+    off_loop = len(body) > INLINE_BODY_LIMIT
+    while True:
+        chunk = await asyncio.to_thread(body.read, BODY_CHUNK_SIZE) if off_loop else body.read(BODY_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _json_bytes(payload: Any) -> bytes:
+    return json.dumps(payload).encode('utf-8')
+
+
+class EMADHttpxRequestScheduler(EMADRequestScheduler):
+    """EMADRequestScheduler whose requests are sent by httpx on an asyncio event loop
+
+    Same budget, pacing and retry policy; waits are awaited, so they hold up
+    only the request that waits. request() keeps the blocking signature the
+    sync flow calls from its worker threads: it runs arequest() on the loop
+    and waits for the result. cancel() fails every request at once, in
+    flight or not yet sent.
+    """
+
+    def __init__(self, client: EMADHttpxClient, logger: logging.Logger, **kwargs):
+        super().__init__(client, logger, **kwargs)
+        self.sleep = asyncio.sleep  # Replaceable in tests
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.cancelled = False
+        self.pending: Set[concurrent.futures.Future] = set()
+
+    def request(self, method: str, url: str, **kwargs) -> EMADHttpxResponse:
+        """Send a request on the loop and wait for it; not to be called from the loop's own thread"""
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            raise RuntimeError('No event loop to send requests on; run the engine with asyncio.run(auto_sync.run())')
+        if _running_loop() is loop:
+            raise RuntimeError('Blocking request on the event loop thread; use await auto_sync.in_worker(...)')
+        if self.cancelled:
+            raise requests.ConnectionError(f'{method} {url} not sent: the sync engine is stopping')
+
+        future = asyncio.run_coroutine_threadsafe(self.arequest(method, url, **kwargs), loop)
+        with self.lock:
+            self.pending.add(future)
+        try:
+            return future.result()
+        except concurrent.futures.CancelledError as e:
+            raise requests.ConnectionError(f'{method} {url} cancelled: the sync engine is stopping') from e
+        finally:
+            with self.lock:
+                self.pending.discard(future)
+
+    async def arequest(self, method: str, url: str, **kwargs) -> EMADHttpxResponse:
+        """Send a request once the budget allows it, retrying transient failures"""
+        attempt = 0
+        while True:
+            try:
+                await self._throttle(self._reserve())
+                self._start_attempt(attempt, kwargs)
+                response = await self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                retry = self._finish_attempt(method, url, attempt, error=e)
+            except BaseException:
+                self._release()
+                raise
+            else:
+                retry = self._finish_attempt(method, url, attempt, response=response)
+            if not retry:
+                return response
+            attempt += 1
+
+    async def _throttle(self, wait: float):
+        if wait <= 0:
+            return
+        with self.lock:
+            self.stats['throttled'] += 1
+            self.stats['throttle_seconds'] += wait
+        if wait >= 1:
+            self.logger.info(f'Waiting {wait:.1f}s for the GitHub API rate limit')
+        await self.sleep(wait)
+
+    def cancel(self):
+        """Fail the requests in flight and refuse new ones; safe from any thread"""
+        self.cancelled = True
+        with self.lock:
+            pending = list(self.pending)
+        for future in pending:
+            future.cancel()
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class EMADHttpxAutoSync(EMADAutoSync):
+    """EMADAutoSync with its requests sent by httpx on an asyncio event loop
+
+    The sync flow is EMADAutoSync's own, run on a worker thread
+    (in_worker); only the transport differs, through create_transport().
+    Between cycles the loop waits for the watcher or the next interval. Use
+    it with asyncio.run(auto_sync.run()) or as an async context manager.
+    Needs httpx.
+    """
+
+    def __init__(self, bmad_path: Path, *args, **kwargs):
+        if not HTTPX_AVAILABLE:
+            raise ImportError('The httpx sync engine needs httpx: pip install httpx')
+        super().__init__(bmad_path, *args, **kwargs)
+        self.task: Optional[asyncio.Task] = None
+        self.wakeup: Optional[asyncio.Event] = None  # Set from watcher threads
+        self.stopping = threading.Event()  # Cuts the flow's own waits short
+
+    def create_transport(self, **policy) -> Tuple[EMADHttpxClient, EMADHttpxRequestScheduler]:
+        # One connection pool for uploads, tree listings and PR polling alike
+        self.http = EMADHttpxClient(self.api_headers(), pool_size=self.upload_concurrency)
+        return self.http, EMADHttpxRequestScheduler(self.http, self.logger, **policy)
+
+    async def __aenter__(self) -> 'EMADHttpxAutoSync':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Release the connection pool"""
+        await self.http.aclose()
+
+    def stop(self):
+        """Stop run() now; safe to call from any thread or a signal handler
+
+        The requests of the cycle in progress fail at once, so it ends
+        within moments. Its progress is journaled, so the next start
+        resumes it.
+        """
+        self.running = False
+        self.stopping.set()
+        self.api.cancel()
+        task = self.task
+        if task is not None and not task.done():
+            try:
+                task.get_loop().call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                pass  # Loop already closed
+
+    def signal_handler(self, signum, frame):
+        super().signal_handler(signum, frame)
+        self.stop()
+
+    def pause(self, seconds: float):
+        self.stopping.wait(seconds)
+
+    async def in_worker(self, function: Callable[..., Any], *args) -> Any:
+        """Run part of the sync flow on a worker thread, its requests on this loop
+
+        Cancelling the caller fails the flow's requests and waits for the
+        flow to unwind, so nothing keeps running behind the next start.
+        """
+        self.api.loop = asyncio.get_running_loop()
+        work = self.api.loop.run_in_executor(None, functools.partial(function, *args))
+        try:
+            return await asyncio.shield(work)
+        except asyncio.CancelledError:
+            self.api.cancel()
+            try:
+                await work
+            except Exception:
+                pass
+            raise
+
+    async def cycle(self, dirty_paths: Optional[Set[str]] = None, flush: bool = False):
+        """One monitor_cycle, on a worker thread"""
+        await self.in_worker(self.monitor_cycle, dirty_paths, flush)
+
+    def start_watcher(self, backend: str = 'auto') -> bool:
+        """Start the watcher, with its events waking the event loop"""
+        if not super().start_watcher(backend):
+            return False
+        loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+
+        def wake():
+            try:
+                loop.call_soon_threadsafe(self.wakeup.set)
+            except RuntimeError:
+                pass  # Loop already closed
+
+        self.watcher.listeners.append(wake)
+        return True
+
+    async def next_changes(self) -> Optional[Set[str]]:
+        """Await the next monitoring cycle; see EMADAutoSync.wait_for_changes
+
+        Watcher events wake the loop directly instead of being polled.
+        """
+        if not (self.watcher and self.watcher.active):
+            pending_due = self.change_queue.due_in()
+            await asyncio.sleep(self.monitor_interval if pending_due is None
+                                else min(self.monitor_interval, pending_due))
+            return None
+
+        while self.running:
+            until_full_scan = self.monitor_interval - (time.monotonic() - self.last_full_scan)
+            if until_full_scan <= 0:
+                return None
+
+            pending_due = self.change_queue.due_in()
+            if pending_due == 0.0:
+                return set()  # Quiet period over: sync what is queued
+
+            self.wakeup.clear()
+            if not self.watcher.wait(0):
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), until_full_scan if pending_due is None
+                                           else min(until_full_scan, pending_due))
+                except asyncio.TimeoutError:
+                    continue
+
+            dirty_paths, overflow = self.watcher.drain()
+            if overflow:
+                return None
+            if dirty_paths:
+                return dirty_paths
+
+        return set()
+
+    async def test_cycle(self) -> bool:
+        """Authenticate, load the baseline and sync whatever is pending right away"""
+        self._clear_stop()
+        return await self.in_worker(super().test_cycle)
+
+    def _clear_stop(self):
+        self.stopping.clear()
+        self.api.cancelled = False
+
+    async def run(self) -> bool:
+        """Main monitoring loop; ends when stop() is called or the task is cancelled"""
+        self.task = asyncio.current_task()
+        loop = asyncio.get_running_loop()
+        handled_signals = []
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.stop)
+                handled_signals.append(signum)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass  # Windows, or not the main thread: signal_handler() calls stop()
+
+        self._clear_stop()
+        try:
+            if self.uses_api() and not await self.in_worker(self.authenticate):
+                self.logger.error('Failed to authenticate with GitHub')
+                return False
+
+            self.log_startup()
+
+            baseline_count = await self.in_worker(self.establish_baseline)
+            self.logger.info(f'Baseline established with {baseline_count} files')
+
+            self.running = True
+            if self.watch_mode:
+                self.start_watcher()
+
+            dirty_paths = None  # The first cycle is always a full scan
+            while self.running:
+                await self.cycle(dirty_paths)
+                dirty_paths = await self.next_changes()
+
+        except asyncio.CancelledError:
+            self.logger.info('Sync engine cancelled, shutting down...')
+        except Exception as e:
+            self.logger.error(f'Unexpected error in main loop: {e}')
+        finally:
+            self.running = False
+            self.task = None
+            for signum in handled_signals:
+                loop.remove_signal_handler(signum)
+            self.stop_watcher()
+            await self.aclose()
+            self.logger.info('EMAD Auto-Sync monitoring stopped')
+
+        return True
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+
+"""
+EMAD Merkle Tree
+
+Per-directory digests over a flat path -> leaf mapping, rolled up the way
+git builds tree objects. With git blob SHAs as leaves, a directory's digest
+is the SHA of the git tree GitHub would store for it (each file with its
+mode, 100644 unless set otherwise), so a local subtree can be compared with
+a remote tree SHA directly. Any other leaf (a SHA-256 hex digest, say) still gives a
+deterministic digest for comparing two local snapshots; it just never
+matches a git tree.
+
+Updates invalidate only the digests on the path to the root, and unchanged
+subtrees keep theirs, so a digest costs a hash per changed directory:
+
+    tree = EMADMerkleTree.from_leaves({'docs/a.md': blob_sha}.items())
+    tree.digest('docs')            # git tree SHA of docs/
+    tree.set('docs/b.md', other_sha)
+    tree.set('docs/run.sh', script_sha, EXEC_MODE)
+    tree.diff(other_tree)          # (added, modified, deleted), skipping equal subtrees
+"""
+
+import hashlib
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+FILE_MODE = '100644'
+EXEC_MODE = '100755'
+TREE_MODE = '40000'
+
+
+def git_tree_sha(entries: Iterable[Tuple[str, str, str]]) -> str:
+    """SHA-1 of a git tree object built from (name, mode, hex SHA) entries"""
+    # git sorts subtrees as if their names ended with "/"
+    ordered = sorted(entries, key=lambda entry: entry[0] + '/' if entry[1] == TREE_MODE else entry[0])
+    payload = b''.join(f'{mode} {name}'.encode('utf-8') + b'\0' + bytes.fromhex(sha) for name, mode, sha in ordered)
+    return hashlib.sha1(f'tree {len(payload)}\0'.encode() + payload).hexdigest()
+
+
+class EMADMerkleTree:
+    """Directory digests over relative file paths, kept up to date incrementally
+
+    Paths use sep (os.sep for workspace paths, "/" for repository paths);
+    the root directory is ''. Directories exist while they contain files.
+    """
+
+    def __init__(self, sep: str = '/'):
+        self.sep = sep
+        self.files: Dict[str, Dict[str, str]] = {'': {}}  # directory -> {file name: leaf}
+        self.dirs: Dict[str, Set[str]] = {'': set()}      # directory -> subdirectory names
+        self.modes: Dict[str, str] = {}                   # path -> mode, for files not FILE_MODE
+        self._digests: Dict[str, str] = {}                # directory -> cached digest
+        self.count = 0
+
+    @classmethod
+    def from_leaves(cls, leaves: Iterable[Tuple[str, ...]], sep: str = '/') -> 'EMADMerkleTree':
+        """Build a tree from (path, leaf) or (path, leaf, mode) items"""
+        tree = cls(sep)
+        for path, leaf, *mode in leaves:
+            tree.set(path, leaf, *mode)
+        return tree
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _split(self, path: str) -> Tuple[str, str]:
+        directory, _, name = path.rpartition(self.sep)
+        return directory, name
+
+    def _join(self, directory: str, name: str) -> str:
+        return f'{directory}{self.sep}{name}' if directory else name
+
+    def _invalidate(self, directory: str):
+        # An uncached directory never has a cached ancestor, so the walk up can stop early
+        while directory in self._digests:
+            del self._digests[directory]
+            if not directory:
+                break
+            directory = self._split(directory)[0]
+
+    def _add_directory(self, directory: str):
+        parent, name = self._split(directory)
+        if parent not in self.files:
+            self._add_directory(parent)
+        self.files[directory] = {}
+        self.dirs[directory] = set()
+        self.dirs[parent].add(name)
+        self._invalidate(parent)
+
+    def get(self, path: str) -> Optional[str]:
+        directory, name = self._split(path)
+        files = self.files.get(directory)
+        return files.get(name) if files is not None else None
+
+    def mode(self, path: str) -> str:
+        return self.modes.get(path, FILE_MODE)
+
+    def set(self, path: str, leaf: str, mode: str = FILE_MODE):
+        directory, name = self._split(path)
+        files = self.files.get(directory)
+        if files is None:
+            self._add_directory(directory)
+            files = self.files[directory]
+        previous = files.get(name)
+        if previous == leaf and self.mode(path) == mode:
+            return
+        if previous is None:
+            self.count += 1
+        files[name] = leaf
+        if mode == FILE_MODE:
+            self.modes.pop(path, None)
+        else:
+            self.modes[path] = mode
+        self._invalidate(directory)
+
+    def remove(self, path: str) -> bool:
+        directory, name = self._split(path)
+        files = self.files.get(directory)
+        if files is None or name not in files:
+            return False
+        del files[name]
+        self.modes.pop(path, None)
+        self.count -= 1
+        self._invalidate(directory)
+
+        # Drop directories left empty, like git does
+        while directory and not self.files[directory] and not self.dirs[directory]:
+            del self.files[directory]
+            del self.dirs[directory]
+            parent, name = self._split(directory)
+            self.dirs[parent].discard(name)
+            directory = parent
+        return True
+
+    def is_directory(self, directory: str) -> bool:
+        return directory in self.files
+
+    def digest(self, directory: str = '') -> Optional[str]:
+        """Digest of a directory (the git tree SHA for blob SHA leaves), None if it does not exist"""
+        if directory not in self.files:
+            return None
+        digest = self._digests.get(directory)
+        if digest is None:
+            entries = [(name, self.mode(self._join(directory, name)) if self.modes else FILE_MODE, leaf)
+                       for name, leaf in self.files[directory].items()]
+            entries.extend((name, TREE_MODE, self.digest(self._join(directory, name)))
+                           for name in self.dirs[directory])
+            digest = self._digests[directory] = git_tree_sha(entries)
+        return digest
+
+    def walk(self, directory: str = '') -> Iterator[Tuple[str, str]]:
+        """Yield (path, leaf) for every file at or below directory"""
+        if directory not in self.files:
+            return
+        pending = [directory]
+        while pending:
+            current = pending.pop()
+            for name, leaf in self.files[current].items():
+                yield self._join(current, name), leaf
+            pending.extend(self._join(current, name) for name in self.dirs[current])
+
+    def diff(self, other: 'EMADMerkleTree', directory: str = '') -> Tuple[List[str], List[str], List[str]]:
+        """(added, modified, deleted) paths going from this tree to other
+
+        A file is modified when its leaf or its mode changed. Subtrees whose
+        digests match are skipped without being looked at.
+        """
+        added, modified, deleted = [], [], []
+        pending = [directory]
+        while pending:
+            current = pending.pop()
+            if self.digest(current) == other.digest(current):
+                continue
+            if current not in self.files:
+                added.extend(path for path, _ in other.walk(current))
+                continue
+            if current not in other.files:
+                deleted.extend(path for path, _ in self.walk(current))
+                continue
+
+            old_files, new_files = self.files[current], other.files[current]
+            for name, leaf in new_files.items():
+                path = self._join(current, name)
+                previous = old_files.get(name)
+                if previous is None:
+                    added.append(path)
+                elif previous != leaf or self.mode(path) != other.mode(path):
+                    modified.append(path)
+            deleted.extend(self._join(current, name) for name in old_files if name not in new_files)
+            pending.extend(self._join(current, name) for name in self.dirs[current] | other.dirs[current])
+        return added, modified, deleted
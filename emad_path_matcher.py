@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+
+"""
+EMAD Path Matcher
+
+Compiled, gitignore-style include/exclude matching for workspace-relative paths.
+
+Patterns follow .gitignore semantics: "name" matches at any depth, patterns
+containing "/" are anchored to their base directory, a trailing "/" matches
+directories only, "*", "?", "[...]" and "**" are globs, and "!" re-includes.
+The glob patterns emitted by emad-project-templates.py and
+emad-intelligent-config.py ("**/*.py", "node_modules/**", ...) use the same
+syntax, so they compile into the same matcher as the project's .gitignore files.
+
+Rules are compiled once into runs of same-polarity rules. Each run answers
+with set lookups for literal names and paths, one str.endswith() for "*.ext"
+suffixes, and combined regexes for the remaining name and path globs, so a
+lookup costs a few hash probes and at most a couple of regex matches per run
+instead of a loop over every pattern. Directory verdicts are cached, which
+makes the parent-directory checks of is_path_excluded() nearly free.
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+GLOB_CHARS = frozenset('*?[')
+DIR_CACHE_SIZE = 65536  # Directory verdicts kept between recompiles
+
+
+def _translate_glob(pattern: str) -> str:
+    """Translate a gitignore glob (without leading/trailing slashes) to a regex"""
+    regex = []
+    i = 0
+    length = len(pattern)
+
+    while i < length:
+        char = pattern[i]
+
+        if pattern.startswith('**/', i) and (i == 0 or pattern[i - 1] == '/'):
+            regex.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i) and i + 2 == length and (i == 0 or pattern[i - 1] == '/'):
+            regex.append('.*')
+            i += 2
+        elif char == '*':
+            regex.append('[^/]*')
+            i += 1
+        elif char == '?':
+            regex.append('[^/]')
+            i += 1
+        elif char == '[':
+            end = pattern.find(']', i + 2 if pattern.startswith('[!', i) or pattern.startswith('[^', i) else i + 1)
+            if end == -1:
+                regex.append(re.escape(char))
+                i += 1
+                continue
+            body = pattern[i + 1:end]
+            if body[:1] in ('!', '^'):
+                body = '^' + body[1:]
+            regex.append('[' + body.replace('\\', '\\\\') + ']')
+            i = end + 1
+        elif char == '\\' and i + 1 < length:
+            regex.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            regex.append(re.escape(char))
+            i += 1
+
+    return ''.join(regex)
+
+
+class _Rule:
+    """A single parsed gitignore-style pattern"""
+
+    __slots__ = ('negated', 'dir_only', 'literal_name', 'literal_path', 'suffix', 'name_regex', 'regex')
+
+    def __init__(self, pattern: str, base: str = ''):
+        self.negated = pattern.startswith('!')
+        if self.negated:
+            pattern = pattern[1:]
+        elif pattern.startswith('\\!') or pattern.startswith('\\#'):
+            pattern = pattern[1:]
+
+        self.dir_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+
+        anchored = '/' in pattern
+        pattern = pattern.lstrip('/')
+        if not base and pattern.startswith('**/') and '/' not in pattern[3:]:
+            # "**/*.py" at the root is the same as the unanchored "*.py"
+            pattern, anchored = pattern[3:], False
+        has_glob = any(char in GLOB_CHARS or char == '\\' for char in pattern)
+
+        self.literal_name = None
+        self.literal_path = None
+        self.suffix = None
+        self.name_regex = None
+        self.regex = None
+
+        if not has_glob and not anchored and not base:
+            self.literal_name = pattern
+        elif not anchored and not base and pattern.startswith('*') and \
+                not any(char in GLOB_CHARS or char == '\\' for char in pattern[1:]):
+            self.suffix = pattern[1:]
+        elif not anchored and not base:
+            self.name_regex = _translate_glob(pattern)
+        elif not has_glob and anchored:
+            self.literal_path = base + pattern
+        elif anchored:
+            self.regex = re.escape(base) + _translate_glob(pattern)
+        else:
+            self.regex = re.escape(base) + '(?:.*/)?' + _translate_glob(pattern)
+
+
+class _RuleRun:
+    """Consecutive rules of the same polarity, compiled together"""
+
+    def __init__(self, rules: List[_Rule], ignore_case: bool):
+        self.negated = rules[0].negated
+        flags = re.IGNORECASE if ignore_case else 0
+
+        self.names = set()
+        self.dir_names = set()
+        self.paths = set()
+        self.dir_paths = set()
+        suffixes = set()
+        dir_suffixes = set()
+        name_regexes = []
+        dir_name_regexes = []
+        regexes = []
+        dir_regexes = []
+
+        for rule in rules:
+            if rule.literal_name is not None:
+                (self.dir_names if rule.dir_only else self.names).add(rule.literal_name)
+            elif rule.literal_path is not None:
+                (self.dir_paths if rule.dir_only else self.paths).add(rule.literal_path)
+            elif rule.suffix is not None:
+                (dir_suffixes if rule.dir_only else suffixes).add(rule.suffix)
+            elif rule.name_regex is not None:
+                (dir_name_regexes if rule.dir_only else name_regexes).append(rule.name_regex)
+            else:
+                (dir_regexes if rule.dir_only else regexes).append(rule.regex)
+
+        # str.endswith() accepts a tuple; an empty suffix ("*") matches every name
+        self.suffixes = tuple(sorted(suffixes))
+        self.dir_suffixes = tuple(sorted(dir_suffixes))
+        self.name_regex = self._combine(name_regexes, flags)
+        self.dir_name_regex = self._combine(dir_name_regexes, flags)
+        self.regex = self._combine(regexes, flags)
+        self.dir_regex = self._combine(dir_regexes, flags)
+
+    @staticmethod
+    def _combine(regexes: List[str], flags: int):
+        """Compile alternatives into one anchored regex"""
+        if not regexes:
+            return None
+        return re.compile('(?:' + '|'.join(f'(?:{regex})' for regex in regexes) + ')\\Z', flags)
+
+    def matches(self, path: str, name: str, is_dir: bool) -> bool:
+        if name in self.names or path in self.paths:
+            return True
+        if self.suffixes and name.endswith(self.suffixes):
+            return True
+        if self.name_regex is not None and self.name_regex.match(name):
+            return True
+        if self.regex is not None and self.regex.match(path):
+            return True
+        if is_dir:
+            if name in self.dir_names or path in self.dir_paths:
+                return True
+            if self.dir_suffixes and name.endswith(self.dir_suffixes):
+                return True
+            if self.dir_name_regex is not None and self.dir_name_regex.match(name):
+                return True
+            if self.dir_regex is not None and self.dir_regex.match(path):
+                return True
+        return False
+
+
+class EMADPathMatcher:
+    """Gitignore-aware include/exclude matcher for paths relative to a workspace root"""
+
+    def __init__(self, exclude_patterns: Iterable[str] = (), include_patterns: Optional[Iterable[str]] = None,
+                 ignore_case: bool = False):
+        self.ignore_case = ignore_case
+        self._sources: Dict[str, Tuple[Optional[int], List[_Rule]]] = {}
+        self._runs: List[_RuleRun] = []
+        self._has_negation = False
+        self._dir_cache: Dict[str, bool] = {}
+        self._dirty = True
+
+        self.add_patterns(exclude_patterns, source='<exclude>')
+
+        include_patterns = [pattern for pattern in (include_patterns or []) if pattern not in ('**/*', '**', '*')]
+        self._include = _RuleRun([self._parse(pattern) for pattern in include_patterns], ignore_case) \
+            if include_patterns else None
+
+    @classmethod
+    def for_workspace(cls, root: Path, exclude_patterns: Iterable[str] = (),
+                      include_patterns: Optional[Iterable[str]] = None, use_gitignore: bool = True,
+                      ignore_case: bool = False) -> 'EMADPathMatcher':
+        """Build a matcher from explicit patterns plus the root .gitignore and .git/info/exclude"""
+        matcher = cls(exclude_patterns, include_patterns, ignore_case)
+        if use_gitignore:
+            root = Path(root)
+            matcher.add_gitignore(root / '.git' / 'info' / 'exclude')
+            matcher.add_gitignore(root / '.gitignore')
+        return matcher
+
+    def _parse(self, pattern: str, base: str = '') -> _Rule:
+        if self.ignore_case:
+            pattern, base = pattern.lower(), base.lower()
+        return _Rule(pattern, base)
+
+    def add_patterns(self, patterns: Iterable[str], base: str = '', source: Optional[str] = None,
+                     version: Optional[int] = None):
+        """Add gitignore-style patterns, relative to base ('' or 'dir/sub/')
+
+        Rules registered under an existing source replace the old ones, so a
+        re-read .gitignore does not accumulate duplicates.
+        """
+        rules = []
+        for line in patterns:
+            line = line.rstrip('\n').rstrip('\r')
+            if not line.endswith('\\ '):
+                line = line.rstrip()
+            if not line or line.startswith('#'):
+                continue
+            rules.append(self._parse(line, base))
+
+        self._sources[source or f'<patterns {len(self._sources)}>'] = (version, rules)
+        self._dirty = True
+
+    def add_gitignore(self, gitignore_path: Path, base: str = '') -> bool:
+        """Load a .gitignore-format file whose patterns are relative to base
+
+        Returns False if the file does not exist (any rules loaded from it
+        earlier are dropped). Reloading an unchanged file (same mtime) is a no-op.
+        """
+        source = str(gitignore_path)
+        try:
+            mtime_ns = gitignore_path.stat().st_mtime_ns
+        except OSError:
+            return self._drop_source(source)
+
+        if source in self._sources and self._sources[source][0] == mtime_ns:
+            return True
+
+        try:
+            with open(gitignore_path, 'r', encoding='utf-8', errors='replace') as f:
+                self.add_patterns(f.readlines(), base=base, source=source, version=mtime_ns)
+        except OSError:
+            return self._drop_source(source)
+        return True
+
+    def has_gitignore(self, gitignore_path: Path) -> bool:
+        """Whether rules from this .gitignore file are loaded"""
+        return str(gitignore_path) in self._sources
+
+    def _drop_source(self, source: str) -> bool:
+        """Forget the rules of a file that can no longer be read; always False"""
+        if self._sources.pop(source, None) is not None:
+            self._dirty = True
+        return False
+
+    def _compile(self):
+        rules = [rule for _, source_rules in list(self._sources.values()) for rule in source_rules]
+        runs = []
+
+        start = 0
+        for i in range(1, len(rules) + 1):
+            if i == len(rules) or rules[i].negated != rules[start].negated:
+                runs.append(_RuleRun(rules[start:i], self.ignore_case))
+                start = i
+
+        # Swap in complete state so concurrent readers (e.g. a watcher thread) never see a partial list
+        self._has_negation = any(rule.negated for rule in rules)
+        self._runs = runs
+        self._dir_cache = {}
+        self._dirty = False
+
+    def _normalise(self, relative_path: str) -> str:
+        if os.sep != '/':
+            relative_path = relative_path.replace(os.sep, '/')
+        if self.ignore_case:
+            relative_path = relative_path.lower()
+        return relative_path.strip('/')
+
+    def _match(self, path: str, is_dir: bool) -> bool:
+        name = path.rsplit('/', 1)[-1]
+        for run in reversed(self._runs):
+            if run.matches(path, name, is_dir):
+                return not run.negated
+        return False
+
+    def is_excluded(self, relative_path: str, is_dir: bool = False) -> bool:
+        """Check a path whose parent directories are already known not to be excluded
+
+        This is the walker's fast path. A directory is also reported excluded
+        when every path below it is ("build/**"), so it can be pruned.
+        """
+        if self._dirty:
+            self._compile()
+        path = self._normalise(relative_path)
+        if not path:
+            return False
+
+        if not is_dir:
+            return self._match(path, False)
+        return self._is_dir_excluded(path)
+
+    def _is_dir_excluded(self, path: str) -> bool:
+        cache = self._dir_cache
+        excluded = cache.get(path)
+        if excluded is None:
+            excluded = self._match(path, True) or (not self._has_negation and self._match(path + '/', False))
+            if len(cache) >= DIR_CACHE_SIZE:
+                cache.clear()
+            cache[path] = excluded
+        return excluded
+
+    def is_path_excluded(self, relative_path: str, is_dir: bool = False) -> bool:
+        """Check a path, including whether any of its parent directories is excluded"""
+        if self._dirty:
+            self._compile()
+        path = self._normalise(relative_path)
+        if not path:
+            return False
+
+        end = path.find('/')
+        while end != -1:
+            if self._is_dir_excluded(path[:end]):
+                return True
+            end = path.find('/', end + 1)
+        return self._is_dir_excluded(path) if is_dir else self._match(path, False)
+
+    def is_included(self, relative_path: str) -> bool:
+        """Check a file path against the include patterns (everything when none are set)"""
+        if self._include is None:
+            return True
+        path = self._normalise(relative_path)
+        return self._include.matches(path, path.rsplit('/', 1)[-1], False)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+"""
+EMAD Rename Detection
+
+Moving a directory shows up in a scan as every file deleted at the old path
+and added at the new one. Git records no renames either; like `git diff -M`,
+they are inferred by pairing deleted paths with added ones:
+
+- exactly, when the added file's git blob SHA is the blob the repository
+  holds at a deleted path (the commit then reuses that blob as it is)
+- optionally by similarity, for files edited as they were moved, comparing
+  the old blob's lines with the new file's
+
+    exact_renames({'old/a.md': sha}, {'new/a.md': sha})   # [('old/a.md', 'new/a.md')]
+    similar_renames([(0.93, 'old/b.md', 'new/b.md')], 0.8)  # [('old/b.md', 'new/b.md', 93)]
+"""
+
+import bisect
+import difflib
+import heapq
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+RENAME_MAX_CANDIDATES = 100      # Near-rename pairs compared per sync; each costs a blob download
+RENAME_MAX_BYTES = 1024 * 1024   # Larger files are only ever matched exactly
+
+Rename = Tuple[str, str, int]  # (old path, new path, similarity percent)
+
+
+def file_name(path: str, sep: str) -> str:
+    return path.rpartition(sep)[2]
+
+
+def file_extension(path: str, sep: str) -> str:
+    name = file_name(path, sep)
+    return name.rpartition('.')[2] if '.' in name else ''
+
+
+def exact_renames(deleted_blobs: Dict[str, str], added_blobs: Dict[str, str],
+                  sep: str = '/') -> List[Tuple[str, str]]:
+    """(old, new) pairs of deleted and added paths holding the same blob
+
+    When several deleted paths held the content, the one with the added
+    path's file name is preferred; each path is used once.
+    """
+    by_blob: Dict[str, List[str]] = {}
+    for old_path, blob_sha in sorted(deleted_blobs.items()):
+        by_blob.setdefault(blob_sha, []).append(old_path)
+
+    renames = []
+    for new_path, blob_sha in sorted(added_blobs.items()):
+        old_paths = by_blob.get(blob_sha)
+        if not old_paths:
+            continue
+        name = file_name(new_path, sep)
+        old_path = next((path for path in old_paths if file_name(path, sep) == name), old_paths[0])
+        old_paths.remove(old_path)
+        renames.append((old_path, new_path))
+    return renames
+
+
+def size_ratio(old_size: int, new_size: int) -> float:
+    larger = max(old_size, new_size)
+    return min(old_size, new_size) / larger if larger else 1.0
+
+
+def similar_candidates(deleted_sizes: Dict[str, Optional[int]], added_sizes: Dict[str, int], threshold: float,
+                       sep: str = '/', limit: int = RENAME_MAX_CANDIDATES) -> List[Tuple[str, str]]:
+    """(old, new) pairs worth comparing for a near rename, most promising first
+
+    A pair qualifies when both files have the same extension and their sizes
+    are within threshold of each other; an old file of unknown size only
+    pairs with a file of the same name. Deleted files are bucketed by name
+    and by extension (sorted by size), so each added file looks at its
+    same-name files plus at most limit others, nearest size first, instead
+    of at every deleted file.
+    """
+    by_name: Dict[str, List[Tuple[str, Optional[int]]]] = {}
+    by_extension: Dict[str, List[Tuple[int, str]]] = {}
+    for old_path, old_size in deleted_sizes.items():
+        if old_size is not None and old_size > RENAME_MAX_BYTES:
+            continue
+        by_name.setdefault(file_name(old_path, sep), []).append((old_path, old_size))
+        if old_size is not None:
+            by_extension.setdefault(file_extension(old_path, sep), []).append((old_size, old_path))
+    for bucket in by_extension.values():
+        bucket.sort()
+
+    def scored_pairs():
+        for new_path, new_size in added_sizes.items():
+            if new_size > RENAME_MAX_BYTES:
+                continue
+            name = file_name(new_path, sep)
+            for old_path, old_size in by_name.get(name, ()):
+                ratio = 0.0 if old_size is None else size_ratio(old_size, new_size)
+                if old_size is None or ratio >= threshold:
+                    yield 0, -ratio, old_path, new_path
+            nearest = _nearest_sizes(by_extension.get(file_extension(new_path, sep), []), new_size, threshold)
+            others = ((ratio, old_path) for ratio, old_path in nearest if file_name(old_path, sep) != name)
+            for ratio, old_path in islice(others, limit):
+                yield 1, -ratio, old_path, new_path
+
+    # A bounded heap keeps the limit best pairs without sorting them all
+    return [(old_path, new_path) for _, _, old_path, new_path in heapq.nsmallest(limit, scored_pairs())]
+
+
+def _nearest_sizes(bucket: List[Tuple[int, str]], size: int, threshold: float) -> Iterator[Tuple[float, str]]:
+    """(size ratio, path) of a size-sorted bucket's entries, closest size first, while at or above threshold"""
+    below = bisect.bisect_left(bucket, (size, ''))
+    above = below
+    below -= 1
+    while True:
+        below_ratio = size_ratio(bucket[below][0], size) if below >= 0 else -1.0
+        above_ratio = size_ratio(bucket[above][0], size) if above < len(bucket) else -1.0
+        if max(below_ratio, above_ratio) < threshold:
+            return
+        if below_ratio >= above_ratio:
+            yield below_ratio, bucket[below][1]
+            below -= 1
+        else:
+            yield above_ratio, bucket[above][1]
+            above += 1
+
+
+def content_similarity(old: bytes, new: bytes) -> float:
+    """Share of lines the two contents have in common, 0.0 to 1.0; binary content only matches itself"""
+    if old == new:
+        return 1.0
+    if b'\0' in old or b'\0' in new:
+        return 0.0
+    matcher = difflib.SequenceMatcher(None, old.splitlines(keepends=True), new.splitlines(keepends=True),
+                                      autojunk=False)
+    return matcher.ratio()
+
+
+def similar_renames(scores: Iterable[Tuple[float, str, str]], threshold: float) -> List[Rename]:
+    """Best (old, new, percent) pairing of scored pairs at or above threshold, each path used once"""
+    renames, used = [], set()
+    for similarity, old_path, new_path in sorted(scores, key=lambda score: (-score[0], score[1], score[2])):
+        if similarity < threshold or old_path in used or new_path in used:
+            continue
+        used.update((old_path, new_path))
+        renames.append((old_path, new_path, int(similarity * 100)))
+    return sorted(renames, key=lambda rename: rename[1])
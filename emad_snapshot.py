@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+"""
+EMAD Snapshot
+
+A compact path -> SHA-256 mapping for the auto-sync baseline. A dict of
+path strings to 64-character hex strings costs a few hundred bytes per
+file; at a million files that is hundreds of MB, held twice while a scan
+is compared with the previous one. The snapshot keeps instead:
+
+- a table of directory paths, each stored once, and a directory id per file
+- the file names, UTF-8 encoded back to back in one bytes object
+- the digests as raw 32-byte values in another
+
+all sorted by path, so lookups are a binary search and two snapshots are
+diffed with a single merge pass. Updates go to a small overlay dict that is
+merged into the sorted arrays once it grows past a fraction of them.
+
+    snapshot = EMADSnapshot.from_items(hashes.items(), os.sep)
+    snapshot['docs/a.md']              # hex digest, like the dict
+    snapshot['docs/b.md'] = file_hash
+    snapshot.diff(newer)               # (added, modified, deleted), sorted
+"""
+
+import heapq
+from array import array
+from collections.abc import MutableMapping
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+DIGEST_SIZE = 32          # Bytes of a SHA-256 digest
+COMPACT_MIN_CHANGES = 1024  # The overlay is merged once it holds this many changes...
+COMPACT_FRACTION = 8        # ...and at least 1/8 of the sorted entries
+
+
+class EMADSnapshot(MutableMapping):
+    """Relative path -> SHA-256 hex digest, stored in sorted compact arrays
+
+    Behaves like the dict it replaces (iteration is in path order); paths
+    use sep, as the Merkle tree's do.
+    """
+
+    def __init__(self, sep: str = '/'):
+        self.sep = sep
+        self._dirs: List[str] = []           # Directory paths, '' for the root
+        self._dir_ids = array('I')           # Per entry: index into _dirs
+        self._names = b''                    # Per entry: UTF-8 file name, concatenated
+        self._name_ends = array('Q', [0])    # Per entry: end offset of its name in _names
+        self._digests = b''                  # Per entry: raw digest
+        # Changes since the arrays were built: path -> raw digest, or None once deleted
+        self._overlay: Dict[str, Optional[bytes]] = {}
+        self._count = 0
+
+    @classmethod
+    def from_items(cls, items: Iterable[Tuple[str, str]], sep: str = '/') -> 'EMADSnapshot':
+        snapshot = cls(sep)
+        # Sorting the (path, hex) pairs first only adds a tuple per entry: the strings are the caller's
+        snapshot._build((path, bytes.fromhex(file_hash)) for path, file_hash in sorted(items))
+        return snapshot
+
+    def _build(self, entries: Iterable[Tuple[str, bytes]]):
+        """Replace the arrays with entries, which must be sorted by path"""
+        dirs, dir_index = [], {}
+        dir_ids, name_ends, names, digests = array('I'), array('Q', [0]), bytearray(), bytearray()
+        for path, digest in entries:
+            if len(digest) != DIGEST_SIZE:
+                raise ValueError(f'Not a SHA-256 digest for {path}: {digest.hex()!r}')
+            directory, _, name = path.rpartition(self.sep)
+            dir_id = dir_index.get(directory)
+            if dir_id is None:
+                dir_id = dir_index[directory] = len(dirs)
+                dirs.append(directory)
+            names += name.encode('utf-8')
+            dir_ids.append(dir_id)
+            name_ends.append(len(names))
+            digests += digest
+
+        # Copied to bytes to drop the bytearrays' growth headroom
+        self._dirs, self._dir_ids, self._names, self._name_ends, self._digests = \
+            dirs, dir_ids, bytes(names), name_ends, bytes(digests)
+        self._overlay = {}
+        self._count = len(dir_ids)
+
+    def _path_at(self, index: int) -> str:
+        name = self._names[self._name_ends[index]:self._name_ends[index + 1]].decode('utf-8')
+        directory = self._dirs[self._dir_ids[index]]
+        return f'{directory}{self.sep}{name}' if directory else name
+
+    def _digest_at(self, index: int) -> bytes:
+        return self._digests[index * DIGEST_SIZE:(index + 1) * DIGEST_SIZE]
+
+    def _find(self, path: str) -> int:
+        """Index of path in the sorted arrays, or -1"""
+        low, high = 0, len(self._dir_ids)
+        while low < high:
+            middle = (low + high) // 2
+            if self._path_at(middle) < path:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < len(self._dir_ids) and self._path_at(low) == path else -1
+
+    def _raw(self, path: str) -> Optional[bytes]:
+        if path in self._overlay:
+            return self._overlay[path]
+        index = self._find(path)
+        return self._digest_at(index) if index >= 0 else None
+
+    def _base_items(self) -> Iterator[Tuple[str, bytes]]:
+        prefixes = [f'{directory}{self.sep}' if directory else '' for directory in self._dirs]
+        names, name_ends, digests = self._names, self._name_ends, self._digests
+        start = 0
+        for index, dir_id in enumerate(self._dir_ids):
+            end = name_ends[index + 1]
+            yield (prefixes[dir_id] + names[start:end].decode('utf-8'),
+                   digests[index * DIGEST_SIZE:(index + 1) * DIGEST_SIZE])
+            start = end
+
+    def raw_items(self) -> Iterator[Tuple[str, bytes]]:
+        """(path, raw digest) in path order"""
+        base = self._base_items()
+        if not self._overlay:
+            yield from base
+            return
+        overlay = sorted(self._overlay.items())
+        # On equal paths the overlay (second) wins; merge() keeps input order for ties
+        merged = heapq.merge(((path, 0, digest) for path, digest in base),
+                             ((path, 1, digest) for path, digest in overlay))
+        pending = None
+        for path, _, digest in merged:
+            if pending is not None and pending[0] != path and pending[1] is not None:
+                yield pending
+            pending = (path, digest)
+        if pending is not None and pending[1] is not None:
+            yield pending
+
+    def __getitem__(self, path: str) -> str:
+        digest = self._raw(path)
+        if digest is None:
+            raise KeyError(path)
+        return digest.hex()
+
+    def __setitem__(self, path: str, file_hash: str):
+        digest = bytes.fromhex(file_hash)
+        if len(digest) != DIGEST_SIZE:
+            raise ValueError(f'Not a SHA-256 digest: {file_hash!r}')
+        if self._raw(path) is None:
+            self._count += 1
+        self._overlay[path] = digest
+        self._maybe_compact()
+
+    def __delitem__(self, path: str):
+        if self._raw(path) is None:
+            raise KeyError(path)
+        self._count -= 1
+        self._overlay[path] = None
+        self._maybe_compact()
+
+    def __contains__(self, path) -> bool:
+        return isinstance(path, str) and self._raw(path) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for path, _ in self.raw_items():
+            yield path
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __repr__(self) -> str:
+        return f'<EMADSnapshot of {self._count} files>'
+
+    def _maybe_compact(self):
+        if len(self._overlay) >= max(COMPACT_MIN_CHANGES, len(self._dir_ids) // COMPACT_FRACTION):
+            self.compact()
+
+    def compact(self):
+        """Merge the overlay into the sorted arrays"""
+        if self._overlay:
+            self._build(list(self.raw_items()))
+
+    def items(self):
+        # Overridden for speed: Mapping.items() would look every path up again
+        return ((path, digest.hex()) for path, digest in self.raw_items())
+
+    def values(self):
+        return (digest.hex() for _, digest in self.raw_items())
+
+    def diff(self, other: 'EMADSnapshot') -> Tuple[List[str], List[str], List[str]]:
+        """(added, modified, deleted) paths going from this snapshot to other, each sorted"""
+        added, modified, deleted = [], [], []
+        old_items, new_items = self.raw_items(), other.raw_items()
+        old, new = next(old_items, None), next(new_items, None)
+        while old is not None or new is not None:
+            if new is None or (old is not None and old[0] < new[0]):
+                deleted.append(old[0])
+                old = next(old_items, None)
+            elif old is None or new[0] < old[0]:
+                added.append(new[0])
+                new = next(new_items, None)
+            else:
+                if old[1] != new[1]:
+                    modified.append(new[0])
+                old, new = next(old_items, None), next(new_items, None)
+        return added, modified, deleted
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+
+"""
+EMAD Workspace Daemon
+
+Monitors many workspaces from one process. Each workspace keeps its own
+EMADAutoSync (baseline, manifest, journal, repository target, interval and
+sync mode), while the expensive resources are shared and bounded:
+
+- one hash pool and one upload pool, serving workspaces round-robin so a
+  huge scan in one workspace cannot starve the others;
+- one GitHub session (connection pool) and one request scheduler, so every
+  workspace draws on the same rate-limit budget;
+- a small pool of cycle threads; a coordinator thread starts the cycles
+  that are due, longest-waiting workspace first.
+
+Workspaces are listed in a JSON file:
+
+    {
+        "hash_workers": 8,
+        "upload_workers": 8,
+        "cycle_workers": 4,
+        "workspaces": [
+            {"path": "/srv/bmad/team-a", "repository": "acme/team-a-emad", "interval": 600},
+            {"path": "/srv/bmad/team-b", "name": "b", "detector": "git-status", "sync_mode": "git"},
+            {"path": "team-c", "api_base": "https://github.example.com/api/v3", "repository": "eng/team-c",
+             "direct_push": true}
+        ]
+    }
+
+Relative paths are resolved against the file's directory. Anything not set
+for a workspace comes from its own generated configs, as for a single
+workspace.
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from emad_auto_sync import (EMADAutoSync, EMADRequestScheduler, DEFAULT_MONITOR_INTERVAL, GITHUB_API_BASE,
+                            DEFAULT_HASH_WORKERS, DEFAULT_UPLOAD_CONCURRENCY, DEFAULT_RETRY_ATTEMPTS)
+
+DEFAULT_WORKSPACES_FILE = Path('config') / 'emad-workspaces.json'
+DEFAULT_CYCLE_WORKERS = 4
+COORDINATOR_TICK = 0.5        # Seconds between checks for due cycles
+METRICS_LOG_INTERVAL = 3600   # Seconds between per-workspace metrics summaries
+
+
+class EMADFairPool:
+    """Bounded thread pool that serves workspaces round-robin
+
+    Each workspace has its own FIFO queue. An idle worker takes the next
+    task of the workspace whose turn it is, then sends that workspace to the
+    back of the line, so queued work is interleaved across workspaces
+    instead of running in submission order. Per-workspace counters record
+    tasks run, seconds spent running them and seconds they waited in queue.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str):
+        self.max_workers = max(1, max_workers)
+        self.thread_name_prefix = thread_name_prefix
+        self.condition = threading.Condition()
+        self.queues: Dict[str, Deque[Tuple[Future, Callable, tuple, float]]] = {}
+        self.turns: Deque[str] = deque()  # Workspaces with queued tasks, next to be served first
+        self.pending = 0
+        self.idle = 0
+        self.closed = False
+        self.workers: List[threading.Thread] = []
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    def submit(self, workspace: str, fn: Callable, *args) -> Future:
+        future = Future()
+        with self.condition:
+            if self.closed:
+                raise RuntimeError(f'{self.thread_name_prefix} pool is shut down')
+            queue = self.queues.setdefault(workspace, deque())
+            if not queue:
+                self.turns.append(workspace)
+            queue.append((future, fn, args, time.monotonic()))
+            self.stats.setdefault(workspace, {'tasks': 0, 'busy_seconds': 0.0, 'wait_seconds': 0.0})
+            self.pending += 1
+
+            if self.pending > self.idle and len(self.workers) < self.max_workers:
+                worker = threading.Thread(target=self._work, daemon=True,
+                                          name=f'{self.thread_name_prefix}-{len(self.workers)}')
+                self.workers.append(worker)
+                worker.start()
+            self.condition.notify()
+        return future
+
+    def map(self, workspace: str, fn: Callable, items: List) -> List:
+        """Run fn over items for a workspace and return the results in order"""
+        futures = [self.submit(workspace, fn, item) for item in items]
+        return [future.result() for future in futures]
+
+    def _next_task(self) -> Optional[Tuple[str, Future, Callable, tuple, float]]:
+        with self.condition:
+            while not self.turns:
+                if self.closed:
+                    return None
+                self.idle += 1
+                self.condition.wait()
+                self.idle -= 1
+
+            workspace = self.turns.popleft()
+            queue = self.queues[workspace]
+            future, fn, args, queued_at = queue.popleft()
+            self.pending -= 1
+            if queue:
+                self.turns.append(workspace)
+            else:
+                del self.queues[workspace]
+            return workspace, future, fn, args, queued_at
+
+    def _work(self):
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+            workspace, future, fn, args, queued_at = task
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            started = time.monotonic()
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+            with self.condition:
+                stats = self.stats[workspace]
+                stats['tasks'] += 1
+                stats['busy_seconds'] += time.monotonic() - started
+                stats['wait_seconds'] += started - queued_at
+
+    def metrics(self, workspace: str) -> Dict[str, float]:
+        with self.condition:
+            return dict(self.stats.get(workspace, {'tasks': 0, 'busy_seconds': 0.0, 'wait_seconds': 0.0}),
+                        queued=len(self.queues.get(workspace, ())))
+
+    def shutdown(self):
+        """Finish the queued tasks, then stop the workers"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        for worker in self.workers:
+            worker.join()
+
+
+class EMADSharedResources:
+    """Pools, GitHub session and request scheduler shared by a daemon's workspaces"""
+
+    def __init__(self, logger: logging.Logger, hash_workers: int = DEFAULT_HASH_WORKERS,
+                 upload_workers: int = DEFAULT_UPLOAD_CONCURRENCY, retry_attempts: int = DEFAULT_RETRY_ATTEMPTS,
+                 retry_delay: float = 30.0):
+        self.hash_pool = EMADFairPool(hash_workers, 'emad-hash')
+        self.upload_pool = EMADFairPool(upload_workers, 'emad-upload')
+        self.session = EMADAutoSync.create_session(upload_workers)
+        self.api = EMADRequestScheduler(self.session, logger, retry_attempts=retry_attempts,
+                                        backoff_max=retry_delay)
+
+    def shutdown(self):
+        self.hash_pool.shutdown()
+        self.upload_pool.shutdown()
+        self.session.close()
+
+
+class EMADWorkspace:
+    """One workspace of the daemon and when its next cycle is due"""
+
+    def __init__(self, sync: EMADAutoSync):
+        self.sync = sync
+        self.name = sync.workspace
+        self.next_scan = 0.0      # Monotonic time the next full scan is due; the first one runs at once
+        self.due_since: Optional[float] = None
+        self.dirty: Set[str] = set()
+        self.overflow = False
+        self.stats = {'cycles': 0, 'full_scans': 0, 'cycle_seconds': 0.0, 'last_cycle_seconds': 0.0}
+
+    @property
+    def watching(self) -> bool:
+        return bool(self.sync.watcher and self.sync.watcher.active)
+
+    def due_cycle(self, now: float) -> Tuple[bool, Optional[Set[str]]]:
+        """Whether a cycle is due, and the dirty paths it rescans (None for a full scan)
+
+        Mirrors EMADAutoSync.wait_for_changes() without blocking.
+        """
+        if self.watching:
+            dirty_paths, overflow = self.sync.watcher.drain()
+            self.dirty |= dirty_paths
+            self.overflow = self.overflow or overflow
+            if self.overflow or now >= self.next_scan:
+                return True, None
+            if self.dirty:
+                return True, set(self.dirty)
+            return self.sync.change_queue.due_in() == 0.0, set()
+
+        # Polling: queued changes move the next full scan forward (see cycle_finished)
+        return now >= self.next_scan, None
+
+    def cycle_finished(self, dirty_paths: Optional[Set[str]], started: float):
+        finished = time.monotonic()
+        if dirty_paths is None:
+            self.overflow = False
+            self.stats['full_scans'] += 1
+        self.dirty.difference_update(dirty_paths or ())
+        self.due_since = None
+        self.stats['cycles'] += 1
+        self.stats['last_cycle_seconds'] = finished - started
+        self.stats['cycle_seconds'] += finished - started
+
+        interval = self.sync.monitor_interval
+        if self.watching:
+            self.next_scan = max(self.sync.last_full_scan, started if dirty_paths is None else 0.0) + interval
+        else:
+            pending_due = self.sync.change_queue.due_in()
+            self.next_scan = finished + (interval if pending_due is None else min(interval, pending_due))
+
+
+class EMADWorkspaceDaemon:
+    """Runs the monitoring cycles of many workspaces on shared, bounded resources"""
+
+    def __init__(self, workspaces: List[Dict[str, Any]], hash_workers: Optional[int] = None,
+                 upload_workers: Optional[int] = None, cycle_workers: Optional[int] = None,
+                 api_base: str = GITHUB_API_BASE, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.cycle_workers = max(1, int(cycle_workers or DEFAULT_CYCLE_WORKERS))
+        self.shared = EMADSharedResources(self.logger, max(1, int(hash_workers or DEFAULT_HASH_WORKERS)),
+                                          max(1, int(upload_workers or DEFAULT_UPLOAD_CONCURRENCY)))
+        self.running = False
+        self.started_cycles: Dict[Future, Tuple[EMADWorkspace, Optional[Set[str]], float]] = {}
+        self.last_metrics_log = time.monotonic()
+
+        self.workspaces: List[EMADWorkspace] = []
+        names = set()
+        for entry in workspaces:
+            path = Path(entry['path'])
+            name = entry.get('name') or path.name
+            if name in names:
+                raise ValueError(f'Duplicate workspace name {name!r}; set "name" to tell them apart')
+            names.add(name)
+
+            sync = EMADAutoSync(path, int(entry.get('interval', DEFAULT_MONITOR_INTERVAL)),
+                                watch=entry.get('watch'), detector=entry.get('detector'),
+                                sync_mode=entry.get('sync_mode'),
+                                api_base=entry.get('api_base', api_base),
+                                blob_hashes=entry.get('git_blob_hashes'), direct_push=entry.get('direct_push'),
+                                repository=entry.get('repository'),
+                                workspace=name, shared=self.shared)
+            if sync.settings['sync'].get('engine', 'threads') != 'threads':
+                sync.logger.info('Runs on the threaded engine under the workspace daemon')
+            self.workspaces.append(EMADWorkspace(sync))
+
+    @classmethod
+    def from_config(cls, config_path: Path, **kwargs) -> 'EMADWorkspaceDaemon':
+        """Create a daemon from a workspaces file; raises ValueError if it is unusable"""
+        config_path = Path(config_path)
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ValueError(f'Cannot read workspaces file {config_path}: {e}') from e
+
+        workspaces = config.get('workspaces') if isinstance(config, dict) else None
+        if not workspaces or not all(isinstance(entry, dict) and entry.get('path') for entry in workspaces):
+            raise ValueError(f'{config_path} must list workspaces, each with a "path"')
+
+        for entry in workspaces:
+            path = Path(os.path.expanduser(entry['path']))
+            entry['path'] = path if path.is_absolute() else config_path.parent / path
+            if not entry['path'].is_dir():
+                raise ValueError(f'Workspace path does not exist: {entry["path"]}')
+
+        return cls(workspaces, hash_workers=config.get('hash_workers'), upload_workers=config.get('upload_workers'),
+                   cycle_workers=config.get('cycle_workers'), **kwargs)
+
+    def signal_handler(self, signum, frame):
+        self.logger.info(f'Received signal {signum}, stopping every workspace...')
+        self.stop()
+
+    def stop(self):
+        self.running = False
+
+    def start(self) -> bool:
+        """Authenticate and load every workspace's baseline; False if a workspace cannot authenticate"""
+        for workspace in self.workspaces:
+            sync = workspace.sync
+            if sync.uses_api() and not sync.authenticate():
+                sync.logger.error('Failed to authenticate with GitHub')
+                return False
+
+        # Baselines hash on the shared pool; load them side by side
+        with ThreadPoolExecutor(max_workers=self.cycle_workers, thread_name_prefix='emad-cycle') as executor:
+            counts = list(executor.map(lambda workspace: workspace.sync.establish_baseline(), self.workspaces))
+        for workspace, count in zip(self.workspaces, counts):
+            workspace.sync.log_startup()
+            workspace.sync.logger.info(f'Baseline established with {count} files')
+        return True
+
+    def dispatch(self, executor: ThreadPoolExecutor, now: Optional[float] = None) -> int:
+        """Reap finished cycles and start due ones, longest-waiting first; returns how many started"""
+        for future in [future for future in self.started_cycles if future.done()]:
+            workspace, dirty_paths, started = self.started_cycles.pop(future)
+            workspace.cycle_finished(dirty_paths, started)
+
+        now = time.monotonic() if now is None else now
+        busy = {workspace for workspace, _, _ in self.started_cycles.values()}
+        due = []
+        for workspace in self.workspaces:
+            if workspace in busy:
+                continue
+            is_due, dirty_paths = workspace.due_cycle(now)
+            if is_due:
+                if workspace.due_since is None:
+                    workspace.due_since = now
+                due.append((workspace.due_since, len(due), workspace, dirty_paths))
+
+        started = 0
+        for _, _, workspace, dirty_paths in sorted(due):
+            if len(self.started_cycles) >= self.cycle_workers:
+                break
+            future = executor.submit(workspace.sync.monitor_cycle, dirty_paths)
+            self.started_cycles[future] = (workspace, dirty_paths, time.monotonic())
+            started += 1
+        return started
+
+    def run_once(self) -> bool:
+        """Authenticate, load baselines and run one flushed cycle per workspace"""
+        if not self.start():
+            return False
+        with ThreadPoolExecutor(max_workers=self.cycle_workers, thread_name_prefix='emad-cycle') as executor:
+            list(executor.map(lambda workspace: workspace.sync.monitor_cycle(flush=True), self.workspaces))
+        self.log_metrics()
+        self.shared.shutdown()
+        return True
+
+    def run(self) -> bool:
+        """Monitor every workspace until stopped"""
+        if threading.current_thread() is threading.main_thread():  # Service wrappers run it on a thread
+            signal.signal(signal.SIGINT, self.signal_handler)
+            signal.signal(signal.SIGTERM, self.signal_handler)
+
+        if not self.start():
+            self.shared.shutdown()
+            return False
+
+        self.running = True
+        for workspace in self.workspaces:
+            if workspace.sync.watch_mode:
+                workspace.sync.start_watcher()
+        self.logger.info(f'Monitoring {len(self.workspaces)} workspaces with {self.cycle_workers} cycle threads, '
+                         f'{self.shared.hash_pool.max_workers} hash and '
+                         f'{self.shared.upload_pool.max_workers} upload workers')
+
+        executor = ThreadPoolExecutor(max_workers=self.cycle_workers, thread_name_prefix='emad-cycle')
+        try:
+            while self.running:
+                self.dispatch(executor)
+                if time.monotonic() - self.last_metrics_log >= METRICS_LOG_INTERVAL:
+                    self.log_metrics()
+                time.sleep(COORDINATOR_TICK)
+        except KeyboardInterrupt:
+            self.logger.info('Received keyboard interrupt, shutting down...')
+        except Exception as e:
+            self.logger.error(f'Unexpected error in workspace daemon: {e}')
+        finally:
+            self.running = False
+            # Cycles in progress finish; their syncs are journaled either way
+            executor.shutdown(wait=True)
+            for workspace in self.workspaces:
+                workspace.sync.stop_watcher()
+            self.log_metrics()
+            self.shared.shutdown()
+            self.logger.info('EMAD workspace daemon stopped')
+
+        return True
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-workspace cycle, sync and pool counters"""
+        return {
+            workspace.name: dict(
+                workspace.stats, **workspace.sync.sync_stats,
+                files=len(workspace.sync.file_hashes),
+                queued_changes=len(workspace.sync.change_queue),
+                hash_pool=self.shared.hash_pool.metrics(workspace.name),
+                upload_pool=self.shared.upload_pool.metrics(workspace.name)
+            )
+            for workspace in self.workspaces
+        }
+
+    def log_metrics(self):
+        self.last_metrics_log = time.monotonic()
+        for name, stats in self.metrics().items():
+            self.logger.info(f'[{name}] {stats["cycles"]} cycles ({stats["full_scans"]} full scans, '
+                             f'{stats["cycle_seconds"]:.1f}s), {stats["synced_changes"]} changes synced, '
+                             f'{stats["failed_syncs"]} failed syncs, {stats["files"]} files; '
+                             f'hashing {stats["hash_pool"]["busy_seconds"]:.1f}s, '
+                             f'uploads {stats["upload_pool"]["busy_seconds"]:.1f}s')
+        api_metrics = self.shared.api.metrics()
+        if api_metrics['remaining'] is not None:
+            self.logger.info(f'GitHub API budget: {api_metrics["remaining"]}/{api_metrics["limit"]} remaining')
+
+
+def setup_daemon_logging(log_dir: Path) -> logging.Logger:
+    """Log every workspace to one file; lines carry their workspace's name"""
+    log_dir.mkdir(parents=True, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_dir / f'emad-workspaces-{datetime.now().strftime("%Y%m%d")}.log'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+    return logging.getLogger(__name__)
@@ -0,0 +1,1495 @@
+#!/usr/bin/env python3
+
+"""
+EMAD Auto-Sync Test Suite
+
+Exercises the change-detection and sync engine of EMADAutoSync against
+temporary directories, without a GitHub token or network access.
+"""
+
+import os
+import sys
+import json
+import time
+import errno
+import base64
+import hashlib
+import tracemalloc
+import tempfile
+import traceback
+import asyncio
+import threading
+import requests
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from datetime import datetime
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from emad_auto_sync import EMADAutoSync, EMADStreamingUploadBody, EMADChangeWatcher, EMADChangeQueue, sync_engine_class
+import emad_httpx_sync
+from emad_httpx_sync import EMADHttpxAutoSync, HTTPX_AVAILABLE
+from emad_fake_github import EMADFakeGitHub, git_object_sha
+from emad_merkle import EMADMerkleTree
+from emad_snapshot import EMADSnapshot
+from emad_workspace_daemon import EMADFairPool, EMADWorkspaceDaemon
+
+OLD_MTIME = time.time() - 3600  # Outside the racy-stat window
+
+
+def make_tree(root: Path, files: dict, mtime: float = OLD_MTIME):
+    """Create files under root and backdate them so the stat cache trusts them"""
+    for rel_path, content in files.items():
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content if isinstance(content, bytes) else content.encode('utf-8'))
+        os.utime(path, (mtime, mtime))
+
+
+def make_sync(root: Path, **kwargs) -> EMADAutoSync:
+    """Create an auto-sync instance for a temporary workspace"""
+    return EMADAutoSync(root, **kwargs)
+
+
+def make_github_sync(root: Path, github: EMADFakeGitHub, **kwargs) -> EMADAutoSync:
+    """Create an authenticated auto-sync instance talking to a fake GitHub"""
+    sync = EMADAutoSync(root, api_base=github.url, **kwargs)
+    assert sync.authenticate()
+    return sync
+
+
+def git(cwd: Path, *args: str) -> str:
+    """Run a git command for test setup and return its output"""
+    return subprocess.run(['git', '-C', str(cwd), '-c', 'user.name=Test', '-c', 'user.email=test@example.com',
+                           *args], check=True, capture_output=True, text=True).stdout
+
+
+def local_files(root: Path, sync: EMADAutoSync) -> dict:
+    """Contents of every synced file, keyed like the fake GitHub's listing"""
+    return {Path(rel).as_posix(): path.read_bytes() for rel, path, _ in sync.walk_files(root)}
+
+
+def check_stat_cache_skips_unchanged_files(tmp: Path):
+    make_tree(tmp, {'a.md': 'alpha', 'docs/b.md': 'beta', 'docs/c.md': 'gamma'})
+    sync = make_sync(tmp)
+
+    sync.file_hashes = sync.scan_directory()
+    assert sync.scan_stats == {'skipped': 0, 'rehashed': 3}, sync.scan_stats
+
+    changes = sync.detect_changes()
+    assert not any(changes.values()), changes
+    assert sync.scan_stats == {'skipped': 3, 'rehashed': 0}, sync.scan_stats
+
+
+def check_stat_cache_detects_changes(tmp: Path):
+    make_tree(tmp, {'a.md': 'alpha', 'docs/b.md': 'beta', 'docs/c.md': 'gamma'})
+    sync = make_sync(tmp)
+    sync.file_hashes = sync.scan_directory()
+
+    make_tree(tmp, {'a.md': 'alpha v2', 'docs/new.md': 'new'}, mtime=OLD_MTIME + 60)
+    (tmp / 'docs' / 'c.md').unlink()
+
+    changes = sync.detect_changes()
+    assert changes == {'added': ['docs/new.md'], 'modified': ['a.md'], 'deleted': ['docs/c.md']}, changes
+    assert sync.scan_stats == {'skipped': 1, 'rehashed': 2}, sync.scan_stats
+
+
+def check_racy_files_are_rehashed(tmp: Path):
+    make_tree(tmp, {'fresh.md': 'one'}, mtime=time.time())
+    sync = make_sync(tmp)
+    sync.file_hashes = sync.scan_directory()
+
+    # Same size and (coarse) mtime, different content: the racy window must catch it
+    stat = (tmp / 'fresh.md').stat()
+    (tmp / 'fresh.md').write_text('two')
+    os.utime(tmp / 'fresh.md', ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    changes = sync.detect_changes()
+    assert changes['modified'] == ['fresh.md'], changes
+
+
+def check_manifest_detects_downtime_edits(tmp: Path):
+    make_tree(tmp, {'a.md': 'alpha', 'docs/b.md': 'beta', 'docs/c.md': 'gamma'})
+    first = make_sync(tmp)
+    assert first.establish_baseline() == 3
+    assert first.manifest_path.exists()
+    assert not [p for p in first.manifest_path.parent.iterdir() if p.suffix == '.tmp']
+
+    # Edits made while the daemon is stopped
+    make_tree(tmp, {'docs/b.md': 'beta v2', 'added.md': 'new'}, mtime=OLD_MTIME + 60)
+    (tmp / 'a.md').unlink()
+
+    restarted = make_sync(tmp)
+    assert restarted.establish_baseline() == 3
+    changes = restarted.detect_changes()
+    assert changes == {'added': ['added.md'], 'modified': ['docs/b.md'], 'deleted': ['a.md']}, changes
+    # Unchanged files come straight from the manifest's stat tuples
+    assert restarted.scan_stats == {'skipped': 1, 'rehashed': 2}, restarted.scan_stats
+
+
+def check_manifest_version_mismatch_rebaselines(tmp: Path):
+    make_tree(tmp, {'a.md': 'alpha'})
+    sync = make_sync(tmp)
+    sync.manifest_path.parent.mkdir(parents=True)
+    sync.manifest_path.write_text(json.dumps({'version': 999, 'files': {'gone.md': {'sha256': 'x'}}}))
+
+    assert sync.establish_baseline() == 1
+    assert list(sync.file_hashes) == ['a.md']
+    assert json.loads(sync.manifest_path.read_text())['version'] != 999
+
+
+def check_snapshot_matches_dict(tmp: Path):
+    digest = lambda seed: hashlib.sha256(str(seed).encode()).hexdigest()
+    reference = {f'dir{i % 9}/sub{i % 4}/f{i}.md': digest(i) for i in range(3000)}
+    reference['top.md'] = digest('top')
+    snapshot = EMADSnapshot.from_items(reference.items())
+    assert snapshot == reference and list(snapshot) == sorted(reference)
+
+    # Edits land in the overlay until it is large enough to be merged into the arrays
+    for i in range(0, 3000, 2):
+        del snapshot[f'dir{i % 9}/sub{i % 4}/f{i}.md'], reference[f'dir{i % 9}/sub{i % 4}/f{i}.md']
+        snapshot[f'new/f{i}.md'] = reference[f'new/f{i}.md'] = digest(-i)
+        assert len(snapshot._overlay) < 1024
+    snapshot['top.md'] = reference['top.md'] = digest('top 2')
+    assert snapshot == reference and len(snapshot) == len(reference)
+    assert 'dir0/sub0/f0.md' not in snapshot and snapshot.get('dir1/sub1/f1.md') == digest(1)
+
+    # A merge pass finds what a scan changed
+    rescanned = dict(reference, **{'top.md': digest('top 3'), 'added.md': digest('added')})
+    del rescanned['new/f0.md']
+    assert snapshot.diff(EMADSnapshot.from_items(rescanned.items())) == (['added.md'], ['top.md'], ['new/f0.md'])
+
+    # Far smaller than the dict of hex strings it replaces
+    tracemalloc.start()
+    as_dict = {f'dir{i % 90}/file{i:06d}.bin': digest(i) for i in range(20000)}
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tracemalloc.start()
+    as_snapshot = EMADSnapshot.from_items(as_dict.items())
+    snapshot_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert snapshot_bytes * 3 < dict_bytes, (snapshot_bytes, dict_bytes)
+
+
+def check_parallel_hashing_matches_serial(tmp: Path):
+    make_tree(tmp, {f'dir{i % 7}/file{i}.txt': f'content {i}' * (i + 1) for i in range(200)})
+
+    serial = make_sync(tmp, hash_workers=1).scan_directory()
+    parallel_sync = make_sync(tmp, hash_workers=8)
+    parallel = parallel_sync.scan_directory()
+
+    assert parallel == serial
+    assert list(parallel) == list(serial), "result order must not depend on worker count"
+    assert parallel_sync.scan_stats['rehashed'] == 200
+
+
+def check_parallel_hashing_isolates_errors(tmp: Path):
+    make_tree(tmp, {f'file{i}.txt': f'content {i}' for i in range(20)})
+
+    class FlakySync(EMADAutoSync):
+        def calculate_file_digests(self, file_path):
+            if file_path.name == 'file7.txt':
+                file_path = file_path.with_name('vanished.txt')
+            return super().calculate_file_digests(file_path)
+
+    hashes = FlakySync(tmp, hash_workers=4).scan_directory()
+    assert len(hashes) == 19 and 'file7.txt' not in hashes, sorted(hashes)
+
+
+def check_failed_scan_deletes_nothing(tmp: Path):
+    make_tree(tmp, {'a.md': 'a', 'docs/b.md': 'b'})
+
+    with EMADFakeGitHub({'a.md': b'a', 'docs/b.md': b'b'}) as github:
+        sync = make_github_sync(tmp, github)
+        sync.establish_baseline()
+        baseline = dict(sync.file_hashes.items())
+
+        def failing_hash_entries(*args, **kwargs):
+            raise OSError(errno.EIO, 'Input/output error')
+
+        # A scan that fails is not an empty workspace
+        sync.hash_entries = failing_hash_entries
+        assert sync.detect_changes() is None
+        assert sync.detect_changes({'docs'}) is None
+        sync.monitor_cycle(flush=True)
+        assert dict(sync.file_hashes.items()) == baseline
+        assert github.api_calls('POST create_commit') == 0 and github.files('main') == {'a.md': b'a', 'docs/b.md': b'b'}
+
+        # The next scan that works compares against the kept baseline
+        del sync.hash_entries
+        (tmp / 'a.md').unlink()
+        assert sync.detect_changes() == {'added': [], 'modified': [], 'deleted': ['a.md']}
+
+
+def check_unreadable_directories_delete_nothing(tmp: Path):
+    make_tree(tmp, {'a.md': 'a', 'docs/b.md': 'b', 'docs/sub/c.sh': 'c'})
+    (tmp / 'docs' / 'sub' / 'c.sh').chmod(0o755)
+    sync = make_sync(tmp)
+    sync.establish_baseline()
+    baseline = dict(sync.file_hashes.items())
+
+    # Permission bits do not stop root, so the listing failure is injected
+    scandir = os.scandir
+
+    def failing_scandir(path):
+        if Path(path) == tmp / 'docs':
+            raise OSError(errno.EIO, 'Input/output error', str(path))
+        return scandir(path)
+
+    os.scandir = failing_scandir
+    try:
+        make_tree(tmp, {'a.md': 'edited'})
+        assert sync.detect_changes() == {'added': [], 'modified': ['a.md'], 'deleted': []}
+        assert sync.detect_changes({'docs'}) == {'added': [], 'modified': [], 'deleted': []}
+        assert {path: file_hash for path, file_hash in sync.file_hashes.items() if path != 'a.md'} == \
+            {path: file_hash for path, file_hash in baseline.items() if path != 'a.md'}
+        assert os.path.join('docs', 'sub', 'c.sh') in sync.executables
+    finally:
+        os.scandir = scandir
+
+    # Once the directory lists again, what really changed in it is reported
+    (tmp / 'docs' / 'b.md').unlink()
+    assert sync.detect_changes() == {'added': [], 'modified': [], 'deleted': [os.path.join('docs', 'b.md')]}
+
+
+def check_worker_count_defaults_from_config(tmp: Path):
+    (tmp / 'config').mkdir()
+    (tmp / 'config' / 'emad-intelligent-config.json').write_text(
+        json.dumps({'performance': {'worker_count': 3}}))
+
+    assert make_sync(tmp).hash_workers == 3
+    assert make_sync(tmp, hash_workers=2).hash_workers == 2
+
+
+def check_chunked_hash_matches_hashlib(tmp: Path):
+    sync = make_sync(tmp)
+    small = os.urandom(3 * 1024 * 1024 + 17)
+    (tmp / 'small.bin').write_bytes(small)
+    assert sync.calculate_file_hash(tmp / 'small.bin') == hashlib.sha256(small).hexdigest()
+
+    # Large enough to take the mmap path
+    with open(tmp / 'large.bin', 'wb') as f:
+        f.write(b'head')
+        f.truncate(65 * 1024 * 1024)
+    expected = hashlib.sha256(b'head' + bytes(65 * 1024 * 1024 - 4)).hexdigest()
+    assert sync.calculate_file_hash(tmp / 'large.bin') == expected
+
+
+def check_streaming_upload_body_is_valid_json(tmp: Path):
+    content = os.urandom(2 * 1024 * 1024 + 1)
+    (tmp / 'asset.bin').write_bytes(content)
+    fields = {'message': 'Add "asset"', 'branch': 'auto-update', 'sha': 'abc'}
+
+    body = EMADStreamingUploadBody(tmp / 'asset.bin', fields)
+    chunks = []
+    while True:
+        chunk = body.read(8192)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    raw = b''.join(chunks)
+
+    assert len(raw) == len(body)
+    decoded = json.loads(raw)
+    assert base64.b64decode(decoded.pop('content')) == content
+    assert decoded == fields
+
+    # Retries rewind the body and resend the same bytes
+    body.seek(0)
+    assert body.read() == raw
+    body.close()
+
+
+def check_hash_and_upload_memory_bounded_on_1gb_file(tmp: Path):
+    huge = tmp / 'huge.bin'
+    with open(huge, 'wb') as f:
+        f.truncate(1024 * 1024 * 1024)
+    sync = make_sync(tmp)
+
+    tracemalloc.start()
+    try:
+        assert sync.calculate_file_hash(huge)
+        hash_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+
+        body = EMADStreamingUploadBody(huge, {'message': 'Add huge.bin', 'branch': 'auto-update'})
+        sent = 0
+        while True:
+            chunk = body.read(65536)
+            if not chunk:
+                break
+            sent += len(chunk)
+        body.close()
+        upload_peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert sent == len(body)
+    limit = 16 * 1024 * 1024
+    assert hash_peak < limit, f"hash peak {hash_peak} bytes"
+    assert upload_peak < limit, f"upload peak {upload_peak} bytes"
+
+
+def collect_dirty(watcher, expected: set, timeout: float = 5.0) -> set:
+    """Drain watcher events until every expected path has been reported"""
+    dirty = set()
+    deadline = time.monotonic() + timeout
+    while not expected <= dirty and time.monotonic() < deadline:
+        if watcher.wait(0.2):
+            paths, overflow = watcher.drain()
+            assert not overflow
+            dirty |= paths
+    return dirty
+
+
+def check_inotify_watcher_feeds_detect_changes(tmp: Path):
+    if not EMADChangeWatcher.BACKENDS['inotify'].is_supported():
+        return  # inotify is Linux-only
+    make_tree(tmp, {'a.md': 'alpha', 'docs/b.md': 'beta', 'docs/c.md': 'gamma', 'node_modules/x.js': 'x'})
+    sync = make_sync(tmp)
+    sync.establish_baseline()
+    assert sync.start_watcher(backend='inotify')
+    try:
+        (tmp / 'a.md').write_text('alpha v2')
+        (tmp / 'docs' / 'c.md').unlink()
+        (tmp / 'new' / 'deep').mkdir(parents=True)
+        (tmp / 'new' / 'deep' / 'file.md').write_text('new')
+        (tmp / 'node_modules' / 'x.js').write_text('ignored')
+        dirty = collect_dirty(sync.watcher, {'a.md', os.path.join('docs', 'c.md'), 'new'})
+    finally:
+        sync.stop_watcher()
+
+    assert not any(path.startswith('node_modules') for path in dirty), dirty
+    changes = sync.detect_changes(dirty)
+    assert changes == {'added': [os.path.join('new', 'deep', 'file.md')], 'modified': ['a.md'],
+                       'deleted': [os.path.join('docs', 'c.md')]}, changes
+    # Untouched files were neither walked nor rehashed
+    assert sync.scan_stats['rehashed'] == 2, sync.scan_stats
+    assert sync.file_hashes == make_sync(tmp).scan_directory()
+
+
+def check_dirty_directory_rename(tmp: Path):
+    make_tree(tmp, {'docs/b.md': 'beta', 'docs/sub/c.md': 'gamma', 'keep.md': 'keep'})
+    sync = make_sync(tmp)
+    sync.establish_baseline()
+    (tmp / 'docs').rename(tmp / 'guides')
+
+    changes = sync.detect_changes({'docs', 'guides'})
+    assert sorted(changes['deleted']) == [os.path.join('docs', 'b.md'), os.path.join('docs', 'sub', 'c.md')]
+    assert sorted(changes['added']) == [os.path.join('guides', 'b.md'), os.path.join('guides', 'sub', 'c.md')]
+    assert sync.file_hashes == make_sync(tmp).scan_directory()
+
+
+def check_watcher_overflow_requests_full_scan(tmp: Path):
+    make_tree(tmp, {'a.md': 'alpha'})
+    sync = make_sync(tmp, monitor_interval=3600)
+    sync.establish_baseline()
+    sync.running = True
+    if not sync.start_watcher():
+        return  # No watcher backend on this platform
+    try:
+        sync.watcher.mark_dirty(tmp / 'a.md')
+        sync.watcher.mark_overflow('simulated overflow')
+        assert sync.wait_for_changes() is None
+    finally:
+        sync.stop_watcher()
+
+
+def check_watch_limit_falls_back_to_polling(tmp: Path):
+    inotify_backend = EMADChangeWatcher.BACKENDS['inotify']
+    if not inotify_backend.is_supported():
+        return
+    make_tree(tmp, {'a/b/c.md': 'c'})
+
+    class ExhaustedBackend(inotify_backend):
+        def _add_watch(self, directory):
+            raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC), str(directory))
+
+    class LimitedWatcher(EMADChangeWatcher):
+        BACKENDS = {'inotify': ExhaustedBackend}
+
+    sync = make_sync(tmp)
+    watcher = LimitedWatcher(tmp, sync.should_exclude_file, sync.logger, backend='inotify')
+    assert watcher.start() is False
+    assert not watcher.active
+
+
+def check_walker_prunes_excluded_directories(tmp: Path):
+    files = {f'src/m{i}.py': f'm{i}' for i in range(5)}
+    files.update({f'node_modules/pkg{i}/index.js': 'x' for i in range(20)})
+    files.update({'.git/objects/ab/cdef': 'blob', 'src/debug.log': 'log', 'logs.d/keep.md': 'keep'})
+    make_tree(tmp, files)
+
+    visited = []
+
+    class RecordingSync(EMADAutoSync):
+        def is_excluded(self, relative_path, is_dir=False):
+            visited.append(Path(relative_path).as_posix())
+            return super().is_excluded(relative_path, is_dir)
+
+    hashes = RecordingSync(tmp).scan_directory()
+    assert 'node_modules' in visited and '.git' in visited, visited
+    assert not [path for path in visited if path.startswith(('node_modules/', '.git/'))], visited
+    assert sorted(hashes) == sorted([os.path.join('src', f'm{i}.py') for i in range(5)] +
+                                    [os.path.join('logs.d', 'keep.md')]), sorted(hashes)
+
+
+def check_exclusions_match_whole_names(tmp: Path):
+    make_tree(tmp, {'catalogs.md': 'c', '.envrc-docs': 'e', '.env': 'secret', '.env.local': 'secret',
+                    'logs/run.log': 'l', 'docs/x.logic': 'x', '.github/workflows/ci.yml': 'ci'})
+    sync = make_sync(tmp)
+
+    assert sorted(sync.scan_directory()) == sorted(
+        ['catalogs.md', '.envrc-docs', os.path.join('docs', 'x.logic'),
+         os.path.join('.github', 'workflows', 'ci.yml')])
+    assert sync.should_exclude_file(tmp / 'logs' / 'run.log')
+    assert not sync.should_exclude_file(tmp / 'catalogs.md')
+
+
+def check_gitignore_is_respected(tmp: Path):
+    make_tree(tmp, {'.gitignore': 'build/\n*.bak\n!keep.bak\n', 'build/out.js': 'o', 'a.bak': 'a',
+                    'keep.bak': 'k', 'src/.gitignore': '/generated.py\n', 'src/generated.py': 'g',
+                    'src/main.py': 'm', 'generated.py': 'root'})
+    sync = make_sync(tmp)
+
+    assert sorted(sync.scan_directory()) == sorted(
+        ['.gitignore', 'keep.bak', 'generated.py', os.path.join('src', '.gitignore'),
+         os.path.join('src', 'main.py')])
+    assert sync.should_exclude_file(tmp / 'build' / 'out.js')
+
+    # A deleted .gitignore stops applying on the next scan
+    (tmp / 'src' / '.gitignore').unlink()
+    assert os.path.join('src', 'generated.py') in sync.scan_directory()
+
+    (tmp / 'config').mkdir()
+    (tmp / 'config' / 'emad-intelligent-config.json').write_text(
+        json.dumps({'monitoring': {'respect_gitignore': False}}))
+    assert 'a.bak' in make_sync(tmp).scan_directory()
+
+
+def check_config_include_exclude_globs(tmp: Path):
+    make_tree(tmp, {'src/app.py': 'a', 'src/deep/util.py': 'u', 'README.md': 'r', 'data.bin': 'd',
+                    'dist/bundle.py': 'b', 'tests/test_app.py': 't'})
+    (tmp / 'config').mkdir()
+    (tmp / 'config' / 'emad-intelligent-config.json').write_text(json.dumps({'monitoring': {
+        'include_patterns': ['**/*.py', '**/*.md'],
+        'exclude_patterns': ['dist/**', 'tests/**'],
+    }}))
+    sync = make_sync(tmp)
+
+    assert sorted(sync.scan_directory()) == sorted(
+        [os.path.join('src', 'app.py'), os.path.join('src', 'deep', 'util.py'), 'README.md'])
+    assert sync.should_exclude_file(tmp / 'data.bin')
+    assert sync.should_exclude_dir(tmp / 'dist')
+    assert not sync.should_exclude_dir(tmp / 'src')
+
+
+def check_batch_sync_creates_single_commit(tmp: Path):
+    remote = {f'docs/old{i}.md': f'old {i}'.encode() for i in range(10)}
+    make_tree(tmp, {path: content for path, content in remote.items()})
+
+    with EMADFakeGitHub(remote) as github:
+        sync = make_github_sync(tmp, github)
+        assert sync.sync_mode == 'batch'
+        sync.establish_baseline()
+
+        make_tree(tmp, {f'src/new{i}.py': f'new {i}' for i in range(40)})
+        make_tree(tmp, {'docs/old0.md': 'changed', 'docs/old1.md': 'changed too'})
+        for i in range(2, 5):
+            (tmp / 'docs' / f'old{i}.md').unlink()
+        changes = sync.detect_changes()
+        assert (len(changes['added']), len(changes['modified']), len(changes['deleted'])) == (40, 2, 3)
+
+        commits_before = github.commit_count('main')
+        started = time.monotonic()
+        assert sync.process_changes(changes)
+        assert time.monotonic() - started < 2.5  # PR polling replaces the fixed 3s of sleeps
+
+        assert github.files('main') == local_files(tmp, sync)
+        assert github.commit_count('main') == commits_before + 1  # The squash merge
+        assert github.api_calls('GET get_pull') == 1
+        assert github.api_calls('POST create_blob') == 42
+        assert github.api_calls('POST create_tree') == 1
+        assert github.api_calls('POST create_commit') == 1
+        assert github.api_calls('POST create_ref') == 1
+        assert github.api_calls('PUT put_contents') == 0 and github.api_calls('GET get_contents') == 0
+        assert list(github.refs) == ['heads/main']  # Branch cleaned up after the merge
+
+
+def check_direct_push_fast_forwards_main(tmp: Path):
+    make_tree(tmp, {'keep.md': 'keep'})
+
+    with EMADFakeGitHub({'keep.md': b'keep'}) as github:
+        sync = make_github_sync(tmp, github, direct_push=True)
+        sync.establish_baseline()
+        make_tree(tmp, {f'f{i}.md': f'file {i}' for i in range(4)})
+        (tmp / 'f0.md').chmod(0o755)
+        changes = sync.detect_changes()
+
+        # main moves between writing the commit and updating the ref: the first fast-forward is refused
+        fast_forward_ref = sync.fast_forward_ref
+
+        def racing_fast_forward(branch_name, sha):
+            if github.api_calls('PATCH patch_ref') == 0:
+                github.commit_file_change('main', 'other.md', b'pushed elsewhere', None, 'Concurrent edit')
+            return fast_forward_ref(branch_name, sha)
+
+        sync.fast_forward_ref = racing_fast_forward
+        assert sync.process_changes(changes)
+
+        assert github.files('main') == {'keep.md': b'keep', 'other.md': b'pushed elsewhere',
+                                        **{f'f{i}.md': f'file {i}'.encode() for i in range(4)}}
+        assert github.api_calls('PATCH patch_ref') == 2 and github.api_calls('POST create_commit') == 2
+        assert github.api_calls('POST create_blob') == 4  # The rebuilt commit reuses the uploaded blobs
+        assert github.api_calls('POST create_ref') == 0 and github.api_calls('POST create_pull') == 0
+        assert github.api_calls('PUT merge_pull') == 0 and list(github.refs) == ['heads/main']
+        assert not sync.journal_path.exists()
+
+        # The exec bit is committed, and remembered for the next cycle's tree
+        modes = {path: mode for path, (mode, _) in github.listing('main').items()}
+        assert modes['f0.md'] == '100755' and modes['f1.md'] == modes['keep.md'] == '100644', modes
+        assert sync.committed_tree[1]['f0.md'][1] == '100755'
+
+
+def check_mode_changes_of_synced_files_are_synced(tmp: Path):
+    make_tree(tmp, {'run.sh': 'echo run', 'tools/build.sh': 'echo build'})
+
+    with EMADFakeGitHub({'run.sh': b'echo run', 'tools/build.sh': b'echo build'}) as github:
+        sync = make_github_sync(tmp, github)
+        sync.establish_baseline()
+
+        # A chmod changes no content; the full scan still reports it
+        (tmp / 'run.sh').chmod(0o755)
+        changes = sync.detect_changes()
+        assert changes == {'added': [], 'modified': ['run.sh'], 'deleted': []}, changes
+        assert sync.process_changes(changes)
+        assert github.listing('main')['run.sh'][0] == '100755'
+
+        # So does a rescan of the watcher's dirty paths
+        (tmp / 'run.sh').chmod(0o644)
+        (tmp / 'tools' / 'build.sh').chmod(0o755)
+        changes = sync.detect_changes({'run.sh', 'tools'})
+        assert changes['modified'] == ['run.sh', os.path.join('tools', 'build.sh')], changes
+        assert sync.process_changes(changes)
+        assert {path: mode for path, (mode, _) in github.listing('main').items()} == \
+            {'run.sh': '100644', 'tools/build.sh': '100755'}
+
+        # And a chmod made while stopped, against the manifest's modes
+        sync.save_manifest()  # As monitor_cycle does after a sync
+        (tmp / 'tools' / 'build.sh').chmod(0o644)
+        sync = make_github_sync(tmp, github)
+        sync.establish_baseline()
+        changes = sync.detect_changes()
+        assert changes['modified'] == [os.path.join('tools', 'build.sh')], changes
+        assert sync.process_changes(changes)
+        assert github.listing('main')['tools/build.sh'][0] == '100644'
+        assert github.files('main') == local_files(tmp, sync)
+
+
+def check_scan_uploads_changed_blobs(tmp: Path):
+    make_tree(tmp, {'keep.md': 'keep'})
+
+    with EMADFakeGitHub({'keep.md': b'keep'}) as github:
+        sync = make_github_sync(tmp, github, upload_concurrency=2)
+        sync.establish_baseline()
+        assert github.api_calls('POST create_blob') == 0  # The baseline is not uploaded
+
+        running, most_running, lock = [0], [0], threading.Lock()
+        create_blob = sync.create_blob
+
+        def counting_create_blob(file_path):
+            with lock:
+                running[0] += 1
+                most_running[0] = max(most_running[0], running[0])
+            try:
+                time.sleep(0.01)
+                return create_blob(file_path)
+            finally:
+                with lock:
+                    running[0] -= 1
+
+        sync.create_blob = counting_create_blob
+        make_tree(tmp, {**{f'f{i}.md': f'file {i}' for i in range(12)}, 'copy.md': 'file 0', 'keep.md': 'keep'})
+        make_tree(tmp, {'fresh.md': 'just written'}, mtime=time.time())
+        changes = sync.detect_changes()
+        assert len(changes['added']) == 14
+
+        # Uploaded by the scan, at most upload_concurrency at a time and each content once;
+        # fresh.md is still inside the debounce period and waits for the sync
+        assert github.api_calls('POST create_blob') == 12 and most_running[0] <= 2
+        assert sync.process_changes(changes)
+        assert github.api_calls('POST create_blob') == 13
+        assert github.files('main') == local_files(tmp, sync)
+
+
+def check_renames_reuse_blobs(tmp: Path):
+    todo = ''.join(f'item {i}\n' for i in range(30))
+    files = {**{f'docs/guide{i}.md': f'guide {i}\n' * 20 for i in range(5)}, 'notes/todo.md': todo}
+    make_tree(tmp, files)
+    (tmp / 'config').mkdir()
+    (tmp / 'config' / 'emad-intelligent-config.json').write_text(json.dumps({'sync': {'rename_similarity': 0.8}}))
+
+    with EMADFakeGitHub(local_files(tmp, make_sync(tmp))) as github:
+        sync = make_github_sync(tmp, github)
+        sync.establish_baseline()
+
+        # A renamed directory, and a file edited as it was moved
+        (tmp / 'docs').rename(tmp / 'manual')
+        (tmp / 'notes' / 'todo.md').unlink()
+        make_tree(tmp, {'notes/done.md': todo.replace('item 7', 'item 7 (done)')})
+        changes = sync.detect_changes()
+        assert (len(changes['added']), len(changes['deleted'])) == (6, 6)
+        assert sync.process_changes(changes)
+
+        assert github.files('main') == local_files(tmp, sync)
+        assert github.api_calls('POST create_blob') == 1  # Only the edited file's content is new
+        assert github.api_calls('GET get_blob') == 1  # The old todo.md, to compare with done.md
+
+        body = github.pulls[1]['body']
+        assert '### 🔀 Renamed Files (6)' in body
+        assert '- `docs/guide0.md` → `manual/guide0.md`\n' in body
+        assert '- `notes/todo.md` → `notes/done.md` (96% similar)' in body
+        assert 'Added Files' not in body and 'Deleted Files' not in body
+
+
+def check_large_sync_commits_in_resumable_chunks(tmp: Path):
+    make_tree(tmp, {'keep.md': 'keep', 'old.md': 'old'})
+    (tmp / 'config').mkdir()
+    (tmp / 'config' / 'emad-intelligent-config.json').write_text(json.dumps(
+        {'sync': {'max_commit_files': 3}, 'monitoring': {'max_file_size_mb': 0.001}}))
+
+    with EMADFakeGitHub(local_files(tmp, make_sync(tmp))) as github:
+        sync = make_github_sync(tmp, github)
+        sync.establish_baseline()
+        commits = github.commit_count('main')
+
+        make_tree(tmp, {**{f'f{i}.md': f'file {i}' for i in range(7)}, 'big.md': 'x' * 2000})
+        (tmp / 'old.md').unlink()
+        changes = sync.detect_changes()
+
+        # Uploads first, then the deletion, then the file over max_file_size_mb on its own
+        chunks = sync.split_changes(changes)
+        assert [sum(map(len, chunk.values())) for chunk in chunks] == [3, 3, 2, 1]
+        assert chunks[2]['deleted'] == ['old.md'] and chunks[3]['added'] == ['big.md']
+
+        # The second commit fails: the first stays on the branch
+        create_tree = sync.create_tree
+
+        def failing_create_tree(base_tree, entries):
+            if github.api_calls('POST create_tree') == 1:
+                github.fail_next('POST create_tree', 403, message='Resource not accessible by integration')
+            return create_tree(base_tree, entries)
+
+        sync.create_tree = failing_create_tree
+        assert not sync.process_changes(changes)
+        assert sorted(sync.journal['commit_targets']) == ['f0.md', 'f1.md', 'f2.md']
+
+        # The retry continues after it, without uploading anything again
+        sync.create_tree = create_tree
+        assert sync.process_changes(changes)
+        assert github.api_calls('POST create_tree') == 2 + 3 and github.api_calls('POST create_commit') == 4
+        assert github.api_calls('POST create_ref') == 1 and github.api_calls('PATCH patch_ref') == 3
+        assert github.api_calls('POST create_blob') == 8
+        assert github.files('main') == local_files(tmp, sync)
+        assert github.commit_count('main') == commits + 1
+
+
+def check_large_files_skipped_by_policy(tmp: Path):
+    make_tree(tmp, {'keep.md': 'keep'})
+    (tmp / 'config').mkdir()
+    (tmp / 'config' / 'emad-intelligent-config.json').write_text(json.dumps(
+        {'sync': {'large_file_policy': 'skip'}, 'monitoring': {'max_file_size_mb': 0.001}}))
+
+    with EMADFakeGitHub(local_files(tmp, make_sync(tmp))) as github:
+        sync = make_github_sync(tmp, github)
+        sync.establish_baseline()
+
+        make_tree(tmp, {'a.md': 'a', 'big.md': 'x' * 2000})
+        sync.monitor_cycle(flush=True)
+        assert set(github.files('main')) == {'keep.md', 'a.md', 'config/emad-intelligent-config.json'}
+        assert github.api_calls('POST create_blob') == 1
+
+        # Skipped, not pending: the next cycle has nothing to sync
+        commits = github.commit_count('main')
+        sync.monitor_cycle(flush=True)
+        assert github.commit_count('main') == commits and not sync.change_queue.pending
+
+
+def check_per_file_sync_mode(tmp: Path):
+    make_tree(tmp, {'keep.md': 'keep', 'gone.md': 'gone'})
+
+    with EMADFakeGitHub({'keep.md': b'keep', 'gone.md': b'gone'}) as github:
+        sync = make_github_sync(tmp, github, sync_mode='per-file')
+        sync.establish_baseline()
+
+        make_tree(tmp, {'keep.md': 'kept', 'new/a.md': 'a', 'new/b.md': 'b'})
+        (tmp / 'gone.md').unlink()
+        assert sync.process_changes(sync.detect_changes())
+
+        assert github.files('main') == local_files(tmp, sync)
+        assert github.api_calls('PUT put_contents') == 3
+        assert github.api_calls('DELETE delete_contents') == 1
+        assert github.api_calls('POST create_tree') == 0
+
+
+def check_batch_sync_falls_back_to_per_file(tmp: Path):
+    make_tree(tmp, {'a.md': 'a'})
+
+    with EMADFakeGitHub({'a.md': b'a'}) as github:
+        sync = make_github_sync(tmp, github)
+        sync.establish_baseline()
+
+        make_tree(tmp, {'b.md': 'b'})
+        github.fail_next('POST create_tree', 422)
+        assert sync.process_changes(sync.detect_changes())
+
+        assert github.files('main') == {'a.md': b'a', 'b.md': b'b'}
+        assert github.api_calls('POST create_tree') == 1
+        assert github.api_calls('POST create_ref') == 1  # From the per-file branch creation
+        assert github.api_calls('PUT put_contents') == 1
+
+
+def check_remote_tree_mirror_replaces_lookups(tmp: Path):
+    make_tree(tmp, {'a.md': 'a', 'b.md': 'b', 'never-pushed.md': 'local only'})
+
+    with EMADFakeGitHub({'a.md': b'a', 'b.md': b'b'}) as github:
+        sync = make_github_sync(tmp, github, sync_mode='per-file', blob_hashes=False)
+        sync.establish_baseline()
+
+        # One tree listing answers every SHA lookup of the cycle
+        make_tree(tmp, {'a.md': 'a 2', 'c.md': 'c'})
+        (tmp / 'b.md').unlink()
+        assert sync.process_changes(sync.detect_changes())
+        assert github.files('main') == {'a.md': b'a 2', 'c.md': b'c'}
+        assert github.api_calls('GET get_contents') == 0
+        assert github.api_calls('GET get_tree') == 1
+
+        # Batch mode carries the tree it wrote forward, so the next cycle lists nothing
+        sync.sync_mode = 'batch'
+        make_tree(tmp, {'d.md': 'd'})
+        assert sync.process_changes(sync.detect_changes())
+        make_tree(tmp, {'e.md': 'e'})
+        (tmp / 'never-pushed.md').unlink()  # Missing from the repository: dropped, not rejected
+        assert sync.process_changes(sync.detect_changes())
+        assert github.api_calls('GET get_tree') == 2
+        assert github.api_calls('PUT put_contents') == 2  # No per-file fallback
+        assert github.files('main') == {'a.md': b'a 2', 'c.md': b'c', 'd.md': b'd', 'e.md': b'e'}
+
+
+def check_truncated_tree_listing_walks_subtrees(tmp: Path):
+    files = {f'dir{i}/sub/f{j}.md': f'{i}-{j}'.encode() for i in range(3) for j in range(4)}
+    files['top.md'] = b'top'
+
+    with EMADFakeGitHub(files) as github:
+        github.tree_listing_limit = 5
+        sync = make_github_sync(tmp, github)
+        index = sync.refresh_remote_tree()
+        assert {path: entry[0] for path, entry in index.items()} == \
+            {path: git_object_sha('blob', content) for path, content in files.items()}
+        assert index['top.md'][1:] == ('100644', 3)
+        assert github.api_calls('GET get_tree') == 1 + 1 + 3 * 2  # Truncated listing, then one per tree
+
+
+def check_merkle_digests_match_remote_trees(tmp: Path):
+    files = {f'dir{i}/sub/f{j}.md': f'{i}-{j}'.encode() for i in range(3) for j in range(4)}
+    files['top.md'] = b'top'
+    make_tree(tmp, files)
+
+    with EMADFakeGitHub(files) as github:
+        sync = make_github_sync(tmp, github)
+        sync.establish_baseline()
+
+        # Digests are git tree SHAs, so a matching remote tree is never listed
+        tree_sha = github.get_object(github.head('main'), 'commit')['tree']
+        assert sync.merkle.digest() == tree_sha
+        index = sync.refresh_remote_tree()
+        assert {path: entry[0] for path, entry in index.items()} == \
+            {path: git_object_sha('blob', content) for path, content in files.items()}
+        assert github.api_calls('GET get_tree') == 0
+
+        # File modes are part of the digests, so a synced executable keeps its directory matching
+        make_tree(tmp, {'dir0/run.sh': 'echo hi'})
+        (tmp / 'dir0' / 'run.sh').chmod(0o755)
+        assert sync.process_changes(sync.detect_changes())
+        assert github.listing('main')['dir0/run.sh'][0] == '100755'
+        assert sync.merkle.digest() == github.get_object(github.head('main'), 'commit')['tree']
+        assert github.api_calls('GET get_tree') == 0
+
+        # Only the subtree edited on GitHub is listed when the root listing is truncated
+        github.commit_file_change('main', 'dir1/sub/f0.md', b'edited', git_object_sha('blob', b'1-0'), 'Edit')
+        github.tree_listing_limit = 5
+        assert sync.drift_report() == {'remote_only': [], 'changed_remotely': ['dir1/sub/f0.md']}
+        assert github.api_calls('GET get_tree') == 1 + 1 + 2  # Truncated listing, root, dir1, dir1/sub
+
+        # Watcher rescans keep the digests equal to a fresh build, and snapshots diff by subtree
+        before = EMADMerkleTree.from_leaves(((path, leaf, sync.merkle.mode(path)) for path, leaf in sync.merkle.walk()),
+                                            os.sep)
+        make_tree(tmp, {'dir2/sub/f9.md': 'new'})
+        (tmp / 'dir0' / 'sub' / 'f1.md').unlink()
+        sync.detect_changes({os.path.join('dir2', 'sub', 'f9.md'), os.path.join('dir0', 'sub', 'f1.md')})
+        rebuilt = EMADAutoSync(tmp)
+        rebuilt.file_hashes = rebuilt.scan_directory()
+        assert sync.merkle.digest() == rebuilt.merkle.digest()
+        assert before.diff(sync.merkle) == ([os.path.join('dir2', 'sub', 'f9.md')], [],
+                                            [os.path.join('dir0', 'sub', 'f1.md')])
+        assert before.digest('dir1') == sync.merkle.digest('dir1')
+
+
+def check_drift_report(tmp: Path):
+    make_tree(tmp, {'a.md': 'a', 'b.md': 'b'})
+
+    with EMADFakeGitHub({'a.md': b'a', 'b.md': b'b'}) as github:
+        sync = make_github_sync(tmp, github)
+        sync.establish_baseline()
+        assert sync.drift_report() == {'remote_only': [], 'changed_remotely': []}
+
+        github.commit_file_change('main', 'a.md', b'edited on GitHub', git_object_sha('blob', b'a'), 'Edit')
+        github.commit_file_change('main', 'extra.md', b'added on GitHub', None, 'Add')
+        assert sync.drift_report() == {'remote_only': ['extra.md'], 'changed_remotely': ['a.md']}
+
+
+def check_concurrent_blob_uploads_are_bounded(tmp: Path):
+    make_tree(tmp, {f'f{i:02d}.md': f'file {i}' for i in range(40)})
+    (tmp / 'config').mkdir()
+    (tmp / 'config' / 'emad-intelligent-config.json').write_text(json.dumps({'sync': {'upload_concurrency': 6}}))
+    file_paths = sorted(f'f{i:02d}.md' for i in range(40))
+
+    with EMADFakeGitHub(latency=0.02) as github:
+        sync = make_github_sync(tmp, github)
+        assert sync.upload_concurrency == 6
+        assert make_sync(tmp, upload_concurrency=100).upload_concurrency == 16
+
+        blob_shas = sync.upload_blobs(file_paths)
+        assert github.max_in_flight == 6, github.max_in_flight
+        assert blob_shas == {path: github.write_blob((tmp / path).read_bytes()) for path in file_paths}
+
+        serial = make_github_sync(tmp, github, upload_concurrency=1)
+        assert serial.upload_blobs(file_paths) == blob_shas
+
+        (tmp / 'f07.md').unlink()
+        started = github.api_calls('POST create_blob')
+        assert sync.upload_blobs(file_paths) is None
+        assert github.api_calls('POST create_blob') - started < len(file_paths)  # Remaining uploads cancelled
+
+
+def check_scheduler_retries_transient_failures(tmp: Path):
+    make_tree(tmp, {'a.md': 'a'})
+
+    with EMADFakeGitHub({'a.md': b'a'}) as github:
+        sync = make_github_sync(tmp, github)
+        sleeps = []
+        sync.api.sleep = sleeps.append
+        sync.establish_baseline()
+
+        make_tree(tmp, {'b.md': 'b' * 5000, 'c.md': 'c'})
+        github.fail_next('POST create_blob', 502, count=2)
+        github.fail_next('POST create_tree', 0)  # Connection dropped without a response
+        github.fail_next('PUT merge_pull', 503)
+        github.fail_next('POST create_ref', 403, headers={'Retry-After': '7'},
+                         message='You have exceeded a secondary rate limit')
+        assert sync.process_changes(sync.detect_changes())
+
+        assert github.files('main') == local_files(tmp, sync)  # Rewound streaming bodies re-sent intact
+        assert github.api_calls('PUT put_contents') == 0  # No fallback to per-file mode
+        metrics = sync.api.metrics()
+        assert metrics['retries'] == 5 and metrics['failures'] == 0, metrics
+        assert any(6 < seconds <= 7 for seconds in sleeps), sleeps  # Retry-After honoured
+
+        # Permission errors are final, and retries are bounded
+        github.fail_next('GET user', 403, message='Resource not accessible by integration')
+        assert sync.api.get(f'{github.url}/user').status_code == 403
+        github.fail_next('GET user', 500, count=sync.api.retry_attempts + 1)
+        assert sync.api.get(f'{github.url}/user').status_code == 500
+        assert sync.api.metrics()['retries'] == 5 + sync.api.retry_attempts
+        assert sync.api.metrics()['failures'] == 1
+
+        # A stalled response times out and is retried like a dropped connection
+        github.latency = 0.5
+        sync.api.timeout = (1, 0.1)
+        try:
+            sync.api.get(f'{github.url}/user')
+        except requests.Timeout:
+            pass
+        else:
+            raise AssertionError('a stalled request did not time out')
+        assert sync.api.metrics()['retries'] == 5 + 2 * sync.api.retry_attempts
+        assert sync.api.metrics()['failures'] == 2
+
+        # Retried POSTs whose first response was lost reuse the branch and pull request they created
+        github.latency = 0.0
+        sync.api.timeout = None
+        make_tree(tmp, {'d.md': 'd'})
+        ref_posts = github.api_calls('POST create_ref')
+        github.lose_next_response('POST create_ref')
+        github.lose_next_response('POST create_pull')
+        assert sync.process_changes(sync.detect_changes())
+        assert github.files('main') == local_files(tmp, sync)
+        assert len(github.pulls) == 2 and all(pull['merged'] for pull in github.pulls.values())
+        assert github.api_calls('POST create_ref') == ref_posts + 2 and github.api_calls('GET list_pulls') == 1
+
+
+def check_scheduler_paces_within_rate_limit(tmp: Path):
+    make_tree(tmp, {f'f{i:02d}.md': f'file {i}' for i in range(40)})
+
+    with EMADFakeGitHub(rate_limit=20, rate_limit_window=1.5) as github:
+        sync = make_github_sync(tmp, github, upload_concurrency=4)
+        blob_shas = sync.upload_blobs([f'f{i:02d}.md' for i in range(40)])
+
+        assert blob_shas is not None and len(blob_shas) == 40
+        assert github.rate_limited == 0, github.rate_limited  # Waited for the reset instead of hitting 403s
+        metrics = sync.api.metrics()
+        assert metrics['throttled'] > 0 and metrics['limit'] == 20, metrics
+
+
+def check_blob_hashes_match_git(tmp: Path):
+    content = os.urandom(3 * 1024 * 1024 + 5)
+    make_tree(tmp, {'data.bin': content, 'empty.txt': ''})
+    sync = make_sync(tmp)
+
+    digests = sync.calculate_file_digests(tmp / 'data.bin')
+    assert digests == (hashlib.sha256(content).hexdigest(), git_object_sha('blob', content))
+    assert sync.calculate_file_digests(tmp / 'empty.txt')[1] == 'e69de29bb2d1d6434b8b29ae775ad8c2e48c5391'
+    try:
+        git_sha = subprocess.run(['git', 'hash-object', str(tmp / 'data.bin')], capture_output=True,
+                                 text=True, check=True).stdout.strip()
+        assert digests[1] == git_sha
+    except FileNotFoundError:
+        pass  # git not installed
+
+    assert make_sync(tmp, blob_hashes=False).calculate_file_digests(tmp / 'data.bin')[1] is None
+
+
+def check_blob_shas_avoid_lookups_and_uploads(tmp: Path):
+    make_tree(tmp, {'a.md': 'alpha', 'b.md': 'beta', 'old.md': 'old'})
+
+    with EMADFakeGitHub({'a.md': b'alpha', 'b.md': b'beta', 'old.md': b'old'}) as github:
+        sync = make_github_sync(tmp, github, sync_mode='per-file')
+        sync.establish_baseline()
+        manifest = json.loads(sync.manifest_path.read_text())
+        assert manifest['files']['a.md']['blob'] == git_object_sha('blob', b'alpha')
+
+        # A restarted daemon updates and deletes without asking GitHub for SHAs
+        sync = make_github_sync(tmp, github, sync_mode='per-file')
+        sync.establish_baseline()
+        make_tree(tmp, {'a.md': 'alpha 2'})
+        (tmp / 'old.md').unlink()
+        assert sync.process_changes(sync.detect_changes())
+        assert github.api_calls('GET get_contents') == 0
+        assert github.files('main') == local_files(tmp, sync)
+
+        # A copy of existing content is referenced, not uploaded
+        sync.sync_mode = 'batch'
+        make_tree(tmp, {'copy-of-b.md': 'beta'})
+        assert sync.process_changes(sync.detect_changes())
+        assert github.api_calls('POST create_blob') == 0
+        assert github.files('main') == local_files(tmp, sync)
+
+        # Content that already matches the repository is not synced again
+        del sync.file_hashes['b.md']
+        changes = sync.detect_changes()
+        assert changes['added'] == ['b.md']
+        calls = github.api_calls()
+        assert sync.process_changes(changes)
+        assert github.api_calls() == calls + 2  # Only main's head, to confirm the mirrored tree
+
+
+def check_stale_blob_sha_is_looked_up(tmp: Path):
+    make_tree(tmp, {'a.md': 'alpha', 'b.md': 'beta'})
+
+    with EMADFakeGitHub({'a.md': b'alpha', 'b.md': b'beta'}) as github:
+        sync = make_github_sync(tmp, github, sync_mode='per-file')
+        sync.establish_baseline()
+
+        # Someone edits the repository behind the daemon's back
+        github.commit_file_change('main', 'a.md', b'edited on GitHub', git_object_sha('blob', b'alpha'), 'Edit')
+        github.commit_file_change('main', 'b.md', b'edited too', git_object_sha('blob', b'beta'), 'Edit')
+
+        # Without the tree mirror the manifest's SHAs are stale and each request is retried
+        github.fail_next('GET get_tree', 404)
+        make_tree(tmp, {'a.md': 'alpha 2'})
+        (tmp / 'b.md').unlink()
+        assert sync.process_changes(sync.detect_changes())
+        assert github.api_calls('GET get_contents') == 2
+        assert github.files('main') == {'a.md': b'alpha 2'}
+
+
+def check_change_queue_coalesces_paths(tmp: Path):
+    now = [1000.0]
+    queue = EMADChangeQueue(debounce_seconds=2, max_latency_seconds=10)
+    queue.clock = lambda: now[0]
+
+    queue.add({'added': ['new.md', 'gen.md'], 'modified': ['a.md'], 'deleted': ['old.md']})
+    queue.add({'added': ['old.md'], 'modified': ['a.md', 'new.md'], 'deleted': ['gen.md']})
+    assert queue.drain() == {'added': ['new.md'], 'modified': ['a.md', 'old.md'], 'deleted': []}
+
+    # Quiet period, pushed back by every change until the latency cap
+    queue.add({'added': ['a.md'], 'modified': [], 'deleted': []})
+    assert not queue.ready() and queue.due_in() == 2
+    for _ in range(6):
+        now[0] += 1.5
+        queue.add({'added': [], 'modified': ['a.md'], 'deleted': []})
+        assert not queue.ready()
+    now[0] += 1.5
+    assert queue.ready()  # 10.5 s since the first change, though never quiet for 2 s
+
+    # Changes that happened long before they were detected are already quiet
+    queue.drain()
+    queue.add({'added': ['a.md'], 'modified': [], 'deleted': []}, changed_at=now[0] - 60)
+    assert queue.ready()
+
+    queue.drain()
+    queue.add({'added': ['tmp.md'], 'modified': [], 'deleted': []})
+    queue.add({'added': [], 'modified': [], 'deleted': ['tmp.md']})
+    assert queue.due_in() is None and len(queue) == 0
+
+
+def check_debounced_cycles_sync_once(tmp: Path):
+    make_tree(tmp, {'keep.md': 'keep'})
+    (tmp / 'config').mkdir()
+    (tmp / 'config' / 'emad-intelligent-config.json').write_text(
+        json.dumps({'monitoring': {'debounce_seconds': 5}}))
+
+    with EMADFakeGitHub({'keep.md': b'keep'}) as github:
+        sync = make_github_sync(tmp, github)
+        sync.establish_baseline()
+        now = [time.time()]
+        sync.change_queue.clock = lambda: now[0]
+        commits = github.commit_count('main')
+
+        # A generator writing files over several cycles, including a scratch file it removes again
+        make_tree(tmp, {'a.md': 'a 1', 'scratch.tmp.md': 'x'}, mtime=now[0])
+        sync.monitor_cycle()
+        now[0] += 2
+        make_tree(tmp, {'a.md': 'a 2', 'b.md': 'b'}, mtime=now[0])
+        sync.monitor_cycle()
+        now[0] += 2
+        (tmp / 'scratch.tmp.md').unlink()
+        sync.monitor_cycle()
+        assert github.commit_count('main') == commits and len(sync.change_queue) == 2
+        assert 4.9 < sync.change_queue.due_in() <= 5
+
+        now[0] += 5
+        sync.monitor_cycle()
+        assert github.commit_count('main') == commits + 1
+        assert github.files('main') == {'keep.md': b'keep', 'a.md': b'a 2', 'b.md': b'b'}
+        assert github.api_calls('POST create_blob') == 2
+
+        # Edits found long after they were made, and flushed cycles, sync at once
+        make_tree(tmp, {'c.md': 'c'})
+        sync.monitor_cycle()
+        make_tree(tmp, {'d.md': 'd'}, mtime=now[0])
+        sync.monitor_cycle(flush=True)
+        assert github.commit_count('main') == commits + 3
+        assert github.files('main') == {'keep.md': b'keep', 'a.md': b'a 2', 'b.md': b'b', 'c.md': b'c', 'd.md': b'd'}
+
+
+def check_failed_per_file_sync_resumes_after_restart(tmp: Path):
+    make_tree(tmp, {'keep.md': 'keep'})
+
+    with EMADFakeGitHub({'keep.md': b'keep'}) as github:
+        sync = make_github_sync(tmp, github, sync_mode='per-file')
+        sync.establish_baseline()
+        manifest = sync.manifest_path.read_bytes()
+
+        make_tree(tmp, {'a.md': 'a', 'b.md': 'b', 'c.md': 'c'})
+        github.fail_next('PUT put_contents', 403, count=2, message='Resource not accessible by integration')
+        sync.monitor_cycle(flush=True)
+
+        # Nothing merged: the changes stay queued and the manifest keeps the old baseline
+        assert github.files('main') == {'keep.md': b'keep'}
+        assert sorted(sync.change_queue.pending) == ['a.md', 'b.md', 'c.md']
+        assert sync.manifest_path.read_bytes() == manifest
+        journal = json.loads(sync.journal_path.read_text())
+        assert journal['branch_created'] and list(journal['done']) == ['c.md'], journal
+
+        # A restarted daemon re-detects the changes and finishes the same branch
+        sync = make_github_sync(tmp, github, sync_mode='per-file')
+        sync.establish_baseline()
+        sync.monitor_cycle(flush=True)
+        assert github.files('main') == {'keep.md': b'keep', 'a.md': b'a', 'b.md': b'b', 'c.md': b'c'}
+        assert github.api_calls('POST create_ref') == 1
+        assert github.api_calls('PUT put_contents') == 3 + 2  # c.md once, a.md and b.md failed then retried
+        assert not sync.journal_path.exists()
+        assert sorted(json.loads(sync.manifest_path.read_text())['files']) == ['a.md', 'b.md', 'c.md', 'keep.md']
+
+
+def check_failed_batch_sync_reuses_blobs_and_commit(tmp: Path):
+    make_tree(tmp, {'keep.md': 'keep'})
+
+    with EMADFakeGitHub({'keep.md': b'keep'}) as github:
+        sync = make_github_sync(tmp, github)
+        sync.pipeline_uploads = False  # Every upload happens during the sync attempts below
+        sync.establish_baseline()
+        make_tree(tmp, {f'f{i}.md': f'file {i}' for i in range(4)})
+
+        # Attempt 1: a blob upload fails, and so does the per-file fallback
+        github.fail_next('POST create_blob', 403, message='Resource not accessible by integration')
+        github.fail_next('POST create_ref', 403, message='Resource not accessible by integration')
+        sync.monitor_cycle(flush=True)
+        uploaded = len(json.loads(sync.journal_path.read_text()).get('blobs', {}))
+        assert uploaded < 4
+
+        # Attempt 2: only the missing blobs are uploaded, then opening the PR fails
+        github.fail_next('POST create_pull', 403, message='Resource not accessible by integration')
+        sync.monitor_cycle(flush=True)
+        assert github.api_calls('POST create_blob') == 1 + uploaded + (4 - uploaded)
+        assert github.api_calls('POST create_tree') == 1
+
+        # Attempt 3: the branch already holds the commit, so only the PR is left
+        sync.monitor_cycle(flush=True)
+        assert github.api_calls('POST create_tree') == 1 and github.api_calls('POST create_pull') == 2
+        assert github.files('main') == {'keep.md': b'keep', **{f'f{i}.md': f'file {i}'.encode() for i in range(4)}}
+        assert not sync.journal_path.exists() and not sync.change_queue.pending
+
+
+def check_httpx_engine_syncs_concurrently(tmp: Path):
+    if not HTTPX_AVAILABLE:
+        print('   httpx is not installed, skipping')
+        return
+    make_tree(tmp, {'keep.md': 'keep', 'docs/old.md': 'old'})
+
+    async def no_wait(seconds):
+        pass
+
+    async def scenario(github: EMADFakeGitHub):
+        sync = EMADHttpxAutoSync(tmp, api_base=github.url, upload_concurrency=4)
+        sync.api.sleep = no_wait
+        assert sync.session is sync.http  # No requests.Session is built only to be replaced
+        assert await sync.in_worker(sync.authenticate)
+        sync.establish_baseline()
+
+        # Batch mode: blobs upload concurrently, a dropped connection is retried
+        make_tree(tmp, {f'docs/f{i}.md': f'file {i}' for i in range(8)})
+        github.fail_next('POST create_blob', 0)
+        started = time.monotonic()
+        await sync.cycle(flush=True)
+        assert time.monotonic() - started < 2.5  # PR polling replaces the fixed 3s of sleeps
+        assert 2 <= github.max_in_flight <= 4, github.max_in_flight
+        assert github.api_calls('POST create_blob') == 9 and github.api_calls('GET get_pull') == 1
+
+        # Per-file mode: updates and deletes through the Contents API
+        sync.sync_mode = 'per-file'
+        make_tree(tmp, {'keep.md': 'kept'})
+        (tmp / 'docs' / 'old.md').unlink()
+        await sync.cycle(flush=True)
+        assert github.files('main') == local_files(tmp, sync)
+        assert not sync.journal_path.exists()
+
+        # A truncated listing is completed by concurrent subtree listings
+        github.tree_listing_limit = 8  # Each tree fits, the recursive listing of 10 entries does not
+        sync.remote_tree = None
+        assert await sync.in_worker(sync.drift_report) == {'remote_only': [], 'changed_remotely': []}
+        assert sync.remote_tree[1].keys() == {'keep.md', *(f'docs/f{i}.md' for i in range(8))}
+
+        # The flow's requests block, so they are refused on the loop's own thread
+        try:
+            sync.api.get(f'{github.url}/user')
+        except RuntimeError as e:
+            assert 'in_worker' in str(e)
+        else:
+            raise AssertionError('a blocking request ran on the event loop thread')
+        await sync.aclose()
+
+    with EMADFakeGitHub({'keep.md': b'keep', 'docs/old.md': b'old'}, latency=0.05) as github:
+        asyncio.run(scenario(github))
+
+
+def check_httpx_engine_stop_cancels_immediately(tmp: Path):
+    if not HTTPX_AVAILABLE:
+        print('   httpx is not installed, skipping')
+        return
+    make_tree(tmp, {'keep.md': 'keep'})
+
+    async def scenario(github: EMADFakeGitHub):
+        sync = EMADHttpxAutoSync(tmp, api_base=github.url)
+        sync.establish_baseline()
+        make_tree(tmp, {f'f{i}.md': f'file {i}' for i in range(4)})
+
+        # Stopped while the blob uploads are in flight
+        task = asyncio.ensure_future(sync.run())
+        while not github.in_flight or not sync.journal_path.exists():
+            await asyncio.sleep(0.01)
+        started = time.monotonic()
+        threading.Thread(target=sync.stop).start()
+        assert await asyncio.wait_for(task, 1.0) is True
+        assert time.monotonic() - started < 0.5
+        assert github.files('main') == {'keep.md': b'keep'}
+
+        # The next start resumes from the journal
+        github.latency = 0.0
+        sync = EMADHttpxAutoSync(tmp, api_base=github.url)
+        assert await sync.test_cycle()
+        assert github.files('main') == local_files(tmp, sync)
+        assert not sync.journal_path.exists()
+        await sync.aclose()
+
+    with EMADFakeGitHub({'keep.md': b'keep'}, latency=0.5) as github:
+        asyncio.run(scenario(github))
+
+
+def check_httpx_engine_falls_back_without_httpx(tmp: Path):
+    assert sync_engine_class('threads') is EMADAutoSync
+    assert sync_engine_class('httpx') is (EMADHttpxAutoSync if HTTPX_AVAILABLE else EMADAutoSync)
+
+    installed = emad_httpx_sync.HTTPX_AVAILABLE
+    emad_httpx_sync.HTTPX_AVAILABLE = False
+    try:
+        assert sync_engine_class('httpx') is EMADAutoSync
+        try:
+            EMADHttpxAutoSync(tmp)
+        except ImportError as e:
+            assert 'httpx' in str(e)
+        else:
+            raise AssertionError('the httpx engine started without httpx')
+    finally:
+        emad_httpx_sync.HTTPX_AVAILABLE = installed
+
+
+def check_git_transport_pushes_to_bare_repository(tmp: Path):
+    remote, workspace, other = tmp / 'remote.git', tmp / 'workspace', tmp / 'other'
+    git(tmp, 'init', '--quiet', '--bare', '--initial-branch=main', str(remote))
+    git(tmp, 'init', '--quiet', '--initial-branch=main', str(workspace))
+    make_tree(workspace, {'keep.md': 'keep', 'docs/old.md': 'old'})
+    git(workspace, 'add', '-A')
+    git(workspace, 'commit', '--quiet', '-m', 'Initial commit')
+    git(workspace, 'remote', 'add', 'origin', str(remote))
+    git(workspace, 'push', '--quiet', 'origin', 'main')
+    head = git(workspace, 'rev-parse', 'HEAD')
+
+    sync = make_sync(workspace, sync_mode='git')
+    assert sync.git is not None and not sync.uses_api()
+    sync.establish_baseline()
+
+    make_tree(workspace, {'keep.md': 'kept', 'docs/new.md': 'new'})
+    (workspace / 'docs' / 'new.md').chmod(0o755)
+    (workspace / 'docs' / 'old.md').unlink()
+    sync.monitor_cycle(flush=True)
+    assert git(remote, 'ls-tree', '-r', '--name-only', 'main').split() == ['docs/new.md', 'keep.md']
+    assert git(remote, 'ls-tree', 'main', 'docs/new.md', 'keep.md').split()[::4] == ['100755', '100644']
+    assert git(remote, 'show', 'main:keep.md') == 'kept'
+    assert git(remote, 'rev-list', '--count', 'main').strip() == '2'
+    assert not sync.change_queue.pending and sync.api.stats['requests'] == 0
+
+    # The checkout's own HEAD and index are untouched
+    assert git(workspace, 'rev-parse', 'HEAD') == head
+    assert git(workspace, 'diff', '--cached', '--name-only') == ''
+
+    # Someone else pushes between our fetch and push: the commit is rebuilt on their head
+    git(tmp, 'clone', '--quiet', str(remote), str(other))
+    fetch = sync.git.fetch
+
+    def racing_fetch(branch):
+        remote_head = fetch(branch)
+        if not sync.git.stats['rejected_pushes']:
+            make_tree(other, {'other.md': f'other {remote_head[:7]}'})
+            git(other, 'add', '-A')
+            git(other, 'commit', '--quiet', '-m', 'Concurrent change')
+            git(other, 'push', '--quiet', 'origin', 'main')
+        return remote_head
+
+    sync.git.fetch = racing_fetch
+    # With core.fileMode off, the mode in the repository is kept whatever the worktree says
+    git(workspace, 'config', 'core.fileMode', 'false')
+    sync.git.exec_bit = None
+    make_tree(workspace, {'keep.md': 'kept again', 'docs/new.md': 'newer'})
+    (workspace / 'docs' / 'new.md').chmod(0o644)
+    sync.monitor_cycle(flush=True)
+    assert sync.git.stats['rejected_pushes'] == 1
+    assert git(remote, 'ls-tree', 'main', 'docs/new.md').split()[0] == '100755'
+    assert git(remote, 'ls-tree', '-r', '--name-only', 'main').split() == ['docs/new.md', 'keep.md', 'other.md']
+    assert git(remote, 'show', 'main:keep.md') == 'kept again'
+    assert git(remote, 'rev-list', '--count', 'main').strip() == '4'
+
+
+
+def check_git_status_detector_rescans_only_candidates(tmp: Path):
+    # The workspace is a subdirectory of the worktree
+    workspace = tmp / 'project'
+    git(tmp, 'init', '--quiet', '--initial-branch=main')
+    make_tree(tmp, {'outside.md': 'outside', 'project/.gitignore': 'build/\n',
+                    **{f'project/docs/f{i}.md': f'file {i}' for i in range(40)}})
+    git(tmp, 'add', '-A')
+    git(tmp, 'commit', '--quiet', '-m', 'Initial commit')
+    first_commit = git(tmp, 'rev-parse', 'HEAD').strip()
+    (tmp / '.git' / 'info' / 'exclude').write_text('notes.md\n')  # Ignored by git, monitored by EMAD
+
+    sync = make_sync(workspace, detector='git-status')
+    assert sync.git_status is not None
+    sync.establish_baseline()
+    assert not any(sync.detect_changes().values())  # First cycle: full scan, recording git's state
+
+    make_tree(tmp, {'outside.md': 'outside edited', 'project/docs/f0.md': 'file 0 edited',
+                    'project/new.md': 'new', 'project/notes.md': 'notes', 'project/build/out.o': 'built'})
+    changes = sync.detect_changes()
+    assert changes == {'added': ['new.md', 'notes.md'], 'modified': [os.path.join('docs', 'f0.md')],
+                       'deleted': []}, changes
+    assert sync.scan_stats['rehashed'] + sync.scan_stats['skipped'] == 3, sync.scan_stats
+
+    # Committed changes go back to clean and are rescanned once more, unchanged
+    git(tmp, 'add', '-A')
+    git(tmp, 'commit', '--quiet', '-m', 'Edits')
+    assert not any(sync.detect_changes().values())
+
+    # Checking out the first commit rewrites files git no longer reports
+    git(tmp, 'checkout', '--quiet', first_commit)
+    changes = sync.detect_changes()
+    assert changes == {'added': [], 'modified': [os.path.join('docs', 'f0.md')], 'deleted': ['new.md']}, changes
+    assert sync.file_hashes == make_sync(workspace).scan_directory()
+
+    # Without blob hashing, clean tracked files get their blob SHAs from the index
+    unhashed = make_sync(workspace, detector='git-status', blob_hashes=False)
+    unhashed.establish_baseline()
+    unhashed.detect_changes()
+    assert unhashed.local_blob_sha(os.path.join('docs', 'f1.md')) == git_object_sha('blob', b'file 1')
+    assert unhashed.local_blob_sha('notes.md') is None  # Not tracked
+
+
+def check_fair_pool_interleaves_workspaces(tmp: Path):
+    pool = EMADFairPool(1, 'emad-test')
+    gate = threading.Event()
+    order = []
+    pool.submit('gate', gate.wait)
+    futures = [pool.submit('big', order.append, f'big{i}') for i in range(3)]
+    futures.append(pool.submit('small', order.append, 'small0'))
+    gate.set()
+    for future in futures:
+        future.result(timeout=5)
+    pool.shutdown()
+    assert order == ['big0', 'small0', 'big1', 'big2'], order
+    assert pool.metrics('big')['tasks'] == 3 and pool.metrics('small')['tasks'] == 1
+
+
+def check_workspace_daemon_syncs_many_roots(tmp: Path):
+    roots = {name: tmp / name for name in ('alpha', 'beta')}
+    for name, root in roots.items():
+        make_tree(root, {f'{name}.md': name, 'docs/shared.md': 'shared'})
+
+    with EMADFakeGitHub({'alpha.md': b'alpha', 'docs/shared.md': b'shared'}) as alpha_github, \
+            EMADFakeGitHub({'beta.md': b'beta', 'docs/shared.md': b'shared'}) as beta_github:
+        config = {'hash_workers': 2, 'upload_workers': 2, 'cycle_workers': 2, 'workspaces': [
+            {'path': 'alpha', 'api_base': alpha_github.url, 'repository': 'acme/alpha'},
+            {'path': str(roots['beta']), 'name': 'b', 'api_base': beta_github.url, 'interval': 60}
+        ]}
+        (tmp / 'workspaces.json').write_text(json.dumps(config))
+        daemon = EMADWorkspaceDaemon.from_config(tmp / 'workspaces.json')
+        assert daemon.start()
+
+        make_tree(roots['alpha'], {f'docs/a{i}.md': f'a {i}' for i in range(6)})
+        make_tree(roots['beta'], {'beta.md': 'beta 2'})
+        with ThreadPoolExecutor(max_workers=daemon.cycle_workers) as executor:
+            assert daemon.dispatch(executor) == 2  # Both roots are due for their first full scan
+            for future in list(daemon.started_cycles):
+                future.result(timeout=30)
+            assert daemon.dispatch(executor) == 0  # Reaped; nothing is due until the next interval
+        daemon.shared.shutdown()
+
+        assert alpha_github.files('main') == local_files(roots['alpha'], daemon.workspaces[0].sync)
+        assert beta_github.files('main') == local_files(roots['beta'], daemon.workspaces[1].sync)
+        assert len(daemon.shared.hash_pool.workers) <= 2 and len(daemon.shared.upload_pool.workers) <= 2
+
+        metrics = daemon.metrics()
+        assert metrics['alpha']['synced_changes'] == 6 and metrics['b']['synced_changes'] == 1, metrics
+        assert metrics['alpha']['upload_pool']['tasks'] == 6 and metrics['b']['hash_pool']['tasks'] >= 1
+        assert metrics['b']['cycles'] == 1 and daemon.workspaces[1].next_scan > time.monotonic() + 50
+
+TESTS = [
+    ("Stat cache skips unchanged files", check_stat_cache_skips_unchanged_files),
+    ("Stat cache still detects added/modified/deleted files", check_stat_cache_detects_changes),
+    ("Files inside the racy window are rehashed", check_racy_files_are_rehashed),
+    ("Manifest restores baseline and detects downtime edits", check_manifest_detects_downtime_edits),
+    ("Manifest with unknown version triggers a fresh scan", check_manifest_version_mismatch_rebaselines),
+    ("Compact snapshot behaves like the dict it replaces", check_snapshot_matches_dict),
+    ("Parallel hashing matches serial results", check_parallel_hashing_matches_serial),
+    ("Parallel hashing isolates per-file errors", check_parallel_hashing_isolates_errors),
+    ("A failed scan deletes nothing", check_failed_scan_deletes_nothing),
+    ("Unreadable directories delete nothing", check_unreadable_directories_delete_nothing),
+    ("Hash worker count defaults from performance.worker_count", check_worker_count_defaults_from_config),
+    ("Chunked and mmap hashing match hashlib", check_chunked_hash_matches_hashlib),
+    ("Streaming upload body is valid JSON", check_streaming_upload_body_is_valid_json),
+    ("Hash and upload peak memory stays bounded on a 1 GB file", check_hash_and_upload_memory_bounded_on_1gb_file),
+    ("inotify watcher feeds dirty paths into detect_changes", check_inotify_watcher_feeds_detect_changes),
+    ("Dirty directory rename rescans both subtrees", check_dirty_directory_rename),
+    ("Watcher overflow requests a full rescan", check_watcher_overflow_requests_full_scan),
+    ("Watch-limit exhaustion falls back to polling", check_watch_limit_falls_back_to_polling),
+    ("Walker prunes excluded directories before descending", check_walker_prunes_excluded_directories),
+    ("Exclusions match whole names, not substrings", check_exclusions_match_whole_names),
+    (".gitignore files are respected", check_gitignore_is_respected),
+    ("Config include/exclude globs are applied", check_config_include_exclude_globs),
+    ("Batch sync writes one commit through the Git Data API", check_batch_sync_creates_single_commit),
+    ("Direct push fast-forwards main without a pull request", check_direct_push_fast_forwards_main),
+    ("Mode changes of synced files are synced", check_mode_changes_of_synced_files_are_synced),
+    ("Scans upload the blobs of changed files", check_scan_uploads_changed_blobs),
+    ("Renamed files reuse their blobs and are listed as renames", check_renames_reuse_blobs),
+    ("Large syncs commit in resumable chunks", check_large_sync_commits_in_resumable_chunks),
+    ("Files over max_file_size_mb are skipped by policy", check_large_files_skipped_by_policy),
+    ("Per-file sync mode still works", check_per_file_sync_mode),
+    ("Failed batch sync falls back to per-file uploads", check_batch_sync_falls_back_to_per_file),
+    ("Concurrent blob uploads stay within the configured bound", check_concurrent_blob_uploads_are_bounded),
+    ("Scheduler retries transient failures with backoff", check_scheduler_retries_transient_failures),
+    ("Scheduler paces requests within the rate limit", check_scheduler_paces_within_rate_limit),
+    ("Blob hashes match git hash-object", check_blob_hashes_match_git),
+    ("Known blob SHAs avoid lookups and re-uploads", check_blob_shas_avoid_lookups_and_uploads),
+    ("Stale blob SHAs are looked up and retried", check_stale_blob_sha_is_looked_up),
+    ("Remote tree mirror replaces per-file SHA lookups", check_remote_tree_mirror_replaces_lookups),
+    ("Truncated tree listings fall back to walking subtrees", check_truncated_tree_listing_walks_subtrees),
+    ("Merkle digests skip remote trees that match the baseline", check_merkle_digests_match_remote_trees),
+    ("Drift report compares the repository with the manifest", check_drift_report),
+    ("Change queue coalesces repeated and cancelling changes", check_change_queue_coalesces_paths),
+    ("Debounced cycles sync a burst of changes once", check_debounced_cycles_sync_once),
+    ("Failed per-file sync resumes its branch after a restart", check_failed_per_file_sync_resumes_after_restart),
+    ("Failed batch sync reuses uploaded blobs and its commit", check_failed_batch_sync_reuses_blobs_and_commit),
+    ("httpx engine syncs concurrently over one connection pool", check_httpx_engine_syncs_concurrently),
+    ("httpx engine stop() cancels a sync immediately", check_httpx_engine_stop_cancels_immediately),
+    ("httpx engine falls back to threads without httpx", check_httpx_engine_falls_back_without_httpx),
+    ("Git transport pushes one commit to a bare repository", check_git_transport_pushes_to_bare_repository),
+    ("git-status detector rescans only what git reports", check_git_status_detector_rescans_only_candidates),
+    ("Fair pool interleaves queued work across workspaces", check_fair_pool_interleaves_workspaces),
+    ("Workspace daemon syncs many roots on shared pools", check_workspace_daemon_syncs_many_roots),
+]
+
+
+def run_tests(selected=None):
+    """Run all auto-sync tests, each in its own temporary workspace"""
+    test_results = {
+        "total_tests": 0,
+        "passed_tests": 0,
+        "failed_tests": 0,
+        "test_details": []
+    }
+
+    for index, (name, check) in enumerate(TESTS, 1):
+        if selected and not any(term.lower() in name.lower() for term in selected):
+            continue
+
+        test_results["total_tests"] += 1
+        try:
+            with tempfile.TemporaryDirectory(prefix='emad-test-') as tmp:
+                check(Path(tmp))
+            print(f"✅ Test {index}: {name}")
+            test_results["passed_tests"] += 1
+            test_results["test_details"].append(f"✅ {name}")
+        except Exception as e:
+            print(f"❌ Test {index}: {name} failed: {e!r}")
+            traceback.print_exc()
+            test_results["failed_tests"] += 1
+            test_results["test_details"].append(f"❌ {name}: {e!r}")
+
+    return test_results
+
+
+def main():
+    """Main test execution"""
+    print("🧪 EMAD Auto-Sync Test Suite")
+    print("=" * 50)
+    print(f"Python Version: {sys.version}")
+    print(f"Test Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    test_results = run_tests(sys.argv[1:])
+
+    print(f"\n📈 Results: {test_results['passed_tests']}/{test_results['total_tests']} passed")
+    return 0 if test_results["failed_tests"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -216,11 +216,14 @@ def run_quick_test():
             
             # Test directory scanning
             file_hashes = auto_sync.scan_directory()
+            if file_hashes is None:
+                print_status("Can scan directory (see the log for the error)", False)
+                return False
             print_status(f"Can scan directory ({len(file_hashes)} files found)", True)
             
             # Test change detection
             changes = auto_sync.detect_changes()
-            print_status("Can detect changes", True)
+            print_status("Can detect changes", changes is not None)
             
             return True
         else: